@@ -4,3 +4,9 @@ from rest_framework import serializers
 class UserSignupStatsSerializer(serializers.Serializer):
     date = serializers.DateField()
     count = serializers.IntegerField()
+
+
+class ResponseCacheStatsSerializer(serializers.Serializer):
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+    hit_rate = serializers.FloatField()
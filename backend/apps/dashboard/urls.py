@@ -8,4 +8,5 @@ urlpatterns = [
     path("", views.dashboard, name="dashboard"),
     path("all/", views.dashboard, name="all"),
     path("api/user-signups/", views.UserSignupStatsView.as_view(), name="user_signups_api"),
+    path("api/response-cache/", views.ResponseCacheStatsView.as_view(), name="response_cache_api"),
 ]
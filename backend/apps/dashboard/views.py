@@ -10,8 +10,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apps.dashboard.forms import DateRangeForm
-from apps.dashboard.serializers import UserSignupStatsSerializer
+from apps.dashboard.serializers import ResponseCacheStatsSerializer, UserSignupStatsSerializer
 from apps.dashboard.services import get_user_signups
+from apps.microapps.response_cache import response_cache_stats
 from apps.users.models import CustomUser
 
 
@@ -57,3 +58,11 @@ class UserSignupStatsView(APIView):
     def get(self, request):
         serializer = UserSignupStatsSerializer(get_user_signups(), many=True)
         return Response(serializer.data)
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(request=None, responses=ResponseCacheStatsSerializer, summary="Response cache hits and misses")
+    def get(self, request):
+        return Response(ResponseCacheStatsSerializer(response_cache_stats()).data)
@@ -0,0 +1,26 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.queue import work
+from apps.utils.global_variables import JobVariables
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (e.g. document parsing) until stopped. Run one or more alongside the web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=JobVariables.WORKER_CONCURRENCY, help="Jobs to run at once")
+        parser.add_argument("--poll-interval", type=float, default=JobVariables.POLL_INTERVAL, help="Seconds between polls of an empty queue")
+        parser.add_argument("--once", action="store_true", help="Exit once no job is left to run")
+
+    def handle(self, **options):
+        stop = threading.Event()
+        # Finish the jobs in flight on shutdown instead of abandoning them until their lease expires
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+
+        print(f"Running jobs with concurrency {options['concurrency']}")
+        work(options["concurrency"], options["poll_interval"], stop=stop, once=options["once"])
+        print("Job worker stopped")
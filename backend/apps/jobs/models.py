@@ -0,0 +1,53 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A unit of background work (e.g. parsing an uploaded document), queued in the database and executed by
+    the run_jobs management command. See apps.jobs.queue.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    # Public id returned to clients, so job ids can't be enumerated
+    job_uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    # The registered handler that runs the job
+    kind = models.CharField(max_length=100)
+    # The user who enqueued the job; only they can see its status
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, blank=True, null=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS, default=QUEUED)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Seconds a worker may hold the job before it is considered lost and handed to another worker
+    timeout = models.PositiveIntegerField(default=300)
+    # Queued jobs are not picked up before this time (retry backoff)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Lease of the worker running the job
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_until = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.job_uuid} ({self.status})"
@@ -0,0 +1,221 @@
+"""
+A small database-backed job queue, so slow work (parsing and OCR of uploads) runs outside the web workers
+without an external broker.
+
+Handlers are registered per job kind with @register in a `jobs` module of any installed app (discovered when
+the app registry is ready) and are called with the job's payload; whatever JSON they return is stored as the
+job's result. Workers (`manage.py run_jobs`) claim jobs with SELECT ... FOR UPDATE SKIP LOCKED and hold them
+under a lease of `timeout` seconds: a job whose worker died or hung is handed to another worker once the lease
+expires, and a late result from the old worker is discarded. Per-kind concurrency caps are checked under a
+Postgres advisory lock for the kind, so workers claiming at the same time can't both fill the cap.
+
+Handlers registered with `every=<seconds>` are periodic: workers queue one job of the kind per interval.
+The job's uuid is derived from the kind and the interval, so workers racing to queue it create it once.
+"""
+import hashlib
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from functools import partial
+
+from django.db import connection, connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from apps.jobs.models import Job
+from apps.utils.global_variables import JobVariables
+
+log = logging.getLogger("micro_ai.jobs")
+
+_handlers = {}
+
+
+class JobError(Exception):
+    """Raised by a handler for failures a retry won't fix (e.g. an unsupported file); the job fails at once."""
+
+
+def register(kind, max_attempts=3, timeout=300, concurrency=None, every=None, on_failure=None):
+    """
+    Register a handler for a job kind. `concurrency` caps how many jobs of this kind run at once
+    across all workers (None for no cap beyond the workers' own concurrency). With `every`, the workers
+    also run the job on their own every that many seconds, with an empty payload. `on_failure` is called
+    with the payload once a job has failed for good (a JobError, or its last attempt failing or timing out),
+    to clean up what the handler would have.
+    """
+    def decorator(func):
+        _handlers[kind] = {
+            "func": func, "max_attempts": max_attempts, "timeout": timeout, "concurrency": concurrency, "every": every,
+            "on_failure": on_failure,
+        }
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, user_id=None):
+    handler = _handlers[kind]
+    return Job.objects.create(
+        kind=kind,
+        payload=payload,
+        user_id=user_id,
+        max_attempts=handler["max_attempts"],
+        timeout=handler["timeout"],
+    )
+
+
+def schedule_periodic_jobs(scheduled):
+    """Queue the current interval's job of each periodic kind, unless this worker already has (`scheduled`)"""
+    now = timezone.now()
+    for kind, handler in _handlers.items():
+        if not handler["every"]:
+            continue
+        interval = int(now.timestamp() // handler["every"])
+        if scheduled.get(kind) == interval:
+            continue
+        Job.objects.get_or_create(
+            job_uuid=uuid.uuid5(uuid.NAMESPACE_URL, f"{kind}:{interval}"),
+            defaults={"kind": kind, "payload": {}, "max_attempts": handler["max_attempts"], "timeout": handler["timeout"]},
+        )
+        scheduled[kind] = interval
+
+
+def advisory_lock_key(kind):
+    """A stable signed 64-bit key for the kind's Postgres advisory lock"""
+    return int.from_bytes(hashlib.blake2b(f"jobs:{kind}".encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def lock_capped_kinds():
+    """
+    Take the transaction-scoped advisory lock of every kind with a concurrency cap. Under READ COMMITTED,
+    two workers could otherwise both count the same running jobs and each claim up to the cap.
+    Locks are taken in a fixed order so claiming workers can't deadlock.
+    """
+    kinds = sorted(kind for kind, handler in _handlers.items() if handler["concurrency"])
+    with connection.cursor() as cursor:
+        for kind in kinds:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [advisory_lock_key(kind)])
+
+
+def running_jobs(now):
+    """The number of jobs of each kind that a worker holds an unexpired lease on"""
+    return dict(
+        Job.objects.filter(status=Job.RUNNING, locked_until__gte=now)
+        .values("kind").annotate(count=Count("id")).values_list("kind", "count")
+    )
+
+
+def claim_jobs(worker_id, limit):
+    """Lease up to `limit` runnable jobs to this worker, oldest first, respecting the per-kind concurrency caps"""
+    now = timezone.now()
+    with transaction.atomic():
+        # Jobs whose lease expired on their last attempt are not handed out again
+        timed_out = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.RUNNING, locked_until__lt=now, attempts__gte=F("max_attempts"))
+        )
+        if timed_out:
+            Job.objects.filter(id__in=[job.id for job in timed_out]).update(
+                status=Job.FAILED, error="timed out", locked_by="", locked_until=None, updated_at=now
+            )
+            for job in timed_out:
+                transaction.on_commit(partial(job_failed, job))
+
+        # Count running jobs only once no other worker can be between its own count and commit
+        lock_capped_kinds()
+        running = running_jobs(now)
+        slots = {
+            kind: (handler["concurrency"] - running.get(kind, 0)) if handler["concurrency"] else limit
+            for kind, handler in _handlers.items()
+        }
+        runnable = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(kind__in=[kind for kind, free in slots.items() if free > 0])
+            .filter(Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now))
+            .order_by("run_after", "id")[:limit]
+        )
+
+        jobs = []
+        for job in runnable:
+            if slots[job.kind] <= 0:
+                continue
+            slots[job.kind] -= 1
+            job.status = Job.RUNNING
+            job.attempts += 1
+            job.locked_by = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+            job.locked_until = now + timedelta(seconds=job.timeout)
+            job.save(update_fields=["status", "attempts", "locked_by", "locked_until", "updated_at"])
+            jobs.append(job)
+        return jobs
+
+
+def finish_job(job, **fields):
+    """Record the outcome, unless the lease expired and the job was handed to another worker meanwhile"""
+    return Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        locked_by="", locked_until=None, updated_at=timezone.now(), **fields
+    ) == 1
+
+
+def job_failed(job):
+    """Call the kind's on_failure hook for a job that won't be retried; a failing hook is only logged"""
+    on_failure = _handlers.get(job.kind, {}).get("on_failure")
+    if on_failure is None:
+        return
+    try:
+        on_failure(job.payload)
+    except Exception as e:
+        log.error(f"Cleanup of failed job {job.job_uuid} ({job.kind}) failed: {e}")
+
+
+def run_job(job):
+    try:
+        result = _handlers[job.kind]["func"](job.payload)
+    except JobError as e:
+        if finish_job(job, status=Job.FAILED, error=str(e)):
+            job_failed(job)
+    except Exception as e:
+        log.error(f"Job {job.job_uuid} ({job.kind}) failed on attempt {job.attempts}: {e}")
+        if job.attempts < job.max_attempts:
+            # Exponential backoff between attempts
+            delay = JobVariables.RETRY_DELAY * 2 ** (job.attempts - 1)
+            finish_job(job, status=Job.QUEUED, error=str(e), run_after=timezone.now() + timedelta(seconds=delay))
+        elif finish_job(job, status=Job.FAILED, error=str(e)):
+            job_failed(job)
+    else:
+        if not finish_job(job, status=Job.SUCCEEDED, result=result, error=""):
+            log.warning(f"Job {job.job_uuid} finished after its lease expired, the result was discarded")
+
+
+def run_job_in_thread(job):
+    try:
+        run_job(job)
+    finally:
+        # Each worker thread has its own database connection
+        connections.close_all()
+
+
+def work(concurrency, poll_interval, stop=None, once=False):
+    """Claim and run jobs on `concurrency` threads until `stop` is set (or the queue is drained with once=True)"""
+    stop = stop or threading.Event()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    in_flight = set()
+    scheduled = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while not stop.is_set():
+            schedule_periodic_jobs(scheduled)
+            in_flight = {future for future in in_flight if not future.done()}
+            free = concurrency - len(in_flight)
+            jobs = claim_jobs(worker_id, free) if free > 0 else []
+            for job in jobs:
+                in_flight.add(executor.submit(run_job_in_thread, job))
+            if once and not jobs and not in_flight:
+                break
+            if jobs:
+                continue
+            if free <= 0:
+                # Every thread is busy: poll again as soon as one frees up
+                wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            else:
+                stop.wait(poll_interval)
@@ -0,0 +1,7 @@
+from rest_framework import serializers
+from .models import Job
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['job_uuid', 'kind', 'status', 'result', 'error', 'attempts', 'created_at', 'updated_at']
@@ -0,0 +1,153 @@
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.jobs.models import Job
+from apps.jobs.queue import JobError, claim_jobs, enqueue, register, run_job, running_jobs, schedule_periodic_jobs
+from apps.users.models import CustomUser
+
+calls = []
+failures = []
+
+
+@register("tests.echo", max_attempts=2, timeout=60, concurrency=1, on_failure=failures.append)
+def echo(payload):
+    calls.append(payload)
+    if payload.get("fail") == "retry":
+        raise RuntimeError("try again")
+    if payload.get("fail") == "fatal":
+        raise JobError("unparseable")
+    return {"echo": payload["value"]}
+
+
+@register("tests.tick", every=60 * 60)
+def tick(payload):
+    return {}
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+        failures.clear()
+
+    def run_next(self):
+        jobs = claim_jobs("test-worker", 10)
+        for job in jobs:
+            run_job(job)
+        return jobs
+
+    def test_runs_job_and_stores_result(self):
+        job = enqueue("tests.echo", {"value": 1})
+        self.assertEqual([job.id], [claimed.id for claimed in self.run_next()])
+        job.refresh_from_db()
+        self.assertEqual((Job.SUCCEEDED, {"echo": 1}, 1), (job.status, job.result, job.attempts))
+        self.assertEqual([], self.run_next())
+
+    def test_retries_with_backoff_then_fails(self):
+        job = enqueue("tests.echo", {"fail": "retry"})
+        self.run_next()
+        job.refresh_from_db()
+        self.assertEqual(Job.QUEUED, job.status)
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        self.run_next()
+        job.refresh_from_db()
+        self.assertEqual((Job.FAILED, "try again", 2), (job.status, job.error, job.attempts))
+
+    def test_job_error_is_not_retried(self):
+        job = enqueue("tests.echo", {"fail": "fatal"})
+        self.run_next()
+        job.refresh_from_db()
+        self.assertEqual((Job.FAILED, "unparseable", 1), (job.status, job.error, job.attempts))
+
+    def test_concurrency_cap_and_expired_lease(self):
+        first = enqueue("tests.echo", {"value": 1})
+        enqueue("tests.echo", {"value": 2})
+        self.assertEqual([first.id], [job.id for job in claim_jobs("worker-a", 10)])
+        # The cap of one running job holds the second back
+        self.assertEqual([], claim_jobs("worker-b", 10))
+
+        # worker-a died: once its lease expires the job is handed out again and its late result is discarded
+        stale = Job.objects.get(id=first.id)
+        Job.objects.filter(id=first.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = claim_jobs("worker-b", 10)
+        self.assertEqual([first.id], [job.id for job in reclaimed])
+        run_job(stale)
+        self.assertEqual(Job.RUNNING, Job.objects.get(id=first.id).status)
+
+    def test_failure_hook_runs_once_the_job_fails_for_good(self):
+        enqueue("tests.echo", {"fail": "retry"})
+        self.run_next()
+        self.assertEqual([], failures)
+        Job.objects.update(run_after=timezone.now())
+        self.run_next()
+        self.assertEqual([{"fail": "retry"}], failures)
+
+        # A job whose last lease expired is failed by the next claim, after its transaction commits
+        timed_out = enqueue("tests.echo", {"value": 1})
+        claim_jobs("worker-a", 10)
+        Job.objects.filter(id=timed_out.id).update(attempts=2, locked_until=timezone.now() - timedelta(seconds=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            claim_jobs("worker-b", 10)
+        self.assertEqual([{"fail": "retry"}, {"value": 1}], failures)
+        self.assertEqual((Job.FAILED, "timed out"), Job.objects.values_list("status", "error").get(id=timed_out.id))
+
+    def test_periodic_job_is_queued_once_per_interval(self):
+        # Two workers racing to queue the same interval's job
+        schedule_periodic_jobs({})
+        schedule_periodic_jobs({})
+        self.assertEqual(1, Job.objects.filter(kind="tests.tick").count())
+
+
+class ClaimRaceTest(TransactionTestCase):
+    def test_workers_claiming_together_respect_the_concurrency_cap(self):
+        for value in range(3):
+            enqueue("tests.echo", {"value": value})
+        counted = threading.Barrier(2)
+
+        def count_then_wait(now):
+            running = running_jobs(now)
+            # Without the per-kind lock both workers get here having counted no running jobs
+            try:
+                counted.wait(timeout=1)
+            except threading.BrokenBarrierError:
+                pass
+            return running
+
+        claimed = []
+
+        def claim(worker_id):
+            try:
+                claimed.extend(claim_jobs(worker_id, 10))
+            finally:
+                connections.close_all()
+
+        with patch("apps.jobs.queue.running_jobs", count_then_wait):
+            workers = [threading.Thread(target=claim, args=(worker_id,)) for worker_id in ("worker-a", "worker-b")]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        self.assertEqual(1, len(claimed))
+        self.assertEqual(1, Job.objects.filter(status=Job.RUNNING).count())
+
+
+class JobDetailTest(TestCase):
+    def test_only_the_owner_sees_the_job(self):
+        owner = CustomUser.objects.create(username="owner@example.com")
+        job = enqueue("tests.echo", {"value": 1}, user_id=owner.id)
+        client = APIClient()
+
+        client.force_authenticate(CustomUser.objects.create(username="other@example.com"))
+        self.assertEqual(404, client.get(f"/api/jobs/{job.job_uuid}/").status_code)
+
+        client.force_authenticate(owner)
+        response = client.get(f"/api/jobs/{job.job_uuid}/")
+        self.assertEqual(Job.QUEUED, response.data["data"]["status"])
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('<uuid:job_id>/', views.JobDetail.as_view(), name='job_detail'),
+]
@@ -0,0 +1,35 @@
+from rest_framework.views import APIView
+from rest_framework import status
+from rest_framework.response import Response
+import logging as log
+from rest_framework.permissions import IsAuthenticated
+from drf_spectacular.utils import extend_schema, extend_schema_view
+from apps.jobs.models import Job
+from .serializer import JobSerializer
+from apps.utils.custom_error_message import ErrorMessages as error
+
+def handle_exception(e):
+    log.error(e)
+    return Response(
+        error.SERVER_ERROR,
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    )
+
+@extend_schema_view(
+    get=extend_schema(responses={200: JobSerializer}, summary="Get the status and result of a background job"),
+)
+class JobDetail(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id, format=None):
+        try:
+            job = Job.objects.get(job_uuid=job_id, user=request.user.id)
+            serializer = JobSerializer(job)
+            return Response(
+                {"data": serializer.data, "status": status.HTTP_200_OK},
+                status=status.HTTP_200_OK,
+            )
+        except Job.DoesNotExist:
+            return Response(error.JOB_NOT_EXIST, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return handle_exception(e)
@@ -0,0 +1,101 @@
+"""
+Content-addressed store of parsed document text.
+
+Extracted text is written once per distinct file (SHA-256 of its bytes) and parser version, under a key shared
+by every microapp that uploads the file, and indexed by ParsedDocument. A repeat upload of the same handout
+references the existing text instead of being parsed, OCR'd and stored again.
+"""
+import hashlib
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.microapps.document_parser import DocumentProcessor
+from apps.microapps.models import ParsedDocument
+from apps.utils.clients import get_s3_client, upload_to_s3
+from apps.utils.global_variables import MicroappVariables
+
+# Characters of the parsed text returned with an upload
+PREVIEW_LENGTH = 1000
+# Characters encoded at a time (and bytes kept in memory) when uploading parsed text
+TEXT_SPOOL_SIZE = 1024 * 1024
+
+
+def file_sha256(uploaded_file):
+    """Hash an uploaded file chunk by chunk, leaving it rewound for the upload"""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def parsed_text_key(sha256):
+    return f'documents/text/{sha256}/v{DocumentProcessor.PARSER_VERSION}.txt'
+
+
+def upload_result(parsed_document, original_file):
+    """The data returned for a microapp file upload"""
+    return {
+        'original_file': original_file,
+        'text_file': parsed_document.text_file,
+        'content_preview': parsed_document.content_preview,
+        'has_more_content': parsed_document.char_count > PREVIEW_LENGTH,
+        'word_count': parsed_document.word_count
+    }
+
+
+def find_parsed_document(sha256):
+    """The cached text of a file for the current parser version, or None. Records the reuse for eviction."""
+    parsed_document = ParsedDocument.objects.filter(
+        sha256=sha256, parser_version=DocumentProcessor.PARSER_VERSION
+    ).first()
+    if parsed_document is not None:
+        ParsedDocument.objects.filter(id=parsed_document.id).update(
+            use_count=F('use_count') + 1, last_used_at=timezone.now()
+        )
+    return parsed_document
+
+
+def store_parsed_document(sha256, parsed_content):
+    """Write the text under its content key and index it. Concurrent parses of the same file store it once."""
+    text_file = parsed_text_key(sha256)
+    # Encode the text slice by slice into a spooled file instead of holding a second, encoded copy in memory
+    with tempfile.SpooledTemporaryFile(max_size=TEXT_SPOOL_SIZE) as text:
+        for start in range(0, len(parsed_content), TEXT_SPOOL_SIZE):
+            text.write(parsed_content[start:start + TEXT_SPOOL_SIZE].encode('utf-8'))
+        text.seek(0)
+        upload_to_s3(text, text_file, 'text/plain')
+    try:
+        return ParsedDocument.objects.create(
+            sha256=sha256,
+            parser_version=DocumentProcessor.PARSER_VERSION,
+            text_file=text_file,
+            content_preview=parsed_content[:PREVIEW_LENGTH],
+            char_count=len(parsed_content),
+            word_count=len(parsed_content.split())
+        )
+    except IntegrityError:
+        return find_parsed_document(sha256)
+
+
+def read_parsed_text(parsed_document):
+    response = get_s3_client().get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=parsed_document.text_file)
+    return response['Body'].read().decode('utf-8')
+
+
+def evict_parsed_documents(now=None):
+    """
+    Drop index entries of superseded parser versions and entries unused for PARSED_DOCUMENT_RETENTION_DAYS.
+    The text objects stay in S3 because microapps keep referencing them; an evicted file is simply parsed
+    again (and its text rewritten to the same key) the next time it is uploaded. Returns the entries removed.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=MicroappVariables.PARSED_DOCUMENT_RETENTION_DAYS)
+    deleted, _ = ParsedDocument.objects.filter(
+        ~Q(parser_version=DocumentProcessor.PARSER_VERSION) | Q(last_used_at__lt=cutoff)
+    ).delete()
+    return deleted
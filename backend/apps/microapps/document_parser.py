@@ -1,89 +1,206 @@
 import os
+import io
+import threading
+import multiprocessing
+import logging as log
 import pytesseract
 import pandas as pd
 import fitz  # PyMuPDF for PDFs
 import pdfplumber
 import docx
 import csv
-from PIL import Image
+import openpyxl
+from docx.table import Table
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageSequence
 from pptx import Presentation
 from abc import ABC, abstractmethod
+from apps.utils.global_variables import MicroappVariables
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """
+    The process pool OCR pages are sent to, shared by every request in the process and bounded by OCR_MAX_WORKERS.
+    Workers are spawned rather than forked so they don't inherit the web worker's threads and open connections.
+    """
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                _ocr_pool = ProcessPoolExecutor(
+                    max_workers=MicroappVariables.OCR_MAX_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _ocr_pool
+
+
+def reset_ocr_pool():
+    """Drop a broken pool (e.g. a worker was OOM-killed) so the next document gets a fresh one"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False, cancel_futures=True)
+            _ocr_pool = None
+
+
+def ocr_pdf_page(file_path, page_number):
+    """Rasterize one PDF page with PyMuPDF and OCR it. Runs in the OCR pool, so it opens the file itself."""
+    with fitz.open(file_path) as doc:
+        png = doc[page_number].get_pixmap(dpi=MicroappVariables.OCR_DPI).tobytes("png")
+    image = Image.open(io.BytesIO(png))
+    return pytesseract.image_to_string(image).strip()
+
+
+def ocr_pdf_pages(file_path, page_numbers):
+    """OCR the given pages in the pool, returning their text in the order of page_numbers"""
+    if not page_numbers:
+        return []
+    try:
+        return list(get_ocr_pool().map(ocr_pdf_page, [file_path] * len(page_numbers), page_numbers))
+    except BrokenProcessPool as e:
+        log.error(f"OCR pool broke while parsing {file_path}: {e}")
+        reset_ocr_pool()
+        return [""] * len(page_numbers)
 
 # Abstract Class for Document Parsers
 class DocumentParser(ABC):
-    """Abstract base class for document parsers."""
+    """
+    Abstract base class for document parsers.
+
+    Parsers yield the text of a document piece by piece (pages, paragraphs, rows, slides) so extraction can stop
+    as soon as the caller's character budget is spent, keeping memory and CPU proportional to the text kept.
+    """
     @abstractmethod
-    def extract_text(self, file_path):
+    def iter_text(self, file_path):
         pass
 
+    def extract_text(self, file_path, max_chars=None):
+        """The document's text, cut off at max_chars characters when a budget is given"""
+        parts = []
+        size = 0
+        for part in self.iter_text(file_path):
+            parts.append(part)
+            size += len(part) + 1
+            if max_chars is not None and size > max_chars:
+                break
+        text = "\n".join(parts).strip()
+        return text if max_chars is None else text[:max_chars]
+
 # PDF Parser (Handles Normal and Scanned PDFs)
 class PDFParser(DocumentParser):
-    def extract_text(self, file_path):
-        text = ""
+    def __init__(self, ocr_all_pages=False):
+        self.ocr_all_pages = ocr_all_pages
+
+    def iter_text(self, file_path):
+        """
+        Yield the text of each page in page order. Pages are read in windows: the native text of every page
+        in the window is kept, and pages without any (scanned pages) are OCR'd together in the OCR pool.
+        """
         try:
             doc = fitz.open(file_path)
-            text = "\n".join([page.get_text("text") for page in doc])
-        except Exception:
-            pass
-        if not text.strip():
+        except Exception as e:
+            # PyMuPDF can't open the file at all, so there is nothing to rasterize either
+            log.error(f"PyMuPDF failed to open {file_path}: {e}")
             try:
                 with pdfplumber.open(file_path) as pdf:
-                    text = "\n".join([page.extract_text() or "" for page in pdf.pages])
+                    for page in pdf.pages:
+                        yield page.extract_text() or ""
             except Exception:
-                pass
-        if not text.strip():
-            text = OCRParser().extract_text(file_path)  # Use OCR for scanned PDFs
-        return text.strip()
+                return
+            return
+
+        with doc:
+            window = max(MicroappVariables.OCR_MAX_WORKERS, 1)
+            for first_page in range(0, doc.page_count, window):
+                page_numbers = range(first_page, min(first_page + window, doc.page_count))
+                pages = {
+                    page_number: "" if self.ocr_all_pages else doc[page_number].get_text("text")
+                    for page_number in page_numbers
+                }
+                scanned = [page_number for page_number, text in pages.items() if not text.strip()]
+                pages.update(zip(scanned, ocr_pdf_pages(file_path, scanned)))
+                for page_number in page_numbers:
+                    yield pages[page_number]
 
 # Word Document Parser
 class WordParser(DocumentParser):
-    def extract_text(self, file_path):
+    def iter_text(self, file_path):
+        """Paragraphs and tables in document order, one tab-separated line per table row"""
         doc = docx.Document(file_path)
-        return "\n".join([para.text for para in doc.paragraphs]).strip()
+        for block in doc.iter_inner_content():
+            if isinstance(block, Table):
+                for row in block.rows:
+                    yield "\t".join(cell.text for cell in row.cells)
+            else:
+                yield block.text
 
 # Excel Parser (Handles XLSX, CSV)
 class ExcelParser(DocumentParser):
-    def extract_text(self, file_path):
-        text = []
+    def iter_text(self, file_path):
+        """One tab-separated line per row, streamed from the file rather than loaded whole"""
         if file_path.endswith(".csv"):
-            with open(file_path, "r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                text = ["\t".join(row) for row in reader]
+            with open(file_path, "r", encoding="utf-8", newline="") as file:
+                for row in csv.reader(file):
+                    yield "\t".join(row)
+        elif file_path.endswith(".xlsx"):
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    yield f"--- Sheet: {sheet.title} ---"
+                    for row in sheet.iter_rows(values_only=True):
+                        yield "\t".join("" if value is None else str(value) for value in row)
+            finally:
+                # Read-only workbooks keep the file open until closed
+                workbook.close()
         else:
-            df = pd.read_excel(file_path, sheet_name=None)
-            for sheet_name, sheet_data in df.items():
-                text.append(f"--- Sheet: {sheet_name} ---")
-                text.append(sheet_data.to_string(index=False, header=True))
-        return "\n".join(text).strip()
+            # openpyxl can't read legacy .xls files
+            for sheet_name, sheet_data in pd.read_excel(file_path, sheet_name=None).items():
+                yield f"--- Sheet: {sheet_name} ---"
+                yield sheet_data.to_string(index=False, header=True)
 
 # Text File Parser
 class TextParser(DocumentParser):
-    def extract_text(self, file_path):
+    def iter_text(self, file_path):
         with open(file_path, "r", encoding="utf-8") as file:
-            return file.read().strip()
+            for line in file:
+                yield line.rstrip("\n")
 
 # PowerPoint Parser
 class PowerPointParser(DocumentParser):
-    def extract_text(self, file_path):
+    def iter_text(self, file_path):
+        """The text of each slide's shapes, followed by its speaker notes"""
         prs = Presentation(file_path)
-        text = []
         for slide in prs.slides:
             for shape in slide.shapes:
                 if hasattr(shape, "text"):
-                    text.append(shape.text)
-        return "\n".join(text).strip()
+                    yield shape.text
+            if slide.has_notes_slide:
+                notes = slide.notes_slide.notes_text_frame.text
+                if notes.strip():
+                    yield f"Notes: {notes}"
 
 # OCR Parser (Handles Images and Scanned PDFs)
 class OCRParser(DocumentParser):
-    def extract_text(self, file_path):
-        image = Image.open(file_path)
-        return pytesseract.image_to_string(image).strip()
+    def iter_text(self, file_path):
+        if file_path.lower().endswith(".pdf"):
+            yield from PDFParser(ocr_all_pages=True).iter_text(file_path)
+            return
+        # Multi-page TIFFs have one frame per page
+        with Image.open(file_path) as image:
+            for frame in ImageSequence.Iterator(image):
+                yield pytesseract.image_to_string(frame.convert("RGB")).strip()
 
 # Context Class for Document Processing and Validation
 class DocumentProcessor:
     """Determines the appropriate parser for a document and validates file type and size."""
 
     MAX_FILE_SIZE_MB = 10  # 10MB limit
+    # Bump whenever a parser's output changes, so text cached by file content (document_cache) is re-extracted
+    PARSER_VERSION = 2
 
     def __init__(self):
         self.parsers = {
@@ -105,8 +222,12 @@ class DocumentProcessor:
 
     def validate_file(self, file_path):
         """Checks if file type is supported and size is within limit."""
-        ext = os.path.splitext(file_path)[1].lower()
-        file_size_mb = os.path.getsize(file_path) / (1024 * 1024)  # Convert to MB
+        return self.validate_upload(file_path, os.path.getsize(file_path))
+
+    def validate_upload(self, filename, size):
+        """Checks the type and size (in bytes) of an upload before it is stored or parsed."""
+        ext = os.path.splitext(filename)[1].lower()
+        file_size_mb = size / (1024 * 1024)  # Convert to MB
 
         if ext not in self.parsers:
             return f"Error: Unsupported file format ({ext})"
@@ -116,8 +237,8 @@ class DocumentProcessor:
 
         return "valid"
 
-    def extract_text(self, file_path):
-        """Validates and extracts text from the file."""
+    def extract_text(self, file_path, max_chars=None):
+        """Validates and extracts text from the file, stopping once max_chars characters have been extracted."""
         validation_result = self.validate_file(file_path)
         if validation_result != "valid":
             return validation_result
@@ -126,6 +247,6 @@ class DocumentProcessor:
         parser = self.parsers.get(ext)
 
         if parser:
-            return parser.extract_text(file_path)
+            return parser.extract_text(file_path, max_chars=max_chars)
         else:
             return "Unsupported file format"
\ No newline at end of file
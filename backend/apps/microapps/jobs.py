@@ -0,0 +1,94 @@
+"""
+Background jobs that parse uploaded documents (see apps.jobs.queue). The upload views store the file in S3
+and enqueue one of these, so parsing and OCR never run inside a web request. The run rollups behind the
+app statistics are also brought up to date here, periodically.
+"""
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from apps.jobs.queue import JobError, register
+from apps.microapps.document_cache import find_parsed_document, store_parsed_document, upload_result
+from apps.microapps.document_parser import DocumentProcessor
+from apps.microapps.rollups import rollup_runs
+from apps.utils.clients import get_s3_client
+from apps.utils.global_variables import JobVariables, MicroappVariables
+
+PARSE_UPLOAD = "microapps.parse_upload"
+PARSE_FILE = "microapps.parse_file"
+ROLLUP_RUNS = "microapps.rollup_runs"
+
+
+@contextmanager
+def download_s3_object(file_key, filename):
+    """Download a stored upload to a temp file for the parsers"""
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1]) as temp_file:
+        get_s3_client().download_fileobj(settings.AWS_STORAGE_BUCKET_NAME, file_key, temp_file)
+        temp_file.flush()
+        yield temp_file.name
+
+
+def parse_path(file_path, max_chars=None):
+    processor = DocumentProcessor()
+    validation_result = processor.validate_file(file_path)
+    if validation_result != "valid":
+        raise JobError(validation_result)
+    return processor.extract_text(file_path, max_chars=max_chars)
+
+
+def parse_s3_object(file_key, filename, max_chars=None):
+    """Download an uploaded document to a temp file and extract at most max_chars characters of its text"""
+    with download_s3_object(file_key, filename) as file_path:
+        return parse_path(file_path, max_chars=max_chars)
+
+
+@register(PARSE_UPLOAD, timeout=600, concurrency=JobVariables.DOCUMENT_JOB_CONCURRENCY)
+def parse_upload(payload):
+    """Parse a microapp file upload and store its text under its content hash, unless it already is"""
+    sha256 = payload.get("sha256")
+    parsed_document = find_parsed_document(sha256) if sha256 else None
+    if parsed_document is None:
+        with download_s3_object(payload["original_file"], payload["filename"]) as file_path:
+            # Files uploaded straight to S3 never passed through the web tier, so they are hashed here
+            if not sha256:
+                with open(file_path, "rb") as file:
+                    sha256 = hashlib.file_digest(file, "sha256").hexdigest()
+                parsed_document = find_parsed_document(sha256)
+            if parsed_document is None:
+                parsed_document = store_parsed_document(
+                    sha256, parse_path(file_path, max_chars=MicroappVariables.MAX_PARSED_DOCUMENT_CHARS)
+                )
+    return upload_result(parsed_document, payload["original_file"])
+
+
+def delete_stored_file(payload):
+    """Delete the copy of a ParseFile upload stored for its job"""
+    get_s3_client().delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=payload["file_key"])
+
+
+@register(PARSE_FILE, timeout=600, concurrency=JobVariables.DOCUMENT_JOB_CONCURRENCY, on_failure=delete_stored_file)
+def parse_file(payload):
+    """
+    Parse a document for ParseFile. The stored copy is deleted once parsed, or once the job has failed for
+    good; after other errors it is kept so a retry can read it again.
+    """
+    # One character over the limit is enough to reject the file, so parsing stops there
+    parsed_content = parse_s3_object(payload["file_key"], payload["filename"], max_chars=payload["max_chars"] + 1)
+    delete_stored_file(payload)
+
+    if len(parsed_content) > payload["max_chars"]:
+        raise JobError(f"Parsed content exceeds {payload['max_chars']:,} character limit.")
+    return {
+        "text": parsed_content,
+        "word_count": len(parsed_content.split()),
+        "filename": payload["filename"],
+    }
+
+
+@register(ROLLUP_RUNS, timeout=1800, concurrency=1, every=JobVariables.ROLLUP_INTERVAL)
+def rollup_runs_job(payload):
+    """Roll up the runs of the days closed since the last pass (see apps.microapps.rollups)"""
+    return {"days": rollup_runs()}
@@ -1,20 +1,26 @@
-from typing import Dict, Any, Optional
+import asyncio
+import inspect
+from typing import AsyncIterator, BinaryIO, Callable, Dict, Any, Iterator, Optional
 import litellm
 from django.conf import settings
 import logging
-from apps.utils.global_variables import UsageVariables, AIModelConstants
+from apps.utils.global_variables import UsageVariables, AIModelConstants, AIModelDefaults, PromptCacheVariables
 import re
-import tempfile
-import os
 from pathlib import Path
-from litellm import speech
+from apps.utils.clients import configure_llm_clients
+from apps.microapps.provider_guard import ProviderUnavailable
+from apps.microapps.provider_quota import CHARS_PER_TOKEN, aprovider_call, estimate_tokens, message_chars, provider_call
 
 log = logging.getLogger(__name__)
 
+configure_llm_clients()
+
 class UnifiedLLMInterface:
     """
     A unified interface for all LLM providers using litellm
     """
+
+    _instances: Dict[str, "UnifiedLLMInterface"] = {}
     
     def __init__(self, model_config: Dict[str, Any]):
         """
@@ -30,16 +36,38 @@ class UnifiedLLMInterface:
         """
         self.model_config = model_config
         self.model_name = model_config.get('model', '')
-        self.model_family = AIModelConstants.get_model_family(self.model_name)
+        self.model_family = model_config.get("family", "")
         
-        # Set the API key for the model provider
-        litellm.api_key = model_config.get("api_key")
+        # The API key is passed with every call, so interfaces for different providers can live side by side
+        self.api_key = model_config.get("api_key")
         
-        # Use our new inheritance logic to get all defaults and overrides
-        self.default_params = AIModelConstants.get_configs(self.model_name)
+        # The resolved config already carries the inheritance chain, keep only the request parameters
+        self.default_params = {key: model_config[key] for key in AIModelDefaults.BASE_DEFAULTS}
         # Ensure the model path is set correctly for API calls
         self.default_params["model"] = model_config.get("model")
 
+    def provider_call(self, params: Dict[str, Any]):
+        """Wait for the provider key's quota, then guard the call with its circuit breaker"""
+        return provider_call(self.model_family, self.api_key, estimate_tokens(params))
+
+    def aprovider_call(self, params: Dict[str, Any]):
+        return aprovider_call(self.model_family, self.api_key, estimate_tokens(params))
+
+    @classmethod
+    def for_model(cls, model_name: str) -> "UnifiedLLMInterface":
+        """
+        Get the shared interface for a model.
+
+        Interfaces hold no per-request state, so one instance per configured model is reused for the
+        life of the process. Unknown model names get a throwaway instance built from the base defaults.
+        """
+        if not AIModelConstants.is_supported(model_name):
+            return cls(AIModelConstants.get_configs(model_name))
+        interface = cls._instances.get(model_name)
+        if interface is None:
+            interface = cls._instances.setdefault(model_name, cls(AIModelConstants.get_configs(model_name)))
+        return interface
+
     def validate_params(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate the parameters for the model"""
         try:
@@ -99,49 +127,233 @@ class UnifiedLLMInterface:
             log.error(e)
             return []
 
+    def cache_breakpoints(self, messages: list) -> list:
+        """
+        Mark the stable prefix of the prompt for providers that only cache at explicit breakpoints (Anthropic).
+
+        Runs send the system prompt, then the context documents, then the conversation so far, and only the
+        final user message changes from one turn to the next. A cache_control breakpoint goes after each of
+        those once the prefix up to it is long enough to be cached. Other providers cache identical prefixes
+        automatically, so their messages are returned unchanged. The stored run prompt is never modified.
+        """
+        if self.model_family not in PromptCacheVariables.CACHE_CONTROL_FAMILIES or len(messages) < 2:
+            return messages
+
+        prefix_chars = 0
+        breakpoints = []
+        for index, message in enumerate(messages[:-1]):
+            prefix_chars += message_chars(message)
+            is_stable = (
+                message.get("role") == "system"
+                or str(message.get("content", "")).startswith("Context Documents:")
+                or index == len(messages) - 2
+            )
+            if is_stable and prefix_chars // CHARS_PER_TOKEN >= PromptCacheVariables.MIN_PREFIX_TOKENS:
+                breakpoints.append(index)
+
+        marked = list(messages)
+        for index in breakpoints[-PromptCacheVariables.MAX_BREAKPOINTS:]:
+            message = messages[index]
+            content = message.get("content")
+            if isinstance(content, list):
+                content = [*content[:-1], {**content[-1], "cache_control": {"type": "ephemeral"}}]
+            else:
+                content = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+            marked[index] = {**message, "content": content}
+        return marked
+
     def get_response(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Get response from the model"""
         try:
             # Make the API call using litellm
-            response = litellm.completion(
-                model=params["model"],
-                messages=params["messages"],
-                temperature=params["temperature"],
-                top_p=params["top_p"],
-                max_tokens=params["max_tokens"],
-                presence_penalty=params["presence_penalty"],
-                frequency_penalty=params["frequency_penalty"],
-                stream=params["stream"],
-                drop_params=True
-            )
+            with self.provider_call(params):
+                response = litellm.completion(**self.build_completion_params(params))
 
-            # Extract usage information
-            usage = response.usage
-            
-            # Calculate costs
-            llm_cost = response._hidden_params["response_cost"]
-            transcription_cost = float(params.get("transcription_cost", 0))
-            total_cost = round(llm_cost + transcription_cost, 6)
-            
-            # Calculate credits (assuming 1 credit = $0.0001)
-            credits = self.calculate_credits(total_cost)
+            return {
+                "status": True,
+                "data": self.build_response_data(
+                    response.choices[0].message.content,
+                    response.usage,
+                    response._hidden_params["response_cost"],
+                    params
+                )
+            }
             
+        except ProviderUnavailable as e:
+            log.warning(f"Not calling {self.model_name}: {str(e)}")
+            return {"status": False, "message": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            log.error(f"Error getting response from {self.model_name}: {str(e)}")
+            return {"status": False, "message": str(e)}
+
+    async def aget_response(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Get response from the model without blocking the event loop"""
+        try:
+            async with self.aprovider_call(params):
+                response = await litellm.acompletion(**self.build_completion_params(params))
+
             return {
                 "status": True,
-                "data": {
-                    "ai_response": response.choices[0].message.content,
-                    "prompt_tokens": usage.prompt_tokens,
-                    "completion_tokens": usage.completion_tokens,
-                    "total_tokens": usage.total_tokens,
-                    "cost": total_cost,
-                    "credits": credits,
-                }
+                "data": self.build_response_data(
+                    response.choices[0].message.content,
+                    response.usage,
+                    response._hidden_params["response_cost"],
+                    params
+                )
             }
             
+        except ProviderUnavailable as e:
+            log.warning(f"Not calling {self.model_name}: {str(e)}")
+            return {"status": False, "message": str(e), "retry_after": e.retry_after}
         except Exception as e:
             log.error(f"Error getting response from {self.model_name}: {str(e)}")
             return {"status": False, "message": str(e)}
 
+    def build_completion_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the litellm completion arguments from the API parameters"""
+        return {
+            "model": params["model"],
+            "messages": self.cache_breakpoints(params["messages"]),
+            "temperature": params["temperature"],
+            "top_p": params["top_p"],
+            "max_tokens": params["max_tokens"],
+            "presence_penalty": params["presence_penalty"],
+            "frequency_penalty": params["frequency_penalty"],
+            "stream": params["stream"],
+            "api_key": self.api_key,
+            "timeout": params.get("timeout", settings.LLM_HTTP_TIMEOUT),
+            "drop_params": True
+        }
+
+    def stream_response(self, params: Dict[str, Any], on_close: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the response from the model as it is generated.
+        
+        Args:
+            params: Dictionary containing API parameters
+            on_close: Called with the usage of the tokens received so far when the stream is closed before it ends
+            
+        Yields:
+            Dictionaries with a "type" key:
+                - token: a content delta in "content"
+                - done: the final usage in "data", in the same shape as get_response
+                - error: the provider error in "message", plus "retry_after" seconds when the provider guard refused the call
+        """
+        chunks = []
+        try:
+            # The call holds its slot until the stream is fully read
+            with self.provider_call(params):
+                response = litellm.completion(
+                    **{**self.build_completion_params(params), "stream": True},
+                    stream_options={"include_usage": True}
+                )
+
+                try:
+                    for chunk in response:
+                        chunks.append(chunk)
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield {"type": "token", "content": chunk.choices[0].delta.content}
+                except GeneratorExit:
+                    # The client went away: stop the provider generating and report what was already produced
+                    self.close_stream(response)
+                    self.report_partial_stream(chunks, params, on_close)
+                    raise
+
+            yield {"type": "done", "data": self.streamed_response_data(chunks, params)}
+
+        except ProviderUnavailable as e:
+            log.warning(f"Not calling {self.model_name}: {str(e)}")
+            yield {"type": "error", "message": str(e), "retry_after": e.retry_after}
+
+        except Exception as e:
+            log.error(f"Error streaming response from {self.model_name}: {str(e)}")
+            yield {"type": "error", "message": str(e)}
+
+    async def astream_response(self, params: Dict[str, Any], on_close: Optional[Callable[[Dict[str, Any]], None]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of stream_response; a cancelled request closes the stream like a closed generator"""
+        chunks = []
+        try:
+            async with self.aprovider_call(params):
+                response = await litellm.acompletion(
+                    **{**self.build_completion_params(params), "stream": True},
+                    stream_options={"include_usage": True}
+                )
+
+                try:
+                    async for chunk in response:
+                        chunks.append(chunk)
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield {"type": "token", "content": chunk.choices[0].delta.content}
+                except (GeneratorExit, asyncio.CancelledError):
+                    await self.aclose_stream(response)
+                    self.report_partial_stream(chunks, params, on_close)
+                    raise
+
+            yield {"type": "done", "data": self.streamed_response_data(chunks, params)}
+
+        except ProviderUnavailable as e:
+            log.warning(f"Not calling {self.model_name}: {str(e)}")
+            yield {"type": "error", "message": str(e), "retry_after": e.retry_after}
+
+        except Exception as e:
+            log.error(f"Error streaming response from {self.model_name}: {str(e)}")
+            yield {"type": "error", "message": str(e)}
+
+    def streamed_response_data(self, chunks: list, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild the full completion from its chunks, so usage and cost match the non-streaming path"""
+        completion = litellm.stream_chunk_builder(chunks, messages=params["messages"])
+        llm_cost = litellm.completion_cost(completion_response=completion)
+        return self.build_response_data(completion.choices[0].message.content or "", completion.usage, llm_cost, params)
+
+    def report_partial_stream(self, chunks: list, params: Dict[str, Any], on_close: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+        """Pass the usage of a stream closed part way to on_close; nothing was generated when no chunk arrived"""
+        if on_close is None or not chunks:
+            return
+        try:
+            on_close(self.streamed_response_data(chunks, params))
+        except Exception as e:
+            log.error(f"Could not price the partial stream from {self.model_name}: {str(e)}")
+
+    def close_stream(self, response: Any) -> None:
+        """Close the provider's HTTP stream, so the provider stops generating tokens nobody will read"""
+        try:
+            getattr(response, "completion_stream", response).close()
+        except Exception as e:
+            log.warning(f"Could not close the stream from {self.model_name}: {str(e)}")
+
+    async def aclose_stream(self, response: Any) -> None:
+        """Async counterpart of close_stream; async provider streams close with a coroutine"""
+        try:
+            stream = getattr(response, "completion_stream", response)
+            closed = stream.aclose() if hasattr(stream, "aclose") else stream.close()
+            if inspect.isawaitable(closed):
+                await closed
+        except Exception as e:
+            log.warning(f"Could not close the stream from {self.model_name}: {str(e)}")
+
+    def build_response_data(self, content: str, usage: Any, llm_cost: float, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the run usage data from a completion's content, usage and cost"""
+        transcription_cost = float(params.get("transcription_cost", 0))
+        total_cost = round(llm_cost + transcription_cost, 6)
+        
+        # Calculate credits (assuming 1 credit = $0.0001)
+        credits = self.calculate_credits(total_cost)
+
+        return {
+            "ai_response": content,
+            "prompt_tokens": usage.prompt_tokens,
+            "cached_tokens": self.cached_prompt_tokens(usage),
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+            "cost": total_cost,
+            "credits": credits,
+        }
+
+    def cached_prompt_tokens(self, usage: Any) -> int:
+        """Prompt tokens read from the provider's prompt cache; litellm reports them per provider in either field"""
+        details = getattr(usage, "prompt_tokens_details", None)
+        return getattr(details, "cached_tokens", None) or getattr(usage, "cache_read_input_tokens", None) or 0
+
     def calculate_credits(self, cost: float) -> int:
         """Calculate credits from cost (1 credit = $0.0001)"""
         credits = max(int(cost * UsageVariables.CREDITS_MULTIPLIER), UsageVariables.MINIMUM_CREDITS)
@@ -157,6 +369,7 @@ class UnifiedLLMInterface:
             
         Returns:
             Dictionary containing:
+                - status: True, or False with the error in "message"
                 - completion_tokens: Number of tokens in completion
                 - prompt_tokens: Number of tokens in prompt
                 - total_tokens: Total tokens used
@@ -164,41 +377,53 @@ class UnifiedLLMInterface:
                 - score_result: Boolean indicating if score meets minimum
         """
         try:
-            response = litellm.completion(
-                model=api_params["model"],
-                messages=api_params["messages"],
-                temperature=api_params["temperature"],
-                top_p=api_params["top_p"],
-                max_tokens=api_params["max_tokens"],
-                presence_penalty=api_params["presence_penalty"],
-                frequency_penalty=api_params["frequency_penalty"],
-                stream=api_params["stream"],
-                drop_params=True
-            )
+            with self.provider_call(api_params):
+                response = litellm.completion(**self.build_completion_params(api_params))
+            return self.build_score_data(response, minimum_score)
             
-            usage = response.usage
-            total_cost = response._hidden_params["response_cost"]
-            credits = self.calculate_credits(total_cost)
-            ai_score = response.choices[0].message.content
-            score_result = False
-            
-            if self.extract_score(ai_score) >= minimum_score:
-                score_result = True
-                
-            return {
-                "prompt_tokens": usage.prompt_tokens,
-                "completion_tokens": usage.completion_tokens,
-                "total_tokens": usage.total_tokens,
-                "cost": total_cost,
-                "credits": credits,
-                "ai_score": ai_score,
-                "score_result": score_result
-            }
+        except ProviderUnavailable as e:
+            log.warning(f"Not calling {self.model_name}: {str(e)}")
+            return {"status": False, "message": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            log.error(f"Error getting scored response: {str(e)}")
+            return {"status": False, "message": str(e)}
+
+    async def ascore_response(self, api_params: Dict[str, Any], minimum_score: float) -> Dict[str, Any]:
+        """Get a scored response from the model without blocking the event loop"""
+        try:
+            async with self.aprovider_call(api_params):
+                response = await litellm.acompletion(**self.build_completion_params(api_params))
+            return self.build_score_data(response, minimum_score)
             
+        except ProviderUnavailable as e:
+            log.warning(f"Not calling {self.model_name}: {str(e)}")
+            return {"status": False, "message": str(e), "retry_after": e.retry_after}
         except Exception as e:
             log.error(f"Error getting scored response: {str(e)}")
             return {"status": False, "message": str(e)}
 
+    def build_score_data(self, response: Any, minimum_score: float) -> Dict[str, Any]:
+        """Build the score usage data from a scoring completion"""
+        usage = response.usage
+        total_cost = response._hidden_params["response_cost"]
+        credits = self.calculate_credits(total_cost)
+        ai_score = response.choices[0].message.content
+        score_result = False
+        
+        if self.extract_score(ai_score) >= minimum_score:
+            score_result = True
+            
+        return {
+            "status": True,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+            "cost": total_cost,
+            "credits": credits,
+            "ai_score": ai_score,
+            "score_result": score_result
+        }
+
     def extract_score(self, response: str) -> int:
         """
         Extract the total score from a JSON-formatted response string.
@@ -244,12 +469,13 @@ class UnifiedLLMInterface:
             log.error(f"Error building instruction: {str(e)}")
             return messages
 
-    def transcribe_audio(self, audio_file: bytes) -> Dict[str, Any]:
+    def transcribe_audio(self, audio_file: BinaryIO, filename: str = "audio.wav") -> Dict[str, Any]:
         """
         Transcribe audio using LiteLLM's Whisper implementation.
         
         Args:
-            audio_file: The audio file content in bytes
+            audio_file: An open binary file (e.g. the uploaded file), streamed to the provider as it is read
+            filename: The name sent with the file, so the provider can infer the format from its extension
             
         Returns:
             Dictionary containing:
@@ -259,43 +485,55 @@ class UnifiedLLMInterface:
                     - cost: The cost of the transcription
         """
         try:
-            # Create a temporary file to ensure proper file handling
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_file.write(audio_file)
-                temp_file.flush()
-                
-                # Open the file in binary read mode for the API call
-                with open(temp_file.name, 'rb') as file:
-                    # Make the API call using litellm with the file object
-                    response = litellm.transcription(
-                        model="whisper-1",
-                        file=file
-                    )
-
-                    # Debug logging
-                    log.debug(f"LiteLLM response: {response}")
-
-                    # Extract usage information and cost
-                    total_cost = response._hidden_params["response_cost"]
-                    
-                    return {
-                        "status": True,
-                        "data": {
-                            "text": response.text,
-                            "cost": total_cost
-                        }
-                    }
+            # Transcriptions are budgeted as requests only; their tokens aren't known up front
+            with provider_call(self.model_family, self.api_key):
+                response = litellm.transcription(
+                    model="whisper-1",
+                    file=(filename, audio_file),
+                    api_key=self.api_key
+                )
+
+            # Debug logging
+            log.debug(f"LiteLLM response: {response}")
+
+            # Extract usage information and cost
+            total_cost = response._hidden_params["response_cost"]
+            
+            return {
+                "status": True,
+                "data": {
+                    "text": response.text,
+                    "cost": total_cost
+                }
+            }
             
         except Exception as e:
             log.error(f"Error transcribing audio: {str(e)}")
             return {"status": False, "message": str(e)}
-        finally:
-            # Clean up the temporary file
-            if 'temp_file' in locals():
-                try:
-                    os.unlink(temp_file.name)
-                except Exception as e:
-                    log.error(f"Error cleaning up temporary file: {str(e)}")
+
+    async def atranscribe_audio(self, audio_file: BinaryIO, filename: str = "audio.wav") -> Dict[str, Any]:
+        """Transcribe audio using LiteLLM's Whisper implementation without blocking the event loop"""
+        try:
+            async with aprovider_call(self.model_family, self.api_key):
+                response = await litellm.atranscription(
+                    model="whisper-1",
+                    file=(filename, audio_file),
+                    api_key=self.api_key
+                )
+
+            log.debug(f"LiteLLM response: {response}")
+
+            return {
+                "status": True,
+                "data": {
+                    "text": response.text,
+                    "cost": response._hidden_params["response_cost"]
+                }
+            }
+
+        except Exception as e:
+            log.error(f"Error transcribing audio: {str(e)}")
+            return {"status": False, "message": str(e)}
 
     def text_to_speech(self, text: str, voice: str = 'alloy', instructions: Optional[str] = None) -> bytes:
         """
@@ -313,20 +551,17 @@ class UnifiedLLMInterface:
             # Get model config
             model_config = AIModelConstants.get_configs('gpt-4o-mini-tts')
             
-            # Set API key from config
-            os.environ["OPENAI_API_KEY"] = model_config.get('api_key', '')
+            # Make the TTS request, passing the key with the call rather than through the environment
+            with provider_call(model_config.get("family"), model_config.get('api_key', ''), len(text) // CHARS_PER_TOKEN):
+                response = litellm.speech(
+                    model="openai/gpt-4o-mini-tts",
+                    voice=voice,
+                    input=text,
+                    instructions=instructions,
+                    api_key=model_config.get('api_key', '')
+                )
             
-            # Make the TTS request
-            response = speech(
-                model="openai/gpt-4o-mini-tts",
-                voice=voice,
-                input=text,
-                instructions=instructions
-            )
-            
-            # Get the audio data
-            print("RESPONSE", response)
-            print("HIDDEN PARAMS", response._hidden_params)
+            log.debug(f"TTS response cost: {response._hidden_params.get('response_cost')}")
 
             audio_data = response.content
             
@@ -334,4 +569,24 @@ class UnifiedLLMInterface:
             
         except Exception as e:
             log.error(f"Error in text_to_speech: {str(e)}")
-            raise e
\ No newline at end of file
+            raise e
+
+    async def atext_to_speech(self, text: str, voice: str = 'alloy', instructions: Optional[str] = None) -> bytes:
+        """Convert text to speech using OpenAI's TTS model without blocking the event loop"""
+        try:
+            model_config = AIModelConstants.get_configs('gpt-4o-mini-tts')
+
+            async with aprovider_call(model_config.get("family"), model_config.get('api_key', ''), len(text) // CHARS_PER_TOKEN):
+                response = await litellm.aspeech(
+                    model="openai/gpt-4o-mini-tts",
+                    voice=voice,
+                    input=text,
+                    instructions=instructions,
+                    api_key=model_config.get('api_key', '')
+                )
+
+            return response.content
+
+        except Exception as e:
+            log.error(f"Error in text_to_speech: {str(e)}")
+            raise e
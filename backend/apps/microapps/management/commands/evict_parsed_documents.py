@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.microapps.document_cache import evict_parsed_documents
+
+
+class Command(BaseCommand):
+    help = "Removes stale entries from the parsed document index. Run it periodically (e.g. daily)."
+
+    def handle(self, **options):
+        deleted = evict_parsed_documents()
+        print(f"Evicted {deleted} parsed document(s)")
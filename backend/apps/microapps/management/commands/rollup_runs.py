@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.microapps.rollups import rollup_runs
+
+
+class Command(BaseCommand):
+    help = (
+        "Rolls up closed days of runs into RunDailyRollup for the app statistics. "
+        "The job workers (run_jobs) already do this every ROLLUP_INTERVAL seconds; use this to catch up by hand."
+    )
+
+    def handle(self, **options):
+        days = rollup_runs()
+        print(f"Rolled up {days} day(s) of runs")
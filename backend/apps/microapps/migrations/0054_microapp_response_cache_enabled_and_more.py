@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microapps', '0053_run_run_uuid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='microapp',
+            name='response_cache_enabled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='run',
+            name='response_type',
+            field=models.CharField(choices=[('AI', 'AI'), ('Error', 'Error'), ('Fixed_Response', 'Fixed Response'), ('Cached_Response', 'Cached Response')], default='AI', max_length=20),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-17 11:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('microapps', '0054_microapp_response_cache_enabled_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='run',
+            index=models.Index(fields=['owner_id', 'ma_id', 'timestamp'], name='run_owner_ma_ts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='run',
+            index=models.Index(fields=['session_id', 'timestamp'], name='run_session_ts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='run',
+            index=models.Index(fields=['app_hash_id'], name='run_app_hash_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='run',
+            index=models.Index(condition=models.Q(('user_id__isnull', True)), fields=['user_ip', 'timestamp'], name='run_guest_ip_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('microapps', '0055_run_analytics_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RunRollupCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('rolled_through', models.DateField(blank=True, null=True)),
+                ('changes_through', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RunDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_hash_id', models.CharField(blank=True, max_length=50)),
+                ('day', models.DateField()),
+                ('run_count', models.IntegerField(default=0)),
+                ('thumbs_up_count', models.IntegerField(default=0)),
+                ('thumbs_down_count', models.IntegerField(default=0)),
+                ('total_cost', models.DecimalField(decimal_places=6, default=0, max_digits=20)),
+                ('total_credits', models.BigIntegerField(default=0)),
+                ('user_ip_sketch', models.BinaryField()),
+                ('session_sketch', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ma_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='microapps.microapp')),
+                ('owner_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='run_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='run_rollup_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner_id', 'ma_id', 'app_hash_id', 'day'), name='run_rollup_unique_app_day')],
+            },
+        ),
+        AddIndexConcurrently(
+            model_name='run',
+            index=models.Index(fields=['updated_at'], name='run_updated_at_idx'),
+        ),
+    ]
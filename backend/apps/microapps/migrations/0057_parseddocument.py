@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microapps', '0056_rundailyrollup_runrollupcheckpoint_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParsedDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64)),
+                ('parser_version', models.PositiveIntegerField()),
+                ('text_file', models.CharField(max_length=255)),
+                ('content_preview', models.TextField(blank=True, default='')),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('word_count', models.PositiveIntegerField(default=0)),
+                ('use_count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_used_at'], name='parsed_document_last_used_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sha256', 'parser_version'), name='unique_parsed_document')],
+            },
+        ),
+    ]
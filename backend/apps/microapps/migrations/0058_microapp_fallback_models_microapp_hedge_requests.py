@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microapps', '0057_parseddocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='microapp',
+            name='fallback_models',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='microapp',
+            name='hedge_requests',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microapps', '0058_microapp_fallback_models_microapp_hedge_requests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='run',
+            name='cached_input_tokens',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('microapps', '0059_run_cached_input_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='microapp',
+            name='context_policy',
+            field=models.CharField(choices=[('trim', 'trim'), ('reject', 'reject')], default='trim', max_length=20),
+        ),
+    ]
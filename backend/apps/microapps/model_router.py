@@ -0,0 +1,232 @@
+"""
+Failover and hedging across model providers.
+
+A microapp can list fallback models. When the run's model errors or times out, the run is retried on each
+fallback in turn, so a degraded provider costs one FAILOVER_TIMEOUT instead of the full HTTP timeout.
+With hedging enabled, async runs also call the first fallback once the primary model has taken longer than its
+recent p95 response time, keep whichever successful response arrives first and cancel the other.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import aclosing, closing
+from typing import Any, AsyncIterator, Dict, Iterator
+
+from apps.microapps.llm_interface import UnifiedLLMInterface
+from apps.utils.global_variables import AIModelConstants, ModelRoutingVariables
+
+log = logging.getLogger(__name__)
+
+_latencies = {}
+_latencies_lock = threading.Lock()
+
+
+def record_latency(model_name, seconds):
+    with _latencies_lock:
+        samples = _latencies.get(model_name)
+        if samples is None:
+            samples = _latencies[model_name] = deque(maxlen=ModelRoutingVariables.LATENCY_SAMPLES)
+        samples.append(seconds)
+
+
+def latency_percentile(model_name, percentile):
+    """The model's recent response time at this percentile, or None until HEDGE_MIN_SAMPLES are known"""
+    with _latencies_lock:
+        samples = sorted(_latencies.get(model_name, ()))
+    if len(samples) < ModelRoutingVariables.HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(math.ceil(len(samples) * percentile / 100) - 1, len(samples) - 1)]
+
+
+def clear_latencies():
+    with _latencies_lock:
+        _latencies.clear()
+
+
+def hedge_delay(model_name):
+    """Seconds to wait on a model before hedging: its recent p95, or HEDGE_DEFAULT_DELAY while it is unknown"""
+    delay = latency_percentile(model_name, ModelRoutingVariables.HEDGE_PERCENTILE)
+    if delay is None:
+        delay = ModelRoutingVariables.HEDGE_DEFAULT_DELAY
+    return max(delay, ModelRoutingVariables.HEDGE_MIN_DELAY)
+
+
+def fallback_chain(model_name, fallback_models, plan):
+    """The supported fallback models available on the owner's plan, in order, without the run's own model"""
+    chain = []
+    for fallback in fallback_models or ():
+        if fallback == model_name or fallback in chain:
+            continue
+        if AIModelConstants.is_supported(fallback) and AIModelConstants.is_model_available_for_plan(fallback, plan):
+            chain.append(fallback)
+    return chain[:ModelRoutingVariables.MAX_FALLBACK_MODELS]
+
+
+class ModelRouter:
+    """
+    Stands in for the run's UnifiedLLMInterface and sends completions through a chain of models.
+
+    Parameter validation and defaults are the primary model's; completions, streams and scoring calls fail over.
+    Responses from any model carry the litellm model that produced them in data["model"], so the run records
+    the model that actually answered.
+    """
+
+    def __init__(self, models, hedge=False):
+        self.models = list(models)
+        self.hedge = hedge and len(self.models) > 1
+
+    @classmethod
+    def for_models(cls, model_name, fallback_models, hedge=False):
+        return cls(
+            [UnifiedLLMInterface.for_model(name) for name in [model_name, *fallback_models]],
+            hedge=hedge
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.models[0], name)
+
+    def params_for(self, model, params, last=True):
+        """The run's parameters sent to another model, with the temperature clamped to that model's range"""
+        config = model.model_config
+        temperature = min(max(float(params["temperature"]), config["temperature_min"]), config["temperature_max"])
+        model_params = {**params, "model": config["model"], "temperature": temperature}
+        if not last:
+            model_params["timeout"] = ModelRoutingVariables.FAILOVER_TIMEOUT
+        return model_params
+
+    def timed_response(self, model, params):
+        started = time.monotonic()
+        response = model.get_response(params)
+        if response["status"]:
+            record_latency(model.model_name, time.monotonic() - started)
+            response["data"]["model"] = params["model"]
+        return response
+
+    async def atimed_response(self, model, params):
+        started = time.monotonic()
+        response = await model.aget_response(params)
+        if response["status"]:
+            record_latency(model.model_name, time.monotonic() - started)
+            response["data"]["model"] = params["model"]
+        return response
+
+    def failover_response(self, params, models):
+        response = None
+        for index, model in enumerate(models):
+            response = self.timed_response(model, self.params_for(model, params, last=index == len(models) - 1))
+            if response["status"]:
+                return response
+            log.warning(f"{model.model_name} failed, trying the next model: {response['message']}")
+        return response
+
+    async def afailover_response(self, params, models):
+        response = None
+        for index, model in enumerate(models):
+            response = await self.atimed_response(model, self.params_for(model, params, last=index == len(models) - 1))
+            if response["status"]:
+                return response
+            log.warning(f"{model.model_name} failed, trying the next model: {response['message']}")
+        return response
+
+    def score_response(self, api_params: Dict[str, Any], minimum_score: float) -> Dict[str, Any]:
+        """Score with the first model in the chain that answers; scoring calls are never hedged"""
+        response = None
+        for index, model in enumerate(self.models):
+            response = model.score_response(self.params_for(model, api_params, last=index == len(self.models) - 1), minimum_score)
+            if response["status"]:
+                return response
+            log.warning(f"{model.model_name} failed to score, trying the next model: {response['message']}")
+        return response
+
+    async def ascore_response(self, api_params: Dict[str, Any], minimum_score: float) -> Dict[str, Any]:
+        response = None
+        for index, model in enumerate(self.models):
+            response = await model.ascore_response(self.params_for(model, api_params, last=index == len(self.models) - 1), minimum_score)
+            if response["status"]:
+                return response
+            log.warning(f"{model.model_name} failed to score, trying the next model: {response['message']}")
+        return response
+
+    def get_response(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fail over without hedging. A hedge on a worker thread can't be cancelled, so the losing call would keep
+        its provider slot and spend; only the async path, which cancels the loser, hedges.
+        """
+        return self.failover_response(params, self.models)
+
+    async def aget_response(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.hedge:
+            return await self.afailover_response(params, self.models)
+
+        primary, backup = self.models[:2]
+        tasks = [asyncio.create_task(self.atimed_response(primary, self.params_for(primary, params, last=False)))]
+        pending = set(tasks)
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay(primary.model_name))
+            if not done:
+                tasks.append(asyncio.create_task(self.atimed_response(backup, self.params_for(backup, params, last=False))))
+                pending.add(tasks[-1])
+            while done or pending:
+                for task in done:
+                    response = task.result()
+                    if response["status"]:
+                        return response
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # The losing request is cancelled rather than left running
+            for task in pending:
+                task.cancel()
+        if len(self.models) > len(tasks):
+            return await self.afailover_response(params, self.models[len(tasks):])
+        return response
+
+    def stream_response(self, params: Dict[str, Any], on_close=None) -> Iterator[Dict[str, Any]]:
+        """Stream from the first model that starts answering; once tokens have been sent there is no failover"""
+        for index, model in enumerate(self.models):
+            last = index == len(self.models) - 1
+            model_params = self.params_for(model, params, last=last)
+            started = False
+            # Closing the router closes the model's stream, so a partial response is still reported to on_close
+            with closing(model.stream_response(model_params, on_close=self.answered_by(model_params, on_close))) as events:
+                for event in events:
+                    if event["type"] == "error" and not started and not last:
+                        log.warning(f"{model.model_name} failed, trying the next model: {event['message']}")
+                        break
+                    if event["type"] == "token":
+                        started = True
+                    elif event["type"] == "done":
+                        event["data"]["model"] = model_params["model"]
+                    yield event
+                else:
+                    return
+
+    async def astream_response(self, params: Dict[str, Any], on_close=None) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of stream_response"""
+        for index, model in enumerate(self.models):
+            last = index == len(self.models) - 1
+            model_params = self.params_for(model, params, last=last)
+            started = False
+            async with aclosing(model.astream_response(model_params, on_close=self.answered_by(model_params, on_close))) as events:
+                async for event in events:
+                    if event["type"] == "error" and not started and not last:
+                        log.warning(f"{model.model_name} failed, trying the next model: {event['message']}")
+                        break
+                    if event["type"] == "token":
+                        started = True
+                    elif event["type"] == "done":
+                        event["data"]["model"] = model_params["model"]
+                    yield event
+                else:
+                    return
+
+    @staticmethod
+    def answered_by(model_params, on_close):
+        """Wrap on_close so a partial response records the model that produced it"""
+        if on_close is None:
+            return None
+        return lambda data: on_close({**data, "model": model_params["model"]})
@@ -41,6 +41,14 @@ class Microapp(models.Model):
         (RESTRICTED, 'restricted')
     ]
 
+    TRIM_CONTEXT = 'trim'
+    REJECT_CONTEXT = 'reject'
+
+    CONTEXT_POLICIES = [
+        (TRIM_CONTEXT, 'trim'),
+        (REJECT_CONTEXT, 'reject')
+    ]
+
     # The name of the microapp, shown on dashboard and the top of the app. 
     title = models.CharField(max_length = 150, default = MicroappVariables.DEFAULT_MICROAPP_NAME)
     
@@ -95,6 +103,23 @@ class Microapp(models.Model):
     # A unique hash identifier for the microapp
     # This is automatically generated when the app is created
     hash_id = models.CharField(max_length=50, unique=True, blank=True)
+
+    # Serve identical deterministic (temperature 0) submissions from the response cache instead of calling the AI model again.
+    # Cached runs are still recorded, with the Cached_Response response type.
+    response_cache_enabled = models.BooleanField(default=False)
+
+    # Models tried in order when the run's model fails or times out, e.g. ["gpt-4o-mini", "gemini-2.5-flash"].
+    # Models the owner's plan doesn't include are skipped.
+    fallback_models = models.JSONField(default=list, blank=True)
+
+    # Send the run to the first fallback model as well when the primary model is slower than usual,
+    # and keep whichever response arrives first. Only runs on the async (ASGI) endpoints are hedged
+    hedge_requests = models.BooleanField(default=False)
+
+    # What happens when a run's prompt doesn't fit the model's context window.
+    # trim drops the oldest conversation turns (never the system prompt, context documents or the new submission);
+    # reject returns an error without calling the model.
+    context_policy = models.CharField(max_length = 20, default = TRIM_CONTEXT, choices = CONTEXT_POLICIES)
     
     def save(self, *args, **kwargs):
         if not self.hash_id:
@@ -159,7 +184,8 @@ class Run(models.Model):
     RESPONSE_TYPE = [
         ("AI", "AI"),
         ("Error", "Error"),
-        ("Fixed_Response", "Fixed Response")
+        ("Fixed_Response", "Fixed Response"),
+        ("Cached_Response", "Cached Response")
     ]
 
     # A run is a single instance of a user submitting a prompt to an AI model and receiving a response. 
@@ -257,6 +283,10 @@ class Run(models.Model):
     # Output tokens are the tokens in the output response that the AI model generates. 
     output_tokens = models.IntegerField()
 
+    # The input tokens the provider read from its prompt cache instead of processing again (a subset of input_tokens).
+    # See UnifiedLLMInterface.cache_breakpoints for how the stable prefix of the prompt is marked.
+    cached_input_tokens = models.IntegerField(default=0)
+
     # If true, then the run is scored by the AI model. 
     # Scored runs send special requests for a score returned in JSON format from the model. There is special logic to handle the sending and receiving of these scoring requests. 
     # See the RunList view Post method for more details.    
@@ -298,5 +328,87 @@ class Run(models.Model):
     
     response_type = models.CharField(max_length = 20, default = MicroappVariables.DEFAULT_RESPONSE_TYPE, choices = RESPONSE_TYPE)
 
+    class Meta:
+        # Access paths of the analytics and usage queries (AppStatistics, AppConversations, AppConversationDetails,
+        # RunList.get and GuestUsage). Added concurrently (migrations 0055 and 0056) so the table is not locked.
+        indexes = [
+            models.Index(fields=["owner_id", "ma_id", "timestamp"], name="run_owner_ma_ts_idx"),
+            models.Index(fields=["session_id", "timestamp"], name="run_session_ts_idx"),
+            models.Index(fields=["app_hash_id"], name="run_app_hash_idx"),
+            # Lets the daily rollup find runs changed since its last pass
+            models.Index(fields=["updated_at"], name="run_updated_at_idx"),
+            models.Index(
+                fields=["user_ip", "timestamp"],
+                name="run_guest_ip_ts_idx",
+                condition=models.Q(user_id__isnull=True)
+            ),
+        ]
+
     def __str__(self):
-        return self.ai_model
\ No newline at end of file
+        return self.ai_model
+
+
+class RunDailyRollup(models.Model):
+    """
+    Per-app daily totals of the runs, used by AppStatistics instead of scanning the full run history.
+
+    Built for closed days by the rollup_runs management command (see apps.microapps.rollups).
+    Distinct users (IPs) and sessions are stored as HyperLogLog sketches so they can be merged across days.
+    """
+    owner_id = models.ForeignKey(settings.AUTH_USER_MODEL, related_name = "run_rollups", on_delete=models.CASCADE)
+    ma_id = models.ForeignKey(Microapp, on_delete=models.CASCADE)
+    app_hash_id = models.CharField(max_length=50, blank=True)
+    day = models.DateField()
+
+    run_count = models.IntegerField(default=0)
+    thumbs_up_count = models.IntegerField(default=0)
+    thumbs_down_count = models.IntegerField(default=0)
+    total_cost = models.DecimalField(max_digits=20, decimal_places=6, default=0)
+    total_credits = models.BigIntegerField(default=0)
+
+    # HyperLogLog registers (apps.utils.hyperloglog) of the day's user IPs and session ids
+    user_ip_sketch = models.BinaryField()
+    session_sketch = models.BinaryField()
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner_id", "ma_id", "app_hash_id", "day"], name="run_rollup_unique_app_day"),
+        ]
+        indexes = [
+            models.Index(fields=["day"], name="run_rollup_day_idx"),
+        ]
+
+
+class RunRollupCheckpoint(models.Model):
+    """How far the daily rollup has progressed: the last closed day rolled up and the last run change seen"""
+    name = models.CharField(max_length=50, primary_key=True)
+    rolled_through = models.DateField(null=True, blank=True)
+    changes_through = models.DateTimeField(null=True, blank=True)
+
+
+class ParsedDocument(models.Model):
+    """
+    Text extracted from an uploaded document, stored once per distinct file content and parser version
+    (see apps.microapps.document_cache), so repeat uploads of the same file are neither parsed nor stored again.
+    """
+    sha256 = models.CharField(max_length=64)
+    # DocumentProcessor.PARSER_VERSION the text was extracted with
+    parser_version = models.PositiveIntegerField()
+    # S3 key of the extracted text, shared by every upload of the file
+    text_file = models.CharField(max_length=255)
+    content_preview = models.TextField(blank=True, default="")
+    char_count = models.PositiveIntegerField(default=0)
+    word_count = models.PositiveIntegerField(default=0)
+    use_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["sha256", "parser_version"], name="unique_parsed_document")
+        ]
+        indexes = [
+            models.Index(fields=["last_used_at"], name="parsed_document_last_used_idx"),
+        ]
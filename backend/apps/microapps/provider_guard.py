@@ -0,0 +1,167 @@
+"""
+Backpressure between the web tier and the LLM providers.
+
+Each provider API key gets a guard made of a circuit breaker and an AIMD concurrency limit, kept per process.
+The breaker opens after BREAKER_FAILURE_THRESHOLD consecutive provider failures (rate limits, timeouts,
+5xx and connection errors) and rejects calls for BREAKER_OPEN_SECONDS; then a single probe call is let
+through (half-open) and closes it again on success. The limit on in-flight calls grows by one per limit's
+worth of healthy calls and is halved on every failure or slow call, so a browning-out provider is sent less
+traffic instead of tying up every worker. A call over the limit waits up to CONCURRENCY_WAIT_SECONDS for a
+slot; calls the breaker rejects, or that find no slot in time, fail with ProviderUnavailable.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from apps.utils.global_variables import ProviderGuardVariables
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider whose breaker is open or whose concurrency limit is reached"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_provider_failure(exception):
+    """Rate limits, timeouts, server and connection errors count against a provider; bad requests don't"""
+    if isinstance(exception, (TimeoutError, ConnectionError)):
+        return True
+    status_code = getattr(exception, "status_code", None)
+    return status_code in (408, 429) or (isinstance(status_code, int) and status_code >= 500)
+
+
+class ProviderGuard:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.slot_freed = threading.Condition(self.lock)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.in_flight = 0
+        self.limit = float(ProviderGuardVariables.CONCURRENCY_INITIAL)
+
+    def take_slot(self):
+        """Take a slot if one is free; must hold the lock. Raises while the breaker rejects calls"""
+        if self.state == OPEN:
+            retry_after = self.opened_at + ProviderGuardVariables.BREAKER_OPEN_SECONDS - time.monotonic()
+            if retry_after > 0:
+                raise ProviderUnavailable(f"{self.name} is unavailable, retry in {retry_after:.0f}s", retry_after)
+            self.state = HALF_OPEN
+        elif self.state == HALF_OPEN:
+            # Only the probe call goes through until it has told us whether the provider recovered
+            raise ProviderUnavailable(f"{self.name} is recovering, retry shortly", 1)
+        elif self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def at_limit(self):
+        return ProviderUnavailable(f"{self.name} is at its concurrency limit of {int(self.limit)}", 1)
+
+    def acquire(self, timeout=None):
+        """Take a slot, waiting up to CONCURRENCY_WAIT_SECONDS for one to be released"""
+        deadline = time.monotonic() + (ProviderGuardVariables.CONCURRENCY_WAIT_SECONDS if timeout is None else timeout)
+        with self.slot_freed:
+            while not self.take_slot():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self.at_limit()
+                self.slot_freed.wait(remaining)
+
+    async def aacquire(self, timeout=None):
+        """Async counterpart of acquire: the event loop polls for a slot instead of blocking on the lock's condition"""
+        deadline = time.monotonic() + (ProviderGuardVariables.CONCURRENCY_WAIT_SECONDS if timeout is None else timeout)
+        while True:
+            with self.lock:
+                if self.take_slot():
+                    return
+            if time.monotonic() >= deadline:
+                raise self.at_limit()
+            await asyncio.sleep(ProviderGuardVariables.CONCURRENCY_POLL_SECONDS)
+
+    def release(self, succeeded=None, latency=0.0):
+        """End a call; succeeded is None when the call ended without telling us anything about the provider"""
+        with self.lock:
+            self.in_flight -= 1
+            self.slot_freed.notify()
+            if succeeded is None:
+                if self.state == HALF_OPEN:
+                    self.state = OPEN
+                return
+            if succeeded and latency <= ProviderGuardVariables.SLOW_CALL_SECONDS:
+                self.failures = 0
+                self.state = CLOSED
+                self.limit = min(self.limit + 1 / self.limit, ProviderGuardVariables.CONCURRENCY_MAX)
+                return
+
+            self.limit = max(self.limit * ProviderGuardVariables.CONCURRENCY_BACKOFF, ProviderGuardVariables.CONCURRENCY_MIN)
+            if succeeded:
+                # Slow but successful: back off without counting towards the breaker
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= ProviderGuardVariables.BREAKER_FAILURE_THRESHOLD:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    @contextmanager
+    def call(self):
+        """Guard one provider call; raises ProviderUnavailable instead of calling when the provider is shedding load"""
+        self.acquire()
+        with self.track():
+            yield
+
+    @asynccontextmanager
+    async def acall(self):
+        """Async counterpart of call"""
+        await self.aacquire()
+        with self.track():
+            yield
+
+    @contextmanager
+    def track(self):
+        """Release the slot taken for a call, recording how the call went"""
+        started = time.monotonic()
+        succeeded = None
+        try:
+            yield
+            succeeded = True
+        except Exception as e:
+            if is_provider_failure(e):
+                succeeded = False
+            raise
+        finally:
+            self.release(succeeded, time.monotonic() - started)
+
+
+def provider_key(family, api_key):
+    """Identifies a provider API key without keeping the key itself"""
+    return f"{family or 'provider'}:{hashlib.blake2b(str(api_key).encode(), digest_size=8).hexdigest()}"
+
+
+def provider_guard(family, api_key):
+    """The guard shared by every call made with this provider key in the process"""
+    name = provider_key(family, api_key)
+    guard = _guards.get(name)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.setdefault(name, ProviderGuard(family or "provider"))
+    return guard
+
+
+def clear_provider_guards():
+    with _guards_lock:
+        _guards.clear()
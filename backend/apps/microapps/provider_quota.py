@@ -0,0 +1,142 @@
+"""
+Scheduling of provider calls against each API key's requests-per-minute and tokens-per-minute quotas.
+
+Quotas are token buckets in the rate_limits cache (apps.utils.rate_limit.TokenBucket), so every worker process
+draws from the same budget. An async call that finds too little left in a bucket waits for enough to be refilled,
+up to QUOTA_MAX_WAIT_SECONDS, instead of being sent to collect a 429. A sync call fails straight away with
+ProviderUnavailable (a 503 with Retry-After), since waiting would hold a WSGI worker thread. When a provider
+does answer 429 with Retry-After, the key is paused for that long across all workers.
+"""
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+from apps.microapps.provider_guard import ProviderUnavailable, provider_guard, provider_key
+from apps.utils.global_variables import ProviderQuotaVariables
+from apps.utils.rate_limit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+# Rough characters per token, enough to budget a call before it is made
+CHARS_PER_TOKEN = 4
+
+
+def message_chars(message):
+    """The length of a message's text; only the text parts of multimodal content are counted"""
+    content = message.get("content") if isinstance(message, dict) else message
+    if isinstance(content, list):
+        return sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return len(str(content)) if content else 0
+
+
+def estimate_tokens(params):
+    """The prompt's text length in tokens plus the completion's max_tokens"""
+    chars = sum(message_chars(message) for message in params.get("messages", []))
+    return chars // CHARS_PER_TOKEN + int(params.get("max_tokens") or 0)
+
+
+class ProviderQuota:
+    def __init__(self, family, api_key):
+        self.name = provider_key(family, api_key)
+        quota = ProviderQuotaVariables.QUOTAS.get(family, {})
+        self.buckets = [
+            (TokenBucket(f"provider_quota:{self.name}:{kind}", quota[kind], ProviderQuotaVariables.QUOTA_REFILL_SECONDS), kind)
+            for kind in ("rpm", "tpm") if quota.get(kind)
+        ]
+
+    @property
+    def cache(self):
+        return caches["rate_limits"]
+
+    @property
+    def pause_key(self):
+        return f"provider_quota:{self.name}:paused_until"
+
+    def try_reserve(self, tokens):
+        """Reserve one request and `tokens` tokens, or return the seconds to wait before trying again"""
+        now = time.time()
+        paused_until = self.cache.get(self.pause_key)
+        if paused_until and paused_until > now:
+            return paused_until - now
+
+        reserved = []
+        for bucket, kind in self.buckets:
+            amount = 1 if kind == "rpm" else tokens
+            if not amount:
+                continue
+            wait = bucket.reserve(amount, now)
+            if wait:
+                for reserved_bucket, reserved_amount in reserved:
+                    reserved_bucket.release(reserved_amount, now)
+                return wait
+            reserved.append((bucket, amount))
+        return 0
+
+    def next_wait(self, tokens, deadline):
+        """Seconds to sleep before retrying the reservation (0 once reserved); raises when past the deadline"""
+        try:
+            wait = self.try_reserve(tokens)
+        except Exception as e:
+            # Never block provider calls on the cache
+            log.error(f"Provider quota check failed for {self.name}: {str(e)}")
+            return 0
+        if wait and time.monotonic() + wait > deadline:
+            raise ProviderUnavailable(f"{self.name} quota is used up, retry in {wait:.0f}s", wait)
+        # Jitter keeps waiting workers from all retrying at the start of the next refill
+        return wait and wait + random.uniform(0, ProviderQuotaVariables.QUOTA_JITTER_SECONDS)
+
+    def reserve(self, tokens):
+        """Reserve without waiting; raises ProviderUnavailable with the wait when the quota is used up"""
+        self.next_wait(tokens, time.monotonic())
+
+    async def await_quota(self, tokens):
+        deadline = time.monotonic() + ProviderQuotaVariables.QUOTA_MAX_WAIT_SECONDS
+        while wait := await sync_to_async(self.next_wait)(tokens, deadline):
+            await asyncio.sleep(wait)
+
+    def pause_for_retry_after(self, exception):
+        """Pause the key for the Retry-After of a 429, so no worker sends it more calls before then"""
+        if getattr(exception, "status_code", None) != 429:
+            return
+        headers = getattr(exception, "litellm_response_headers", None) or getattr(getattr(exception, "response", None), "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            # Missing, or an HTTP date: fall back to a short pause
+            retry_after = ProviderQuotaVariables.QUOTA_DEFAULT_RETRY_AFTER
+        retry_after = min(retry_after, ProviderQuotaVariables.QUOTA_MAX_RETRY_AFTER)
+        try:
+            self.cache.set(self.pause_key, time.time() + retry_after, timeout=int(retry_after) + 1)
+        except Exception as e:
+            log.error(f"Could not pause {self.name}: {str(e)}")
+
+
+@contextmanager
+def provider_call(family, api_key, tokens=0):
+    """Reserve the key's quota, then make the call under its circuit breaker and concurrency limit"""
+    quota = ProviderQuota(family, api_key)
+    quota.reserve(tokens)
+    with provider_guard(family, api_key).call():
+        try:
+            yield
+        except Exception as e:
+            quota.pause_for_retry_after(e)
+            raise
+
+
+@asynccontextmanager
+async def aprovider_call(family, api_key, tokens=0):
+    """Async counterpart of provider_call; waits for the key's quota instead of failing when it is used up"""
+    quota = ProviderQuota(family, api_key)
+    await quota.await_quota(tokens)
+    async with provider_guard(family, api_key).acall():
+        try:
+            yield
+        except Exception as e:
+            await sync_to_async(quota.pause_for_retry_after)(e)
+            raise
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache, caches
+
+from apps.utils.global_variables import UsageVariables
+
+log = logging.getLogger(__name__)
+
+# The completion parameters that decide what the model returns
+CACHE_KEY_PARAMS = ("model", "messages", "temperature", "top_p", "max_tokens", "presence_penalty", "frequency_penalty")
+
+HITS_KEY = "response_cache:hits"
+MISSES_KEY = "response_cache:misses"
+
+
+def response_cache():
+    """The "responses" cache: entries expire after RESPONSE_CACHE_TIMEOUT, least recently used are evicted first"""
+    return caches["responses"]
+
+
+def response_cache_key(api_params):
+    payload = json.dumps({param: api_params.get(param) for param in CACHE_KEY_PARAMS}, sort_keys=True, default=str)
+    return "response:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _count(counter_key):
+    # Counters live in the default cache so response evictions never reset them
+    cache.add(counter_key, 0, timeout=None)
+    try:
+        cache.incr(counter_key)
+    except ValueError:
+        pass
+
+
+def get_cached_response(api_params, transcription_cost=0):
+    """
+    Return the cached response data for these completion parameters, or None.
+
+    A hit is priced at RESPONSE_CACHE_HIT_CREDITS since no provider call is made; the transcription of the
+    current submission, if any, was still paid for, so its cost and credits are added.
+    """
+    try:
+        response = response_cache().get(response_cache_key(api_params))
+    except Exception as e:
+        log.error(f"Response cache lookup failed: {str(e)}")
+        return None
+
+    if response is None:
+        _count(MISSES_KEY)
+        return None
+
+    _count(HITS_KEY)
+    transcription_cost = float(transcription_cost or 0)
+    return {
+        **response,
+        "cost": round(transcription_cost, 6),
+        "credits": UsageVariables.RESPONSE_CACHE_HIT_CREDITS + int(transcription_cost * UsageVariables.CREDITS_MULTIPLIER)
+    }
+
+
+def cache_response(api_params, response):
+    """Cache a response under the model that produced it, which after a failover is not the requested one"""
+    try:
+        response_cache().set(response_cache_key({**api_params, "model": response.get("model", api_params["model"])}), response)
+    except Exception as e:
+        log.error(f"Response cache write failed: {str(e)}")
+
+
+def response_cache_stats():
+    """Hits and misses since the counters were created, for the staff dashboard"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
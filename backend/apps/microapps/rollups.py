@@ -0,0 +1,191 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.microapps.models import Run, RunDailyRollup, RunRollupCheckpoint
+from apps.utils.hyperloglog import HyperLogLog
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "daily"
+TOTAL_FIELDS = ("run_count", "thumbs_up_count", "thumbs_down_count", "total_cost", "total_credits")
+SKETCH_FIELDS = ("user_ip_sketch", "session_sketch")
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def aggregate_runs(runs, group_fields):
+    """
+    Totals and distinct-count sketches of runs, keyed by the values of group_fields.
+    One grouped query for the totals, and one pass over the distinct (IP, session) pairs for the sketches.
+    """
+    groups = {}
+    totals = runs.values(*group_fields).annotate(
+        run_count=Count("id"),
+        thumbs_up_count=Count("id", filter=Q(satisfaction=1)),
+        thumbs_down_count=Count("id", filter=Q(satisfaction=-1)),
+        total_cost=Sum("cost"),
+        total_credits=Sum("credits"),
+    ).order_by()
+    for row in totals:
+        groups[tuple(row[field] for field in group_fields)] = {
+            **{field: row[field] for field in TOTAL_FIELDS},
+            "user_ip_sketch": HyperLogLog(),
+            "session_sketch": HyperLogLog(),
+        }
+
+    pairs = runs.values_list(*group_fields, "user_ip", "session_id").distinct().order_by()
+    for *key, user_ip, session_id in pairs.iterator(chunk_size=5000):
+        group = groups[tuple(key)]
+        group["user_ip_sketch"].add(user_ip)
+        group["session_sketch"].add(session_id)
+    return groups
+
+
+def rollup_day(day, owner_ids=None):
+    """(Re)build the rollups of one day, for every owner or only the given ones"""
+    runs = Run.objects.filter(
+        timestamp__gte=day_start(day),
+        timestamp__lt=day_start(day + timedelta(days=1)),
+        owner_id__isnull=False,
+        ma_id__isnull=False
+    )
+    rollups = RunDailyRollup.objects.filter(day=day)
+    if owner_ids is not None:
+        runs = runs.filter(owner_id__in=owner_ids)
+        rollups = rollups.filter(owner_id__in=owner_ids)
+
+    groups = aggregate_runs(runs, ("owner_id", "ma_id", "app_hash_id"))
+    with transaction.atomic():
+        rollups.delete()
+        RunDailyRollup.objects.bulk_create([
+            RunDailyRollup(
+                owner_id_id=owner_id,
+                ma_id_id=ma_id,
+                app_hash_id=app_hash_id,
+                day=day,
+                **{field: group[field] for field in TOTAL_FIELDS},
+                **{field: group[field].to_bytes() for field in SKETCH_FIELDS},
+            )
+            for (owner_id, ma_id, app_hash_id), group in groups.items()
+        ])
+    return len(groups)
+
+
+def rollup_runs(today=None):
+    """
+    Bring the daily rollups up to date: roll up every day that closed since the last pass, and rebuild
+    the already rolled-up days whose runs changed since then (e.g. a late satisfaction rating), for the
+    affected owners only. Returns the number of days (re)built.
+    """
+    yesterday = (today or timezone.localdate()) - timedelta(days=1)
+    checkpoint, _ = RunRollupCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    changes_through = Run.objects.aggregate(Max("updated_at"))["updated_at__max"]
+    days = 0
+
+    # Rolled-up days with changed runs
+    if checkpoint.rolled_through and checkpoint.changes_through and changes_through:
+        changed = (
+            Run.objects.filter(
+                updated_at__gt=checkpoint.changes_through,
+                updated_at__lte=changes_through,
+                timestamp__lt=day_start(checkpoint.rolled_through + timedelta(days=1)),
+                owner_id__isnull=False
+            )
+            .annotate(day=TruncDate("timestamp"))
+            .values_list("day", "owner_id")
+            .distinct()
+        )
+        owners_by_day = {}
+        for day, owner_id in changed:
+            owners_by_day.setdefault(day, set()).add(owner_id)
+        for day, owner_ids in sorted(owners_by_day.items()):
+            rollup_day(day, owner_ids)
+            days += 1
+
+    # Days closed since the last pass
+    if checkpoint.rolled_through:
+        day = checkpoint.rolled_through + timedelta(days=1)
+    else:
+        first_run = Run.objects.aggregate(Min("timestamp"))["timestamp__min"]
+        day = timezone.localdate(first_run) if first_run else yesterday + timedelta(days=1)
+    while day <= yesterday:
+        with transaction.atomic():
+            rollup_day(day)
+            checkpoint.rolled_through = day
+            checkpoint.save(update_fields=["rolled_through"])
+        days += 1
+        day += timedelta(days=1)
+
+    checkpoint.rolled_through = max(checkpoint.rolled_through or yesterday, yesterday)
+    checkpoint.changes_through = changes_through or checkpoint.changes_through
+    checkpoint.save()
+    return days
+
+
+def app_statistics(owner_id, app_id=None, hash_id=None):
+    """
+    Per-app statistics of an owner's runs: the rolled-up closed days merged with a live aggregate of the
+    runs since. Distinct users and sessions are HyperLogLog estimates.
+    """
+    runs = Run.objects.filter(owner_id=owner_id)
+    rollups = RunDailyRollup.objects.filter(owner_id=owner_id)
+    if app_id:
+        runs = runs.filter(ma_id=app_id)
+        rollups = rollups.filter(ma_id=app_id)
+    elif hash_id:
+        runs = runs.filter(app_hash_id=hash_id)
+        rollups = rollups.filter(app_hash_id=hash_id)
+
+    checkpoint = RunRollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+    if checkpoint and checkpoint.rolled_through:
+        rollups = rollups.filter(day__lte=checkpoint.rolled_through)
+        runs = runs.filter(timestamp__gte=day_start(checkpoint.rolled_through + timedelta(days=1)))
+    else:
+        rollups = rollups.none()
+
+    apps = {}
+
+    def merge(ma_id, group):
+        totals = apps.setdefault(ma_id, {
+            "run_count": 0, "thumbs_up_count": 0, "thumbs_down_count": 0, "total_cost": 0, "total_credits": 0,
+            "user_ip_sketch": HyperLogLog(), "session_sketch": HyperLogLog(),
+        })
+        for field in TOTAL_FIELDS:
+            totals[field] += group[field] or 0
+        for field in SKETCH_FIELDS:
+            totals[field].merge(group[field])
+
+    for rollup in rollups.values("ma_id", *TOTAL_FIELDS, *SKETCH_FIELDS).iterator(chunk_size=500):
+        merge(rollup["ma_id"], {
+            **rollup,
+            **{field: HyperLogLog(rollup[field]) for field in SKETCH_FIELDS},
+        })
+    for (ma_id,), group in aggregate_runs(runs, ("ma_id",)).items():
+        merge(ma_id, group)
+
+    statistics = []
+    for ma_id, totals in sorted(apps.items(), key=lambda item: (item[0] is None, item[0] or 0)):
+        thumbs_up, thumbs_down = totals["thumbs_up_count"], totals["thumbs_down_count"]
+        total_responses = thumbs_up + thumbs_down
+        sessions = totals["session_sketch"].count()
+        statistics.append({
+            "ma_id": ma_id,
+            "net_satisfaction_score": round(thumbs_up / total_responses, 4) if total_responses else 0,
+            "thumbs_up_count": thumbs_up,
+            "thumbs_down_count": thumbs_down,
+            "total_responses": total_responses,
+            "total_cost": totals["total_cost"],
+            "total_credits": totals["total_credits"],
+            "unique_users": totals["user_ip_sketch"].count(),
+            "sessions": sessions,
+            "avg_cost_session": totals["total_cost"] / sessions if sessions else None,
+            "avg_credits_session": totals["total_credits"] // sessions if sessions else None,
+        })
+    return statistics
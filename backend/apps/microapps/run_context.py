@@ -0,0 +1,62 @@
+import threading
+import time
+
+from django.db.models import F
+
+from apps.microapps.models import MicroAppUserJoin
+from apps.subscriptions.ledger import get_user_plan
+from apps.utils.global_variables import MicroappVariables
+
+# Upper bound on cached apps per process; the cache is simply dropped when it fills up
+MAX_CACHED_CONTEXTS = 10000
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def resolve_run_context(ma_id):
+    """
+    Return the owner id, app hash id, owner join date, response cache setting, context policy and model routing
+    settings (fallback models, hedging and the owner's plan) for a microapp.
+
+    Fetched with a single query and kept in a per-process cache for RUN_CONTEXT_CACHE_TIMEOUT seconds,
+    since runs against the same app arrive in bursts. Raises MicroAppUserJoin.DoesNotExist if the app has no owner.
+    """
+    try:
+        ma_id = int(ma_id)
+    except (TypeError, ValueError):
+        raise MicroAppUserJoin.DoesNotExist(f"Invalid microapp id {ma_id!r}")
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(ma_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    context = (
+        MicroAppUserJoin.objects.filter(ma_id=ma_id, role=MicroappVariables.APP_OWNER)
+        .values(
+            app_owner_id=F("user_id"),
+            app_hash_id=F("ma_id__hash_id"),
+            owner_date_joined=F("user_id__date_joined"),
+            response_cache_enabled=F("ma_id__response_cache_enabled"),
+            fallback_models=F("ma_id__fallback_models"),
+            hedge_requests=F("ma_id__hedge_requests"),
+            context_policy=F("ma_id__context_policy"),
+        )
+        .first()
+    )
+    if context is None:
+        raise MicroAppUserJoin.DoesNotExist(f"Microapp {ma_id} has no owner")
+    # Fallback models are limited to the owner's plan; most apps have none, so the lookup is skipped for them
+    context["owner_plan"] = get_user_plan(context["app_owner_id"]) if context["fallback_models"] else None
+
+    with _lock:
+        if len(_cache) >= MAX_CACHED_CONTEXTS:
+            _cache.clear()
+        _cache[ma_id] = (now + MicroappVariables.RUN_CONTEXT_CACHE_TIMEOUT, context)
+    return context
+
+
+def clear_run_context_cache():
+    with _lock:
+        _cache.clear()
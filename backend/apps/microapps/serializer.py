@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Microapp, MicroAppUserJoin, Asset, AssetsMaJoin, Run
 from decimal import Decimal
+from apps.utils.global_variables import AIModelConstants
 
 class MicroAppSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,6 +9,14 @@ class MicroAppSerializer(serializers.ModelSerializer):
         fields = '__all__'
         extra_kwargs = {'is_archived': {'write_only': True}, 'hash_id': {'allow_null': True}} #We allow the hash_id to be null because it is generated when the microapp is created
 
+    def validate_fallback_models(self, value):
+        if not isinstance(value, list) or not all(isinstance(model, str) for model in value):
+            raise serializers.ValidationError("Fallback models must be a list of model names.")
+        unsupported = [model for model in value if not AIModelConstants.is_supported(model)]
+        if unsupported:
+            raise serializers.ValidationError(f"Unsupported fallback models: {', '.join(unsupported)}")
+        return value
+
 class MicroAppSwaggerPostSerializer(serializers.ModelSerializer):
     collection_id = serializers.IntegerField(write_only=True)
     class Meta:
@@ -43,6 +52,14 @@ class RunPostSerializer(serializers.ModelSerializer):
 class RunGetSerializer(serializers.ModelSerializer):
     cost = serializers.DecimalField(max_digits=20, decimal_places=6, coerce_to_string=False)
 
+    def __init__(self, *args, **kwargs):
+        # Optional projection: only serialize these fields (the queryset should defer the others)
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
     class Meta:
         model = Run
         fields = '__all__'
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.microapps.models import Run
+from apps.utils.usage_helper import GuestUsage
+
+
+@receiver(post_save, sender=Run)
+def record_guest_session(sender, instance, created, **kwargs):
+    """Count a guest run's session towards its IP's session limit, so the limiter never has to scan Run"""
+    if created and instance.user_id_id is None and instance.user_ip:
+        GuestUsage.record_session(instance.user_ip, instance.session_id)
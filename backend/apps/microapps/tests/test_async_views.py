@@ -0,0 +1,47 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+from apps.microapps.models import Run
+from apps.microapps.tests.utils import RunViewTestCase, completion
+
+
+class AsyncRunTest(RunViewTestCase):
+    url = "/api/microapps/run/anonymous/async"
+
+    @patch("apps.microapps.llm_interface.litellm.acompletion", new_callable=AsyncMock, return_value=completion("Plants make sugar."))
+    @patch("apps.microapps.llm_interface.litellm.completion")
+    async def test_awaits_the_provider_and_saves_the_run(self, litellm_completion, litellm_acompletion):
+        response = await self.async_client.post(self.url, self.payload(), content_type="application/json")
+
+        self.assertEqual(200, response.status_code)
+        run_data = json.loads(response.content)["data"]
+        self.assertEqual("Plants make sugar.", run_data["response"])
+        litellm_acompletion.assert_awaited_once()
+        # The blocking client is never used on the async path
+        litellm_completion.assert_not_called()
+        self.assertTrue(await Run.objects.filter(id=run_data["id"], input_tokens=10).aexists())
+
+    @patch("apps.microapps.llm_interface.litellm.acompletion", new_callable=AsyncMock, side_effect=RuntimeError("provider is down"))
+    async def test_provider_error_is_a_bad_request(self, _):
+        response = await self.async_client.post(self.url, self.payload(), content_type="application/json")
+
+        self.assertEqual(400, response.status_code)
+        self.assertFalse(await Run.objects.aexists())
+
+    @patch("apps.microapps.llm_interface.litellm.acompletion", new_callable=AsyncMock)
+    async def test_scored_phase_awaits_both_calls(self, litellm_acompletion):
+        def answer(**kwargs):
+            # The scoring call is the one that ends with the rubric instruction
+            if "rubric" in kwargs["messages"][-1]["content"]:
+                return completion('{"accuracy": "4", "total": "4"}', prompt_tokens=20, completion_tokens=3)
+            return completion("Plants make sugar.")
+
+        litellm_acompletion.side_effect = answer
+        payload = self.payload(scored_run=True, parallel_scoring=True, minimum_score=3, rubric="accuracy out of 5")
+        response = await self.async_client.post(self.url, payload, content_type="application/json")
+
+        self.assertEqual(200, response.status_code)
+        run_data = json.loads(response.content)["data"]
+        self.assertEqual((30, 8), (run_data["input_tokens"], run_data["output_tokens"]))
+        self.assertTrue(run_data["run_passed"])
+        self.assertEqual(2, litellm_acompletion.await_count)
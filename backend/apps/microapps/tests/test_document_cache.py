@@ -0,0 +1,30 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.microapps.document_cache import evict_parsed_documents, find_parsed_document, store_parsed_document
+from apps.microapps.models import ParsedDocument
+
+
+@patch("apps.microapps.document_cache.upload_to_s3")
+class ParsedDocumentCacheTest(TestCase):
+    def test_repeat_upload_reuses_text(self, upload_to_s3):
+        sha256 = "ab" * 32
+        self.assertIsNone(find_parsed_document(sha256))
+
+        stored = store_parsed_document(sha256, "Syllabus " * 200)
+        self.assertEqual(1, upload_to_s3.call_count)
+        self.assertEqual((200, 1800), (stored.word_count, stored.char_count))
+
+        found = find_parsed_document(sha256)
+        self.assertEqual(stored.text_file, found.text_file)
+        self.assertEqual(2, ParsedDocument.objects.get(id=stored.id).use_count)
+
+    def test_eviction(self, upload_to_s3):
+        fresh = store_parsed_document("cd" * 32, "fresh")
+        stale = store_parsed_document("ef" * 32, "stale")
+        ParsedDocument.objects.filter(id=stale.id).update(last_used_at=timezone.now() - timedelta(days=365))
+        self.assertEqual(1, evict_parsed_documents())
+        self.assertEqual([fresh.id], list(ParsedDocument.objects.values_list("id", flat=True)))
@@ -0,0 +1,84 @@
+import os
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from apps.microapps.document_parser import ExcelParser, PDFParser, TextParser, ocr_pdf_pages
+
+
+class DocumentParserBudgetTest(SimpleTestCase):
+    def _write(self, suffix, content):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False, encoding="utf-8", newline="") as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_text_is_cut_at_budget(self):
+        path = self._write(".txt", "line of text\n" * 1000)
+        self.assertEqual(("line of text\n" * 1000).strip(), TextParser().extract_text(path))
+        self.assertEqual(25, len(TextParser().extract_text(path, max_chars=25)))
+
+    def test_csv_rows_are_tab_separated(self):
+        path = self._write(".csv", "a,b\n1,\"2,3\"\n")
+        self.assertEqual("a\tb\n1\t2,3", ExcelParser().extract_text(path))
+
+
+class FakePDF:
+    """A PyMuPDF document whose pages have the given native text ("" for a scanned page)"""
+
+    def __init__(self, page_texts):
+        self.pages = [MagicMock(**{"get_text.return_value": text}) for text in page_texts]
+        self.page_count = len(page_texts)
+
+    def __getitem__(self, page_number):
+        return self.pages[page_number]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def fake_ocr(file_path, page_numbers):
+    return [f"scanned page {page_number}" for page_number in page_numbers]
+
+
+@patch("apps.microapps.document_parser.MicroappVariables.OCR_MAX_WORKERS", 2)
+@patch("apps.microapps.document_parser.ocr_pdf_pages", side_effect=fake_ocr)
+class PDFPageTest(SimpleTestCase):
+    def test_only_scanned_pages_are_ocrd_in_page_order(self, ocr_pages):
+        pdf = FakePDF(["intro", "", "", "summary"])
+        with patch("apps.microapps.document_parser.fitz.open", return_value=pdf):
+            text = PDFParser().extract_text("handout.pdf")
+
+        self.assertEqual("intro\nscanned page 1\nscanned page 2\nsummary", text)
+        # Pages go to the OCR pool a window (OCR_MAX_WORKERS pages) at a time
+        self.assertEqual([[1], [2]], [call.args[1] for call in ocr_pages.call_args_list])
+
+    def test_stops_reading_pages_once_the_budget_is_spent(self, ocr_pages):
+        pdf = FakePDF(["a" * 100, "b" * 100, "", "", "", ""])
+        with patch("apps.microapps.document_parser.fitz.open", return_value=pdf):
+            self.assertEqual("a" * 50, PDFParser().extract_text("handout.pdf", max_chars=50))
+
+        pdf.pages[2].get_text.assert_not_called()
+        self.assertEqual([], [page for call in ocr_pages.call_args_list for page in call.args[1]])
+
+    def test_ocr_all_pages(self, ocr_pages):
+        pdf = FakePDF(["intro", "summary"])
+        with patch("apps.microapps.document_parser.fitz.open", return_value=pdf):
+            text = PDFParser(ocr_all_pages=True).extract_text("handout.pdf")
+
+        self.assertEqual("scanned page 0\nscanned page 1", text)
+
+
+class OCRPoolTest(SimpleTestCase):
+    @patch("apps.microapps.document_parser.reset_ocr_pool")
+    @patch("apps.microapps.document_parser.get_ocr_pool")
+    def test_broken_pool_is_reset(self, get_ocr_pool, reset_ocr_pool):
+        get_ocr_pool.return_value.map.side_effect = BrokenProcessPool("worker was killed")
+
+        self.assertEqual(["", ""], ocr_pdf_pages("handout.pdf", [0, 3]))
+        reset_ocr_pool.assert_called_once()
@@ -0,0 +1,53 @@
+import asyncio
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.microapps.model_router import ModelRouter, clear_latencies, fallback_chain
+from apps.microapps.tests.utils import StubModel
+
+
+class ModelRouterTest(SimpleTestCase):
+    params = {"model": "stub/primary", "temperature": 1.5, "messages": []}
+
+    def setUp(self):
+        clear_latencies()
+
+    def test_fallback_chain_is_limited_to_plan(self):
+        self.assertEqual(
+            ["gpt-4o-mini", "gemini-2.5-flash"],
+            fallback_chain("claude-3-5-haiku", ["claude-3-5-haiku", "gpt-4o", "gpt-4o-mini", "unknown", "gemini-2.5-flash"], "free")
+        )
+
+    def test_fails_over_in_order(self):
+        primary, fallback = StubModel("primary", fails=True), StubModel("fallback", temperature_max=1.0)
+        response = ModelRouter([primary, fallback]).get_response(self.params)
+
+        self.assertEqual("fallback", response["data"]["ai_response"])
+        self.assertEqual("stub/fallback", response["data"]["model"])
+        self.assertIn("timeout", primary.calls[0])
+        self.assertEqual(1.0, fallback.calls[0]["temperature"])
+
+    def test_scoring_fails_over(self):
+        router = ModelRouter([StubModel("primary", fails=True), StubModel("fallback")])
+        self.assertEqual("fallback", router.score_response(self.params, 1)["ai_score"])
+
+    @patch("apps.microapps.model_router.ModelRoutingVariables.HEDGE_DEFAULT_DELAY", 0.05)
+    @patch("apps.microapps.model_router.ModelRoutingVariables.HEDGE_MIN_DELAY", 0.05)
+    def test_hedge_keeps_first_response(self):
+        router = ModelRouter([StubModel("primary", delay=1), StubModel("fallback")], hedge=True)
+        self.assertEqual("fallback", asyncio.run(router.aget_response(self.params))["data"]["ai_response"])
+
+    def test_fast_primary_is_not_hedged(self):
+        fallback = StubModel("fallback")
+        router = ModelRouter([StubModel("primary"), fallback], hedge=True)
+        self.assertEqual("primary", asyncio.run(router.aget_response(self.params))["data"]["ai_response"])
+        self.assertEqual([], fallback.calls)
+
+    @patch("apps.microapps.model_router.ModelRoutingVariables.HEDGE_DEFAULT_DELAY", 0.05)
+    @patch("apps.microapps.model_router.ModelRoutingVariables.HEDGE_MIN_DELAY", 0.05)
+    def test_sync_path_is_never_hedged(self):
+        fallback = StubModel("fallback")
+        router = ModelRouter([StubModel("primary", delay=0.2), fallback], hedge=True)
+        self.assertEqual("primary", router.get_response(self.params)["data"]["ai_response"])
+        self.assertEqual([], fallback.calls)
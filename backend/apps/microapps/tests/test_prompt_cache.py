@@ -0,0 +1,28 @@
+from django.test import SimpleTestCase
+
+from apps.microapps.llm_interface import UnifiedLLMInterface
+
+
+class PromptCacheBreakpointTest(SimpleTestCase):
+    messages = [
+        {"role": "system", "content": "Be helpful. " * 400},
+        {"role": "user", "content": "Context Documents:\n" + "text " * 1000},
+        {"role": "assistant", "content": "Instructions"},
+        {"role": "user", "content": "Question"},
+    ]
+
+    def test_marks_stable_prefix_for_anthropic(self):
+        marked = UnifiedLLMInterface.for_model("claude-3-5-haiku").cache_breakpoints(self.messages)
+        self.assertEqual(
+            [0, 1, 2],
+            [index for index, message in enumerate(marked) if isinstance(message["content"], list)]
+        )
+        self.assertEqual({"type": "ephemeral"}, marked[0]["content"][-1]["cache_control"])
+        self.assertEqual("Question", marked[-1]["content"])
+        # The run's own prompt is left as it was
+        self.assertIsInstance(self.messages[0]["content"], str)
+
+    def test_other_providers_and_short_prompts_are_unchanged(self):
+        self.assertIs(self.messages, UnifiedLLMInterface.for_model("gpt-4o-mini").cache_breakpoints(self.messages))
+        short = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Hi"}]
+        self.assertEqual(short, UnifiedLLMInterface.for_model("claude-3-5-haiku").cache_breakpoints(short))
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.microapps.provider_guard import CLOSED, HALF_OPEN, OPEN, ProviderGuard, ProviderUnavailable
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+@patch.multiple(
+    "apps.microapps.provider_guard.ProviderGuardVariables",
+    BREAKER_FAILURE_THRESHOLD=2, BREAKER_OPEN_SECONDS=30, CONCURRENCY_INITIAL=4, CONCURRENCY_MIN=1,
+    CONCURRENCY_WAIT_SECONDS=0, CONCURRENCY_POLL_SECONDS=0.01
+)
+class ProviderGuardTest(SimpleTestCase):
+    def call_failing(self, guard, exception=RateLimited):
+        with self.assertRaises(exception):
+            with guard.call():
+                raise exception()
+
+    def test_breaker_opens_and_probes(self):
+        guard = ProviderGuard("stub")
+        self.call_failing(guard)
+        self.call_failing(guard)
+        self.assertEqual(OPEN, guard.state)
+        with self.assertRaises(ProviderUnavailable):
+            guard.acquire()
+
+        guard.opened_at -= 30
+        with guard.call():
+            self.assertEqual(HALF_OPEN, guard.state)
+            # Only the probe goes through while half-open
+            with self.assertRaises(ProviderUnavailable):
+                guard.acquire()
+        self.assertEqual(CLOSED, guard.state)
+
+    def test_bad_requests_dont_count(self):
+        guard = ProviderGuard("stub")
+        for _ in range(3):
+            self.call_failing(guard, ValueError)
+        self.assertEqual(CLOSED, guard.state)
+        self.assertEqual(4, guard.limit)
+
+    def test_limit_shrinks_on_failure_and_grows_on_success(self):
+        guard = ProviderGuard("stub")
+        self.call_failing(guard)
+        self.assertEqual(2, guard.limit)
+        guard.acquire()
+        guard.acquire()
+        with self.assertRaises(ProviderUnavailable):
+            guard.acquire()
+        guard.release(True)
+        guard.release(True)
+        self.assertAlmostEqual(2.9, guard.limit)
+        self.assertEqual(0, guard.in_flight)
+
+    def test_waits_for_a_released_slot(self):
+        guard = ProviderGuard("stub")
+        for _ in range(4):
+            guard.acquire()
+        threading.Timer(0.05, guard.release, (True,)).start()
+        guard.acquire(timeout=5)
+        self.assertEqual(4, guard.in_flight)
+        with self.assertRaises(ProviderUnavailable):
+            guard.acquire(timeout=0.05)
+
+    def test_async_waits_for_a_released_slot(self):
+        guard = ProviderGuard("stub")
+        for _ in range(4):
+            guard.acquire()
+
+        async def wait_for_slot():
+            asyncio.get_running_loop().call_later(0.05, guard.release, True)
+            await guard.aacquire(timeout=5)
+
+        asyncio.run(wait_for_slot())
+        self.assertEqual(4, guard.in_flight)
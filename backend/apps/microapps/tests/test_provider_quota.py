@@ -0,0 +1,41 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from apps.microapps.provider_guard import ProviderUnavailable
+from apps.microapps.provider_quota import ProviderQuota, provider_call
+
+
+@patch.multiple(
+    "apps.microapps.provider_quota.ProviderQuotaVariables",
+    QUOTAS={"stub": {"rpm": 1, "tpm": 0}}, QUOTA_REFILL_SECONDS=5, QUOTA_MAX_WAIT_SECONDS=5, QUOTA_JITTER_SECONDS=0
+)
+class ProviderQuotaTest(SimpleTestCase):
+    def setUp(self):
+        caches["rate_limits"].clear()
+
+    def test_sync_call_fails_fast_when_the_quota_is_used_up(self):
+        with provider_call("stub", "key"):
+            pass
+
+        started = time.monotonic()
+        with self.assertRaises(ProviderUnavailable) as raised:
+            with provider_call("stub", "key"):
+                self.fail("The call went out without quota")
+        # The worker thread is not held while the quota refills; the client is told when to retry instead
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    def test_async_call_waits_for_the_quota(self):
+        quota = ProviderQuota("stub", "key")
+        quota.cache.set(quota.pause_key, time.time() + 0.05)
+        with self.assertRaises(ProviderUnavailable):
+            quota.reserve(0)
+
+        asyncio.run(quota.await_quota(0))
+        # The wait ended with the minute's one request reserved
+        with self.assertRaises(ProviderUnavailable):
+            quota.reserve(0)
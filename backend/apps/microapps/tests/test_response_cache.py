@@ -0,0 +1,60 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from apps.microapps.response_cache import cache_response, get_cached_response, response_cache, response_cache_stats
+from apps.users.models import CustomUser
+from apps.utils.global_variables import UsageVariables
+
+
+class ResponseCacheTest(SimpleTestCase):
+    api_params = {
+        "model": "openai/gpt-4o-mini",
+        "messages": [{"role": "user", "content": "I don't know"}],
+        "temperature": 0.0,
+        "top_p": 1.0,
+        "max_tokens": 5000,
+        "presence_penalty": 0.0,
+        "frequency_penalty": 0.0,
+    }
+
+    def setUp(self):
+        cache.clear()
+        response_cache().clear()
+
+    def test_hit_is_repriced_and_counted(self):
+        self.assertIsNone(get_cached_response(self.api_params))
+        cache_response(self.api_params, {"ai_response": "That's ok", "prompt_tokens": 10, "completion_tokens": 3, "cost": 0.01, "credits": 100})
+
+        hit = get_cached_response({**self.api_params, "stream": True}, transcription_cost=0.002)
+        self.assertEqual("That's ok", hit["ai_response"])
+        self.assertEqual(0.002, hit["cost"])
+        # The transcription still ran, so its credits are charged on top of the hit
+        self.assertEqual(UsageVariables.RESPONSE_CACHE_HIT_CREDITS + 20, hit["credits"])
+        self.assertEqual({"hits": 1, "misses": 1, "hit_rate": 0.5}, response_cache_stats())
+
+    def test_sampling_params_are_part_of_the_key(self):
+        cache_response(self.api_params, {"ai_response": "That's ok", "cost": 0, "credits": 0})
+        self.assertIsNone(get_cached_response({**self.api_params, "max_tokens": 100}))
+
+    def test_failover_response_is_cached_under_the_model_that_answered(self):
+        cache_response(self.api_params, {"ai_response": "That's ok", "cost": 0, "credits": 0, "model": "anthropic/claude-3-5-haiku"})
+        self.assertIsNone(get_cached_response(self.api_params))
+        self.assertEqual("That's ok", get_cached_response({**self.api_params, "model": "anthropic/claude-3-5-haiku"})["ai_response"])
+
+
+class ResponseCacheStatsViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        response_cache().clear()
+        self.client = APIClient()
+
+    def test_only_staff_see_the_counters(self):
+        get_cached_response(ResponseCacheTest.api_params)
+
+        self.client.force_authenticate(CustomUser.objects.create(username="teacher@example.com"))
+        self.assertEqual(403, self.client.get("/api/dashboard/api/response-cache/").status_code)
+
+        self.client.force_authenticate(CustomUser.objects.create(username="ops@example.com", is_staff=True))
+        response = self.client.get("/api/dashboard/api/response-cache/")
+        self.assertEqual({"hits": 0, "misses": 1, "hit_rate": 0.0}, response.data)
@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from apps.microapps.models import Microapp, MicroAppUserJoin
+from apps.microapps.run_context import clear_run_context_cache, resolve_run_context
+from apps.users.models import CustomUser
+
+
+class RunContextTest(TestCase):
+    def setUp(self):
+        clear_run_context_cache()
+        self.owner = CustomUser.objects.create(username="owner@example.com")
+        self.microapp = Microapp.objects.create(app_json={})
+        MicroAppUserJoin.objects.create(ma_id=self.microapp, user_id=self.owner, role="owner")
+
+    def test_resolves_in_one_query_and_caches(self):
+        with self.assertNumQueries(1):
+            context = resolve_run_context(self.microapp.id)
+        self.assertEqual(self.owner.id, context["app_owner_id"])
+        self.assertEqual(self.microapp.hash_id, context["app_hash_id"])
+        self.assertEqual(self.owner.date_joined, context["owner_date_joined"])
+
+        with self.assertNumQueries(0):
+            resolve_run_context(str(self.microapp.id))
+
+    def test_missing_owner(self):
+        with self.assertRaises(MicroAppUserJoin.DoesNotExist):
+            resolve_run_context(self.microapp.id + 1)
+        with self.assertRaises(MicroAppUserJoin.DoesNotExist):
+            resolve_run_context(None)
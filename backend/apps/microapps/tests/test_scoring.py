@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase
+
+from apps.microapps.views import RunList
+
+
+class ScoringModel:
+    """Answers a phase and scores it; with `overlap`, the answer waits until the scoring call has started"""
+
+    def __init__(self, overlap=False, score_fails=False):
+        self.overlap = overlap
+        self.score_fails = score_fails
+        self.calls = []
+        self.scoring_started = threading.Event()
+        self.async_scoring_started = None
+
+    def build_instruction(self, data, messages):
+        return messages + [{"role": "user", "content": f"Score this with the rubric: {data['rubric']}"}]
+
+    def answer(self, overlapped):
+        self.calls.append("response")
+        return {"status": True, "data": {
+            "ai_response": "Plants make sugar.", "overlapped": overlapped,
+            "prompt_tokens": 10, "completion_tokens": 5, "cost": 0.001, "credits": 10,
+        }}
+
+    def score(self):
+        self.calls.append("score")
+        if self.score_fails:
+            return {"status": False, "message": "rate limited", "retry_after": 2.5}
+        return {
+            "status": True, "ai_score": '{"total": "4"}', "score_result": True,
+            "prompt_tokens": 20, "completion_tokens": 3, "cost": 0.002, "credits": 20,
+        }
+
+    def get_response(self, params):
+        return self.answer(self.overlap and self.scoring_started.wait(timeout=5))
+
+    def score_response(self, params, minimum_score):
+        self.scoring_started.set()
+        return self.score()
+
+    async def aget_response(self, params):
+        overlapped = False
+        if self.overlap:
+            await asyncio.wait_for(self.async_scoring_started.wait(), timeout=5)
+            overlapped = True
+        return self.answer(overlapped)
+
+    async def ascore_response(self, params, minimum_score):
+        self.async_scoring_started.set()
+        return self.score()
+
+
+class ScoredPhaseTest(SimpleTestCase):
+    data = {"rubric": "accuracy out of 5", "minimum_score": 3}
+
+    def api_params(self):
+        return {"messages": [{"role": "user", "content": "What is photosynthesis?"}]}
+
+    def assertMerged(self, view, response, api_params):
+        self.assertTrue(response["status"])
+        usage = response["data"]
+        self.assertEqual((30, 8, 0.003, 30), (usage["prompt_tokens"], usage["completion_tokens"], usage["cost"], usage["credits"]))
+        self.assertEqual(('{"total": "4"}', True), (view.ai_score, view.score_result))
+        # The run stores the prompt that was scored
+        self.assertIn("rubric", api_params["messages"][-1]["content"])
+
+    def test_parallel_scoring_overlaps_the_response(self):
+        view, model, api_params = RunList(), ScoringModel(overlap=True), self.api_params()
+        response = view.scored_phase_response(model, {**self.data, "parallel_scoring": True}, api_params)
+
+        self.assertMerged(view, response, api_params)
+        self.assertTrue(response["data"]["overlapped"])
+
+    def test_async_parallel_scoring_overlaps_the_response(self):
+        view, model, api_params = RunList(), ScoringModel(overlap=True), self.api_params()
+
+        async def scored_phase():
+            model.async_scoring_started = asyncio.Event()
+            return await view.ascored_phase_response(model, {**self.data, "parallel_scoring": True}, api_params)
+
+        response = asyncio.run(scored_phase())
+        self.assertMerged(view, response, api_params)
+        self.assertTrue(response["data"]["overlapped"])
+
+    def test_scoring_waits_for_the_response_by_default(self):
+        view, model, api_params = RunList(), ScoringModel(), self.api_params()
+        response = view.scored_phase_response(model, self.data, api_params)
+
+        self.assertMerged(view, response, api_params)
+        self.assertEqual(["response", "score"], model.calls)
+
+    def test_failed_scoring_is_a_model_error(self):
+        view = RunList()
+        response = view.scored_phase_response(ScoringModel(score_fails=True), {**self.data, "parallel_scoring": True}, self.api_params())
+
+        self.assertFalse(response["status"])
+        error_response = view.model_error_response(response)
+        self.assertEqual(503, error_response.status_code)
+        self.assertEqual("3", error_response["Retry-After"])
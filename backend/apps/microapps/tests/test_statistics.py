@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.microapps.models import Microapp, Run, RunDailyRollup
+from apps.microapps.rollups import app_statistics, rollup_runs
+from apps.microapps.tests.utils import make_run
+from apps.users.models import CustomUser
+
+
+class AppConversationsTest(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create(username="owner@example.com")
+        self.microapp = Microapp.objects.create(app_json={})
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        for session_id, satisfaction, ai_model in [
+            ("a", 1, "gpt"), ("a", -1, "claude"), ("a", -1, "claude"),
+            ("b", 1, "gpt"), ("b", 0, "gpt"),
+            ("c", 0, "gemini"),
+        ]:
+            make_run(owner_id=self.owner, ma_id=self.microapp, session_id=session_id, satisfaction=satisfaction, ai_model=ai_model)
+
+    def test_modes_without_per_session_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/microapps/stats/conversations", {"app_id": self.microapp.id})
+        conversations = {conversation["session_id"]: conversation for conversation in response.data["data"]}
+        self.assertEqual((-1, "claude", 3), (conversations["a"]["satisfaction"], conversations["a"]["model"], conversations["a"]["messages_count"]))
+        self.assertEqual((1, "gpt"), (conversations["b"]["satisfaction"], conversations["b"]["model"]))
+        self.assertEqual((None, "gemini"), (conversations["c"]["satisfaction"], conversations["c"]["model"]))
+        self.assertIsNone(response.data["next_cursor"])
+
+    def test_cursor_pagination(self):
+        seen = []
+        params = {"app_id": self.microapp.id, "page_size": 2}
+        while True:
+            response = self.client.get("/api/microapps/stats/conversations", params)
+            seen += [conversation["session_id"] for conversation in response.data["data"]]
+            if not response.data["next_cursor"]:
+                break
+            params["cursor"] = response.data["next_cursor"]
+        self.assertEqual(["c", "b", "a"], seen)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/microapps/stats/conversations", {"cursor": "not-a-cursor"})
+        self.assertEqual(400, response.status_code)
+
+
+class RunRollupTest(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create(username="owner@example.com")
+        self.microapp = Microapp.objects.create(app_json={})
+        two_days_ago = timezone.now() - timedelta(days=2)
+        self.old_runs = [
+            make_run(owner_id=self.owner, ma_id=self.microapp, session_id="a", user_ip="10.0.0.1", satisfaction=1, cost=1, credits=10),
+            make_run(owner_id=self.owner, ma_id=self.microapp, session_id="a", user_ip="10.0.0.1", satisfaction=0, cost=1, credits=10),
+        ]
+        Run.objects.filter(id__in=[run.id for run in self.old_runs]).update(timestamp=two_days_ago)
+        make_run(owner_id=self.owner, ma_id=self.microapp, session_id="b", user_ip="10.0.0.2", satisfaction=-1, cost=2, credits=20)
+
+    def test_merges_rollups_with_live_runs(self):
+        rollup_runs()
+        self.assertEqual(1, RunDailyRollup.objects.count())
+
+        [statistics] = app_statistics(self.owner.id, app_id=self.microapp.id)
+        self.assertEqual(self.microapp.id, statistics["ma_id"])
+        self.assertEqual((1, 1, 2), (statistics["thumbs_up_count"], statistics["thumbs_down_count"], statistics["total_responses"]))
+        self.assertEqual(0.5, statistics["net_satisfaction_score"])
+        self.assertEqual((4, 40), (statistics["total_cost"], statistics["total_credits"]))
+        self.assertEqual((2, 2), (statistics["unique_users"], statistics["sessions"]))
+        self.assertEqual(20, statistics["avg_credits_session"])
+
+    def test_rebuilds_days_with_changed_runs(self):
+        rollup_runs()
+        run = Run.objects.get(id=self.old_runs[1].id)
+        run.satisfaction = -1
+        run.save()
+
+        rollup_runs()
+        [statistics] = app_statistics(self.owner.id)
+        self.assertEqual((1, 2), (statistics["thumbs_up_count"], statistics["thumbs_down_count"]))
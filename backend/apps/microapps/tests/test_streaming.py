@@ -0,0 +1,132 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from rest_framework.test import APIClient
+
+from apps.microapps.models import Run
+from apps.microapps.views import RunList
+from apps.microapps.tests.utils import RunViewTestCase, asse_events, completion, sse_events, stream_chunk
+from apps.utils.custom_error_message import ErrorMessages as error
+
+
+@patch("apps.microapps.llm_interface.litellm.completion_cost", return_value=0.001)
+@patch("apps.microapps.llm_interface.litellm.stream_chunk_builder", return_value=completion("Plants make sugar."))
+class RunStreamTest(RunViewTestCase):
+    url = "/api/microapps/run/anonymous/stream"
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    @patch("apps.microapps.llm_interface.litellm.completion")
+    def test_streams_tokens_then_saves_the_run(self, litellm_completion, *_):
+        litellm_completion.return_value = iter([stream_chunk("Plants "), stream_chunk("make sugar.")])
+        response = self.client.post(self.url, self.payload(), format="json")
+
+        self.assertEqual("text/event-stream", response["Content-Type"])
+        self.assertEqual("no", response["X-Accel-Buffering"])
+        events = sse_events(response)
+        self.assertEqual([("token", {"content": "Plants "}), ("token", {"content": "make sugar."})], events[:2])
+        event, done = events[-1]
+        self.assertEqual("done", event)
+        self.assertEqual("Plants make sugar.", done["data"]["response"])
+        self.assertIsNone(done["data"]["user_id"])
+        self.assertTrue(litellm_completion.call_args.kwargs["stream"])
+
+        run = Run.objects.get(id=done["data"]["id"])
+        self.assertEqual(("Plants make sugar.", 10, 5), (run.response, run.input_tokens, run.output_tokens))
+
+    @patch("apps.microapps.llm_interface.litellm.completion", side_effect=RuntimeError("provider is down"))
+    def test_provider_error_ends_the_stream(self, *_):
+        response = self.client.post(self.url, self.payload(), format="json")
+
+        self.assertEqual([("error", error.INVALID_PAYLOAD)], sse_events(response))
+        self.assertFalse(Run.objects.exists())
+
+    @patch("apps.microapps.llm_interface.litellm.completion")
+    def test_fixed_response_is_streamed_without_the_provider(self, litellm_completion, *_):
+        response = self.client.post(self.url, self.payload(fixed_response="Read chapter 2 first."), format="json")
+
+        events = sse_events(response)
+        self.assertEqual(("token", {"content": "Read chapter 2 first."}), events[0])
+        self.assertEqual("done", events[-1][0])
+        litellm_completion.assert_not_called()
+
+    @patch("apps.microapps.llm_interface.litellm.completion")
+    def test_disconnect_charges_the_partial_response(self, litellm_completion, stream_chunk_builder, *_):
+        provider_closed = []
+
+        def provider_stream():
+            try:
+                yield stream_chunk("Plants ")
+                yield stream_chunk("make sugar.")
+            finally:
+                provider_closed.append(True)
+
+        litellm_completion.return_value = provider_stream()
+        stream_chunk_builder.return_value = completion("Plants ", completion_tokens=1)
+        update_user_credits = MagicMock(return_value=True)
+
+        with patch.object(RunList, "update_user_credits", update_user_credits):
+            response = self.client.post(self.url, self.payload(), format="json")
+            content = response.streaming_content
+            self.assertIn(b"event: token", next(content))
+            # The client goes away after the first token
+            content.close()
+
+        self.assertEqual([True], provider_closed)
+        run = Run.objects.get()
+        self.assertEqual(("Plants ", 10, 1), (run.response, run.input_tokens, run.output_tokens))
+        self.assertEqual(run.id, update_user_credits.call_args.args[0])
+
+
+@patch("apps.microapps.llm_interface.litellm.completion_cost", return_value=0.001)
+@patch("apps.microapps.llm_interface.litellm.stream_chunk_builder", return_value=completion("Plants make sugar."))
+class AsyncRunStreamTest(RunViewTestCase):
+    url = "/api/microapps/run/anonymous/stream/async"
+
+    @patch("apps.microapps.llm_interface.litellm.completion")
+    @patch("apps.microapps.llm_interface.litellm.acompletion", new_callable=AsyncMock)
+    async def test_streams_from_the_async_client(self, litellm_acompletion, litellm_completion, *_):
+        async def provider_stream():
+            for text in ["Plants ", "make sugar."]:
+                yield stream_chunk(text)
+
+        litellm_acompletion.return_value = provider_stream()
+        response = await self.async_client.post(self.url, self.payload(), content_type="application/json")
+
+        # An async iterator is streamed by ASGI as it is produced, a sync one is read to the end first
+        self.assertTrue(response.is_async)
+        events = await asse_events(response)
+        self.assertEqual([("token", {"content": "Plants "}), ("token", {"content": "make sugar."})], events[:2])
+        self.assertEqual("done", events[-1][0])
+        litellm_completion.assert_not_called()
+        self.assertTrue(await Run.objects.filter(id=events[-1][1]["data"]["id"], response="Plants make sugar.").aexists())
+
+    @patch("apps.microapps.llm_interface.litellm.acompletion", new_callable=AsyncMock)
+    async def test_cancelled_request_charges_the_partial_response(self, litellm_acompletion, stream_chunk_builder, *_):
+        async def provider_stream():
+            yield stream_chunk("Plants ")
+            # The provider stalls until the request is cancelled
+            await asyncio.Event().wait()
+
+        litellm_acompletion.return_value = provider_stream()
+        stream_chunk_builder.return_value = completion("Plants ", completion_tokens=1)
+        response = await self.async_client.post(self.url, self.payload(), content_type="application/json")
+
+        received = []
+
+        async def read():
+            async for part in response.streaming_content:
+                received.append(part)
+
+        # The ASGI handler cancels the response task when the client disconnects
+        reader = asyncio.create_task(read())
+        while not received:
+            await asyncio.sleep(0)
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+
+        run = await Run.objects.aget()
+        self.assertEqual(("Plants ", 10, 1), (run.response, run.input_tokens, run.output_tokens))
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.microapps.models import Microapp
+from apps.microapps.token_budget import count_message, fit_context_window
+from apps.utils.global_variables import TokenBudgetVariables
+
+
+@patch("apps.microapps.token_budget.message_tokens", lambda model, message: len(message["content"]))
+@patch("apps.microapps.token_budget.REQUEST_OVERHEAD_TOKENS", 0)
+@patch.multiple("apps.microapps.token_budget.TokenBudgetVariables", CONTEXT_SAFETY_RATIO=0, MIN_COMPLETION_TOKENS=10)
+class ContextWindowTest(SimpleTestCase):
+    def params(self):
+        return {
+            "model": "stub",
+            "max_tokens": 500,
+            "messages": [
+                {"role": "system", "content": "s" * 20},
+                {"role": "user", "content": "u" * 30},
+                {"role": "assistant", "content": "a" * 30},
+                {"role": "user", "content": "q" * 20},
+            ],
+        }
+
+    @patch("apps.microapps.token_budget.context_window", return_value=200)
+    def test_clamps_max_tokens_to_remaining_window(self, _):
+        params = self.params()
+        self.assertTrue(fit_context_window(params, Microapp.TRIM_CONTEXT))
+        self.assertEqual(4, len(params["messages"]))
+        self.assertEqual(100, params["max_tokens"])
+
+    @patch("apps.microapps.token_budget.context_window", return_value=80)
+    def test_trims_oldest_turns(self, _):
+        params = self.params()
+        self.assertTrue(fit_context_window(params, Microapp.TRIM_CONTEXT))
+        # The oldest turn goes as a whole, question and answer
+        self.assertEqual(["system", "user"], [message["role"] for message in params["messages"]])
+        self.assertEqual("q" * 20, params["messages"][1]["content"])
+        self.assertEqual(80 - 40, params["max_tokens"])
+
+    @patch("apps.microapps.token_budget.context_window", return_value=80)
+    def test_keeps_context_documents(self, _):
+        params = self.params()
+        params["messages"].insert(1, {"role": "user", "content": "Context Documents:" + "d" * 2})
+        self.assertTrue(fit_context_window(params, Microapp.TRIM_CONTEXT))
+        self.assertEqual(["system", "user", "user"], [message["role"] for message in params["messages"]])
+        self.assertTrue(params["messages"][1]["content"].startswith("Context Documents:"))
+
+    @patch("apps.microapps.token_budget.context_window", return_value=40)
+    def test_rejects_when_pinned_messages_overflow(self, _):
+        self.assertFalse(fit_context_window(self.params(), Microapp.TRIM_CONTEXT))
+
+    @patch("apps.microapps.token_budget.context_window", return_value=80)
+    def test_reject_policy(self, _):
+        self.assertFalse(fit_context_window(self.params(), Microapp.REJECT_CONTEXT))
+
+
+class MessageTokensTest(SimpleTestCase):
+    @patch("apps.microapps.token_budget.litellm.token_counter", return_value=5)
+    def test_images_are_estimated_not_fetched(self, token_counter):
+        message = {"role": "user", "content": [
+            {"type": "text", "text": "describe this"},
+            {"type": "image_url", "image_url": {"url": "https://example.com/a.png"}},
+        ]}
+        self.assertEqual(5 + TokenBudgetVariables.IMAGE_TOKENS, count_message("stub", message))
+        self.assertEqual([{"role": "user", "content": "describe this"}], token_counter.call_args.kwargs["messages"])
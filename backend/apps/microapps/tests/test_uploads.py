@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.jobs.models import Job
+from apps.microapps.jobs import PARSE_UPLOAD
+from apps.microapps.models import Microapp
+from apps.users.models import CustomUser
+
+
+@patch("apps.microapps.views.get_s3_client")
+class DirectUploadTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="teacher@example.com")
+        self.microapp = Microapp.objects.create(app_json={})
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.file_key = f"microapps/{self.microapp.id}/files/original/syllabus.pdf"
+
+    def presign(self, filename):
+        return self.client.post(
+            f"/api/microapps/{self.microapp.id}/upload-file/presign/",
+            {"filename": filename, "content_type": "application/pdf"},
+            format="json"
+        )
+
+    def complete(self, key):
+        return self.client.post(f"/api/microapps/{self.microapp.id}/upload-file/complete/", {"key": key}, format="json")
+
+    def test_presign_is_scoped_to_the_app(self, get_s3_client):
+        s3 = get_s3_client.return_value
+        s3.generate_presigned_post.return_value = {"url": "https://uploads.s3.amazonaws.com/", "fields": {"policy": "signed"}}
+
+        response = self.presign("syllabus.pdf")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.file_key, response.data["data"]["fields"]["key"])
+        self.assertEqual("signed", response.data["data"]["fields"]["policy"])
+        conditions = s3.generate_presigned_post.call_args.kwargs["Conditions"]
+        self.assertIn({"key": self.file_key}, conditions)
+        self.assertIn("content-length-range", [condition[0] for condition in conditions if isinstance(condition, list)])
+
+    def test_presign_rejects_unsupported_files(self, get_s3_client):
+        response = self.presign("installer.exe")
+
+        self.assertEqual(400, response.status_code)
+        get_s3_client.return_value.generate_presigned_post.assert_not_called()
+
+    def test_complete_queues_parsing(self, get_s3_client):
+        get_s3_client.return_value.head_object.return_value = {"ContentLength": 2048}
+
+        response = self.complete(self.file_key)
+
+        self.assertEqual(202, response.status_code)
+        job = Job.objects.get(job_uuid=response.data["data"]["job_id"])
+        self.assertEqual((PARSE_UPLOAD, self.user.id), (job.kind, job.user_id))
+        self.assertEqual({"original_file": self.file_key, "filename": "syllabus.pdf"}, job.payload)
+
+    def test_complete_rejects_other_apps_keys(self, get_s3_client):
+        response = self.complete(f"microapps/{self.microapp.id + 1}/files/original/syllabus.pdf")
+
+        self.assertEqual(403, response.status_code)
+        get_s3_client.return_value.head_object.assert_not_called()
+        self.assertFalse(Job.objects.exists())
+
+    def test_complete_checks_the_stored_object(self, get_s3_client):
+        s3 = get_s3_client.return_value
+        s3.head_object.side_effect = ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        self.assertEqual(400, self.complete(self.file_key).status_code)
+
+        # Presigned posts enforce the size, but the stored object is checked again before parsing
+        s3.head_object.side_effect = None
+        s3.head_object.return_value = {"ContentLength": 50 * 1024 * 1024}
+        self.assertEqual(400, self.complete(self.file_key).status_code)
+        self.assertFalse(Job.objects.exists())
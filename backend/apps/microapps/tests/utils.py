@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from apps.microapps.models import Microapp, MicroAppUserJoin, Run
+from apps.microapps.provider_guard import clear_provider_guards
+from apps.microapps.run_context import clear_run_context_cache
+from apps.microapps.views import RunList
+from apps.users.models import CustomUser
+from apps.utils.usage_helper import GuestUsage
+
+
+def make_run(**kwargs):
+    fields = {
+        "satisfaction": 0, "system_prompt": {}, "phase_instructions": {}, "user_prompt": {}, "cost": 0, "credits": 1,
+        "no_submission": False, "ai_model": "openai/gpt-4o-mini", "temperature": 1.0, "max_tokens": 5000, "top_p": 1.0,
+        "frequency_penalty": 0.0, "presence_penalty": 0.0, "input_tokens": 0, "output_tokens": 0, "scored_run": False,
+        "run_score": "", "minimum_score": 0.0, "rubric": "",
+    }
+    fields.update(kwargs)
+    return Run.objects.create(**fields)
+
+
+class StubModel:
+    """A local stand-in for a provider: answers after `delay` seconds, or fails"""
+    def __init__(self, name, delay=0, fails=False, temperature_max=2.0):
+        self.model_name = name
+        self.model_config = {"model": f"stub/{name}", "temperature_min": 0.0, "temperature_max": temperature_max}
+        self.delay = delay
+        self.fails = fails
+        self.calls = []
+
+    def result(self, params):
+        self.calls.append(params)
+        if self.fails:
+            return {"status": False, "message": f"{self.model_name} is down"}
+        return {"status": True, "data": {"ai_response": self.model_name}}
+
+    def get_response(self, params):
+        time.sleep(self.delay)
+        return self.result(params)
+
+    async def aget_response(self, params):
+        await asyncio.sleep(self.delay)
+        return self.result(params)
+
+    def score_response(self, params, minimum_score):
+        result = self.result(params)
+        return result if not result["status"] else {"status": True, "ai_score": self.model_name, "score_result": True}
+
+
+def completion(content, prompt_tokens=10, completion_tokens=5, cost=0.001):
+    """A litellm completion response as the interface reads it"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            prompt_tokens_details=None,
+        ),
+        _hidden_params={"response_cost": cost},
+    )
+
+
+def stream_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+def parse_sse(body):
+    """The (event, data) pairs of a server-sent event stream"""
+    events = []
+    for block in body.decode().strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def sse_events(response):
+    return parse_sse(b"".join(response.streaming_content))
+
+
+async def asse_events(response):
+    return parse_sse(b"".join([part async for part in response.streaming_content]))
+
+
+class RunViewTestCase(TestCase):
+    """
+    Runs against a microapp with an owner, through the real views and model interface. Only litellm is left
+    for each test to mock; billing, the guest limit and token counting are stubbed out.
+    """
+
+    def setUp(self):
+        clear_run_context_cache()
+        clear_provider_guards()
+        self.owner = CustomUser.objects.create(username="owner@example.com")
+        self.microapp = Microapp.objects.create(app_json={})
+        MicroAppUserJoin.objects.create(ma_id=self.microapp, user_id=self.owner, role="owner")
+        for patcher in [
+            patch.object(RunList, "check_owner_credits", lambda view, data: {"status": True, "app_owner_id": self.owner.id}),
+            patch.object(RunList, "update_user_credits", lambda view, *args: True),
+            patch.object(GuestUsage, "check_usage_limit", lambda view, ip: True),
+            patch("apps.microapps.views.fit_context_window", return_value=True),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def payload(self, **kwargs):
+        return {
+            "ma_id": self.microapp.id,
+            "model": "gpt-4o-mini",
+            "messages": [{"role": "user", "content": "What is photosynthesis?"}],
+            "temperature": 1.0,
+            **kwargs,
+        }
@@ -0,0 +1,116 @@
+"""
+Pre-flight token budgeting: fit a run's prompt and max_tokens into the model's context window before the call,
+instead of paying for a round trip that the provider rejects.
+
+Tokens are counted locally with litellm's tokenizer for the model. Each message is counted once per process
+and remembered by its content hash, since a session re-sends the same turns with every run.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import litellm
+
+from apps.microapps.models import Microapp
+from apps.utils.global_variables import TokenBudgetVariables
+
+# Frame tokens every request adds around its messages
+REQUEST_OVERHEAD_TOKENS = 3
+
+_token_counts = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def context_window(model):
+    """The model's input window from litellm's model map, or DEFAULT_CONTEXT_WINDOW when it isn't listed"""
+    try:
+        return litellm.get_model_info(model)["max_input_tokens"] or TokenBudgetVariables.DEFAULT_CONTEXT_WINDOW
+    except Exception:
+        return TokenBudgetVariables.DEFAULT_CONTEXT_WINDOW
+
+
+def count_message(model, message):
+    """Tokens of one message; image parts get a fixed estimate so counting never fetches or decodes images"""
+    content = message.get("content")
+    if not isinstance(content, list):
+        return litellm.token_counter(model=model, messages=[message])
+    parts = [part for part in content if isinstance(part, dict)]
+    text = "".join(part.get("text", "") for part in parts if part.get("type") == "text")
+    images = sum(1 for part in parts if part.get("type") == "image_url")
+    return (
+        litellm.token_counter(model=model, messages=[{"role": message.get("role", "user"), "content": text}])
+        + images * TokenBudgetVariables.IMAGE_TOKENS
+    )
+
+
+def message_tokens(model, message):
+    digest = hashlib.sha256(json.dumps(message, sort_keys=True, default=str).encode()).hexdigest()
+    key = (model, digest)
+    with _token_counts_lock:
+        if key in _token_counts:
+            _token_counts.move_to_end(key)
+            return _token_counts[key]
+
+    count = count_message(model, message)
+    with _token_counts_lock:
+        _token_counts[key] = count
+        if len(_token_counts) > TokenBudgetVariables.TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def clear_token_counts():
+    with _token_counts_lock:
+        _token_counts.clear()
+
+
+def conversation_turns(messages):
+    """
+    The conversation turns that may be trimmed, as index lists of a user message and the replies that follow it.
+    The system prompt and context documents at the head and the new submission at the end are never included.
+    """
+    head = 0
+    while head < len(messages) - 1 and (
+        messages[head].get("role") == "system"
+        or str(messages[head].get("content", "")).startswith("Context Documents:")
+    ):
+        head += 1
+    turns = []
+    for index in range(head, len(messages) - 1):
+        if not turns or messages[index].get("role") == "user":
+            turns.append([])
+        turns[-1].append(index)
+    return turns
+
+
+def fit_context_window(params, policy):
+    """
+    Drop the oldest conversation turns, a user message together with its replies, until the prompt fits the
+    window (the trim policy), then clamp max_tokens to the room that is left. Updates params in place;
+    returns False when the prompt can't be made to fit.
+    """
+    model = params["model"]
+    messages = params["messages"]
+    window = int(context_window(model) * (1 - TokenBudgetVariables.CONTEXT_SAFETY_RATIO))
+    counts = [message_tokens(model, message) for message in messages]
+    prompt_tokens = sum(counts) + REQUEST_OVERHEAD_TOKENS
+    available = window - TokenBudgetVariables.MIN_COMPLETION_TOKENS
+
+    if prompt_tokens > available:
+        if policy != Microapp.TRIM_CONTEXT:
+            return False
+        dropped = set()
+        for turn in conversation_turns(messages):
+            if prompt_tokens <= available:
+                break
+            dropped.update(turn)
+            prompt_tokens -= sum(counts[index] for index in turn)
+        if prompt_tokens > available:
+            return False
+        params["messages"] = [message for index, message in enumerate(messages) if index not in dropped]
+
+    params["max_tokens"] = max(min(int(params["max_tokens"]), window - prompt_tokens), 1)
+    return True
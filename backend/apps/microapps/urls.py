@@ -16,6 +16,12 @@ urlpatterns = [
     path('apps', views.UserApps.as_view(), name = "user_apps"),
     path('run', views.RunList.as_view(), name="run_model"),
     path('run/anonymous', views.AnonymousRunList.as_view(), name="anonymous_run_model"),
+    path('run/stream', views.RunStreamList.as_view(), name="run_model_stream"),
+    path('run/anonymous/stream', views.AnonymousRunStreamList.as_view(), name="anonymous_run_model_stream"),
+    path('run/async', views.AsyncRunList.as_view(), name="run_model_async"),
+    path('run/anonymous/async', views.AsyncAnonymousRunList.as_view(), name="anonymous_run_model_async"),
+    path('run/stream/async', views.AsyncRunStreamList.as_view(), name="run_model_stream_async"),
+    path('run/anonymous/stream/async', views.AsyncAnonymousRunStreamList.as_view(), name="anonymous_run_model_stream_async"),
     path('models/configuration/', views.AIModelConfigurations.as_view(), name="models_configuration"),
     path('public/app/<int:id>', views.PublicMicroApps.as_view(), name = "public_microapps"),
     path('public/hash/<str:hash_id>', views.PublicMicroAppsByHash.as_view(), name = "public_microapps_by_hash"),
@@ -27,8 +33,13 @@ urlpatterns = [
     path('quota/', views.AppQuota.as_view(), name='app-quota'),
     path('<int:pk>/upload-image/', views.MicroAppImageUpload.as_view(), name='microapp-upload-image'),
     path('<int:pk>/upload-file/', views.MicroAppFileUpload.as_view(), name='microapp-upload-file'),
+    path('<int:pk>/upload-file/presign/', views.MicroAppFilePresign.as_view(), name='microapp-upload-file-presign'),
+    path('<int:pk>/upload-file/complete/', views.MicroAppFileUploadComplete.as_view(), name='microapp-upload-file-complete'),
     path('parse-file/', views.ParseFile.as_view(), name='parse-file'),
     path('transcribe/', views.AudioTranscription.as_view(), name='audio-transcription'),
     path('transcribe/anonymous/', views.AnonymousAudioTranscription.as_view(), name='anonymous-audio-transcription'),
+    path('transcribe/async/', views.AsyncAudioTranscription.as_view(), name='audio-transcription-async'),
+    path('transcribe/anonymous/async/', views.AsyncAnonymousAudioTranscription.as_view(), name='anonymous-audio-transcription-async'),
     path('tts/', views.TextToSpeech.as_view(), name='text-to-speech'),
+    path('tts/async/', views.AsyncTextToSpeech.as_view(), name='text-to-speech-async'),
 ]
@@ -1,12 +1,20 @@
+import asyncio
+import base64
+import csv
 import datetime
+import io
+import math
 import re
 import uuid
 import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, closing
 import environ
 import logging as log
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from rest_framework.permissions import IsAuthenticated, AllowAny 
@@ -27,31 +35,42 @@ from apps.microapps.serializer import (
     RunPatchSerializer
 )
 from apps.users.serializers import UserSerializer
+from apps.api.views import AsyncAPIView
+from apps.utils.clients import get_s3_client, upload_to_s3
 from apps.utils.usage_helper import RunUsage, MicroAppUsage, GuestUsage, get_user_ip
 from apps.utils.global_variables import AIModelConstants, MicroappVariables, UsageVariables
 from apps.microapps.models import Microapp, MicroAppUserJoin, Run
 from apps.microapps.document_parser import DocumentParser, DocumentProcessor
+from apps.microapps.jobs import PARSE_FILE, PARSE_UPLOAD
+from apps.microapps.document_cache import file_sha256, find_parsed_document, read_parsed_text, upload_result
+from apps.jobs.queue import enqueue
+from apps.microapps.response_cache import cache_response, get_cached_response
+from apps.microapps.rollups import app_statistics
+from apps.microapps.model_router import ModelRouter, fallback_chain
+from apps.microapps.run_context import resolve_run_context
+from apps.microapps.token_budget import fit_context_window
 from apps.collection.models import Collection, CollectionUserJoin
 from apps.collection.serializer import CollectionMicroappSerializer
 from rest_framework.exceptions import PermissionDenied
+from botocore.exceptions import ClientError
 from rest_framework import generics
-from django.db.models import Min, Case, When, Count, F, Sum, Value, FloatField, Q, ExpressionWrapper, IntegerField
+from django.db.models import Min, Case, When, Count, F, Sum, Value, FloatField, Q, ExpressionWrapper, IntegerField, Window
 
-from django.db.models.functions import Round
+from django.db.models.functions import Round, RowNumber
 from apps.subscriptions.models import BillingCycle, TopUpToSubscription
-from apps.subscriptions.serializers import UsageEventSerializer, BillingDetailsSerializer
+from apps.subscriptions.serializers import BillingDetailsSerializer
+from apps.subscriptions.ledger import charge_run, get_user_plan
 from django.utils import timezone
 import stripe
-import boto3
-from botocore.config import Config
-from rest_framework import serializers
+from rest_framework import serializers, renderers
 from rest_framework.decorators import action
 from django.conf import settings
 import json
 from .llm_interface import UnifiedLLMInterface
 import tempfile
 import requests
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 env = environ.Env()
@@ -77,6 +96,20 @@ def handle_exception(e):
         status=status.HTTP_500_INTERNAL_SERVER_ERROR,
     )
 
+def sse_event(event, data):
+    """Format a server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """Renders plain API responses as a single server-sent event, so streaming clients can read errors"""
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get("response")
+        event = "error" if response is not None and response.status_code >= 400 else "message"
+        return sse_event(event, data).encode(self.charset)
+
 @extend_schema_view(
     get=extend_schema(responses={200: MicroAppSerializer(many=True)}, summary = "Get all microapps on a platform"),
     post=extend_schema(request=MicroAppSwaggerPostSerializer, responses={200: MicroAppSerializer}, summary = "Add microapp"),
@@ -531,6 +564,10 @@ class PublicMicroApps(APIView):
             OpenApiParameter(name="session_id", description="Optional Session ID", required=False),
             OpenApiParameter(name="start_date", description="Optional Start Date", required=False),
             OpenApiParameter(name="end_date", description="Optional End Date", required=False),
+            OpenApiParameter(name="fields", description="Optional comma-separated run fields to return", required=False),
+            OpenApiParameter(name="page_size", description="Optional page size, enables cursor pagination", required=False),
+            OpenApiParameter(name="cursor", description="Optional next_cursor of the previous page", required=False),
+            OpenApiParameter(name="format", description="Optional streamed export format: ndjson or csv", required=False),
         ],
     ),
     post=extend_schema(request = RunPostSerializer, responses={200: RunGetSerializer}),
@@ -538,6 +575,7 @@ class PublicMicroApps(APIView):
 )
 class RunList(APIView):
     permission_classes = [AllowAny]
+    max_page_size = 500
     ai_score = ""
     score_result = True
     app_hash_id = ""
@@ -597,7 +635,8 @@ class RunList(APIView):
                 "satisfaction": 0,
                 "prompt": api_params["messages"],
                 "no_submission": data.get("no_submission", False),
-                "ai_model": api_params["model"],
+                # Set when a fallback model answered instead of the requested one
+                "ai_model": response.get("model", api_params["model"]),
                 "temperature": float(api_params["temperature"]),
                 "max_tokens": max_tokens,
                 "top_p": api_params["top_p"],
@@ -613,6 +652,7 @@ class RunList(APIView):
                 "cost": usage["cost"],
                 "response": usage["ai_response"],
                 "input_tokens": usage["prompt_tokens"],
+                "cached_input_tokens": usage.get("cached_tokens", 0),
                 "output_tokens": usage["completion_tokens"],
                 "owner_id": app_owner_id,
                 "user_ip": ip,
@@ -639,204 +679,574 @@ class RunList(APIView):
 
     def update_user_credits(self, run_id, app_owner_id, consumer_id):
         try:
-            billing_cycle = BillingCycle.objects.filter(
-                user=app_owner_id,
-                status='open',
-                start_date__lte=timezone.now(),
-                end_date__gte=timezone.now()
-            ).first()
-
-            main_available = billing_cycle.credits_remaining
-            
-            top_ups = TopUpToSubscription.objects.filter(user=app_owner_id)
-            
-            original_credits = self.credits
-            credits_to_deduct = original_credits
-
-            if main_available >= credits_to_deduct:
-                billing_cycle.record_usage(credits_to_deduct)
-                credits_to_deduct = 0
-            else:
-                billing_cycle.record_usage(main_available)
-                credits_to_deduct -= main_available
-
-            if credits_to_deduct > 0:
-                top_ups_to_update = top_ups.filter(allocated_credits__gt=F('used_credits')).order_by('created_at')
-                for top_up in top_ups_to_update:
-                    if credits_to_deduct <= 0:
-                        break
-                    available_in_topup = top_up.remaining_credits
-                    if available_in_topup >= credits_to_deduct:
-                        top_up.record_usage(credits_to_deduct)
-                        credits_to_deduct = 0
-                    else:
-                        top_up.record_usage(available_in_topup)
-                        credits_to_deduct -= available_in_topup
-                
-            try:
-                # Create usage event
-                usage_event_data = {
-                    "billing_cycle": billing_cycle.id,
-                    "top_up": top_up.id if top_up else None,
-                    "user": app_owner_id,
-                    "consumer": consumer_id,
-                    "run_id": run_id,
-                    "credits_charged": original_credits,
-                    "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                serializer = UsageEventSerializer(data=usage_event_data)
-                if serializer.is_valid():
-                    serializer.save()
-                    
-                    return True
-                
-                log.error(serializer.errors)
-                return False
-                
-            except ValueError as e:
-                log.error(f"Error recording usage: {str(e)}")
-                return False
-                    
-            
+            # Debits the billing cycle, then top-ups, and records the usage event in one transaction
+            return charge_run(app_owner_id, run_id, self.credits, consumer_id) is not None
         except Exception as e:
             log.error(e)
             return False
 
-    def post(self, request, format=None):
+    def normalize_payload(self, data):
+        #If field exists, convert to float:
+        if data.get("temperature"): data["temperature"] = float(data.get("temperature"))
+        if data.get("frequency_penalty"): data["frequency_penalty"] = float(data.get("frequency_penalty"))
+        if data.get("presence_penalty"): data["presence_penalty"] = float(data.get("presence_penalty"))
+        if data.get("top_p"): data["top_p"] = float(data.get("top_p"))
+        if data.get("minimum_score"): data["minimum_score"] = float(data.get("minimum_score"))
+        if data.get("max_tokens"): data["max_tokens"] = int(data.get("max_tokens"))
+        if data.get("transcription_cost"): data["transcription_cost"] = float(data.get("transcription_cost"))
+        return data
+
+    def check_owner_credits(self, data):
+        """Resolve the microapp owner and hash id, and check that the owner has credits left"""
+        run_context = resolve_run_context(data.get("ma_id"))
+        app_owner_id = run_context["app_owner_id"]
+        self.app_hash_id = run_context["app_hash_id"]
+        # Check if the owner has any credits available
+        credits_check = RunUsage.check_for_available_credits(self, app_owner_id, run_context["owner_date_joined"])
+        if not credits_check["has_credits"]:
+            return {
+                "status": False,
+                "response": Response(
+                    {"error": credits_check["message"]},
+                    status = status.HTTP_400_BAD_REQUEST
+                )
+            }
+        return {"status": True, "app_owner_id": app_owner_id}
+
+    def prepare_model(self, data):
+        """Route the AI model and build the API parameters for the run"""
+        # Return model instance based on AI-model name
+        model_name = data.get("model", env("DEFAULT_AI_MODEL"))
+        model_router = AIModelRoute().get_ai_model(model_name)
+       
+        if not model_router:
+            return {
+                "status": False,
+                "response": Response({"error": error.UNSUPPORTED_AI_MODEL, "status": status.HTTP_400_BAD_REQUEST},
+                    status=status.HTTP_400_BAD_REQUEST)
+            }
+       
+        model = model_router["model"]
+
+        # Fail over to the microapp's fallback models when the provider errors or stalls
+        run_context = None
+        if data.get("ma_id") is not None:
+            run_context = resolve_run_context(data.get("ma_id"))
+            fallback_models = fallback_chain(model_name, run_context["fallback_models"], run_context["owner_plan"])
+            if fallback_models:
+                model = ModelRouter.for_models(model_name, fallback_models, hedge=run_context["hedge_requests"])
+
+        # Validate model specific API request payload
+        ai_validation = model.validate_params(data) 
+        
+        if not ai_validation["status"]:
+            return {
+                "status": False,
+                "response": Response({"error": error.validation_error(ai_validation["message"]), "status": status.HTTP_400_BAD_REQUEST},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            }
+        # Retrieve default API parameters for the AI model
+        api_params = model.get_default_params(data)
+        
+        # Format model specific message content  
+        api_params["messages"] = model.get_model_message(api_params["messages"], data)
+
+        # Fit the prompt and max_tokens into the context window before paying for the call
+        context_policy = run_context["context_policy"] if run_context else Microapp.TRIM_CONTEXT
         try:
-            data = request.data
-            #If field exists, convert to float:
-            if data.get("temperature"): data["temperature"] = float(data.get("temperature"))
-            if data.get("frequency_penalty"): data["frequency_penalty"] = float(data.get("frequency_penalty"))
-            if data.get("presence_penalty"): data["presence_penalty"] = float(data.get("presence_penalty"))
-            if data.get("top_p"): data["top_p"] = float(data.get("top_p"))
-            if data.get("minimum_score"): data["minimum_score"] = float(data.get("minimum_score"))
-            if data.get("max_tokens"): data["max_tokens"] = int(data.get("max_tokens"))
-            if data.get("transcription_cost"): data["transcription_cost"] = float(data.get("transcription_cost"))
+            fits = fit_context_window(api_params, context_policy)
+        except Exception as e:
+            # Counting is only a pre-flight check; the provider still enforces the real limit
+            log.error(f"Could not count prompt tokens for {api_params['model']}, sending the run untrimmed: {str(e)}")
+            fits = True
+        if not fits:
+            return {
+                "status": False,
+                "response": Response(error.CONTEXT_TOO_LONG, status=status.HTTP_400_BAD_REQUEST)
+            }
 
-            if 'cost' in data:
-                # Round cost to 6 decimal places before serializer
-                data['cost'] = round(float(data['cost']), 6)
-            # Check for mandatory keys in the user request payload
-            if not self.check_payload(data, request):    
-                return Response(
+        # Add transcription cost to api_params before get_response
+        api_params["transcription_cost"] = float(data.get("transcription_cost", 0))
+
+        return {"status": True, "model": model, "api_params": api_params}
+
+    def prepare_run(self, request, data):
+        """
+        Run every check that happens before the AI model is called.
+        Returns {"status": False, "response": Response} when the run should be rejected.
+        """
+        data = self.normalize_payload(data)
+
+        if 'cost' in data:
+            # Round cost to 6 decimal places before serializer
+            data['cost'] = round(float(data['cost']), 6)
+        # Check for mandatory keys in the user request payload
+        if not self.check_payload(data, request):    
+            return {
+                "status": False,
+                "response": Response(
                     error.FIELD_MISSING,
                     status = status.HTTP_400_BAD_REQUEST,
                 )
-            ip = get_user_ip(request)
-            # Handle guest users usage
-            if not request.user.id:
-                if not GuestUsage.check_usage_limit(self, ip):
-                    return Response(error.RUN_USAGE_LIMIT_EXCEED, status = status.HTTP_400_BAD_REQUEST)
-                app_owner_id = None
-            # Handle logged-in users usage
-            else:
-                # Get microapp owner id
-                app_owner = MicroAppUserJoin.objects.get(ma_id = data.get("ma_id"),role = "owner")
-                app_owner_id = MicroappUserSerializer(app_owner).data["user_id"]
-                # Get ma hash_id
-                ma_data = Microapp.objects.get(id=data.get("ma_id"))
-                self.app_hash_id = MicroAppSerializer(ma_data).data["hash_id"]
-                # Get owner details
-                users = CustomUser.objects.get(id = app_owner_id)
-                user_date_joined = UserSerializer(users).data["date_joined"]
-                # Check if the owner has any credits available
-                credits_check = RunUsage.check_for_available_credits(self, app_owner_id, user_date_joined)
-                if not credits_check["has_credits"]:
-                    return Response(
-                        {"error": credits_check["message"]},
-                        status = status.HTTP_400_BAD_REQUEST
-                    )
-                
-            # Return model instance based on AI-model name
-            model_router = AIModelRoute().get_ai_model(data.get("model", env("DEFAULT_AI_MODEL")))
-           
-            if not model_router:
-                return Response({"error": error.UNSUPPORTED_AI_MODEL, "status": status.HTTP_400_BAD_REQUEST},
-                    status=status.HTTP_400_BAD_REQUEST)
-           
-            model = model_router["model"]
+            }
+        ip = get_user_ip(request)
+        # Handle guest users usage
+        if not request.user.id:
+            if not GuestUsage.check_usage_limit(self, ip):
+                return {"status": False, "response": Response(error.RUN_USAGE_LIMIT_EXCEED, status = status.HTTP_400_BAD_REQUEST)}
+            app_owner_id = None
+        # Handle logged-in users usage
+        else:
+            owner_check = self.check_owner_credits(data)
+            if not owner_check["status"]:
+                return owner_check
+            app_owner_id = owner_check["app_owner_id"]
+
+        model_check = self.prepare_model(data)
+        if not model_check["status"]:
+            return model_check
+
+        return {
+            "status": True,
+            "ip": ip,
+            "app_owner_id": app_owner_id,
+            "model": model_check["model"],
+            "api_params": model_check["api_params"]
+        }
 
-            # Validate model specific API request payload
-            ai_validation = model.validate_params(data) 
-            
-            if not ai_validation["status"]:
-                return Response({"error": error.validation_error(ai_validation["message"]), "status": status.HTTP_400_BAD_REQUEST},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            # Retrieve default API parameters for the AI model
-            api_params = model.get_default_params(data)
-            
-            # Format model specific message content  
-            api_params["messages"] = model.get_model_message(api_params["messages"], data)
-
-            # Add transcription cost to api_params before get_response
-            api_params["transcription_cost"] = float(data.get("transcription_cost", 0))
-
-            # Handle skip phase
-            if data.get("request_skip"):
-                response = self.skip_phase()
-                self.response_type = MicroappVariables.FIXED_RESPONSE_TYPE
-            elif data.get("fixed_response"):
-               # Handle hardcoded phase
-                response = self.fixed_response_phase(data.get("fixed_response"))
-                self.response_type = MicroappVariables.FIXED_RESPONSE_TYPE
-            elif data.get("no_submission"):
-               # Handle no-submission phase
-               response = self.no_submission_phase()
-               self.response_type = MicroappVariables.FIXED_RESPONSE_TYPE
-            # Handle score phase
-            elif data.get("scored_run"):
-                response = model.get_response(api_params)
-                response = response["data"]
-                api_params["messages"] = model.build_instruction(data, api_params["messages"])
-                score_response = model.score_response(api_params, data.get("minimum_score"))
-                self.ai_score = score_response["ai_score"]
-                self.score_result = score_response["score_result"]
-                response.update({
-                    "prompt_tokens": response["prompt_tokens"] + score_response["prompt_tokens"],
-                    "completion_tokens": response["completion_tokens"] + score_response["completion_tokens"],
-                })
-                response.update({
-                    "cost": round(response["cost"] + score_response["cost"], 6),
-                })
-                response.update({
-                    "credits": response["credits"] + score_response["credits"],
-                })
-                self.response_type = MicroappVariables.DEFAULT_RESPONSE_TYPE
-            # Handle basic feedback phase
-            else:
+    def merge_score_response(self, response, score_response):
+        """
+        Add the scoring call's usage to the phase response and store its score.
+        Returns the phase response, or the failed scoring call so the caller can answer with a model error.
+        """
+        if not score_response["status"]:
+            return score_response
+        self.ai_score = score_response["ai_score"]
+        self.score_result = score_response["score_result"]
+        response.update({
+            "prompt_tokens": response["prompt_tokens"] + score_response["prompt_tokens"],
+            "completion_tokens": response["completion_tokens"] + score_response["completion_tokens"],
+        })
+        response.update({
+            "cost": round(response["cost"] + score_response["cost"], 6),
+        })
+        response.update({
+            "credits": response["credits"] + score_response["credits"],
+        })
+        return {"status": True, "data": response}
+
+    def scoring_params(self, model, data, api_params):
+        """API parameters for the rubric scoring call: the phase conversation plus the scoring instruction"""
+        return {**api_params, "messages": model.build_instruction(data, list(api_params["messages"]))}
+
+    def scored_phase_response(self, model, data, api_params):
+        """
+        Get the phase response and its rubric score.
+
+        Phases with parallel_scoring set only grade the user's submission, so both completions are issued
+        at once; otherwise the scoring call waits for the response.
+        """
+        score_params = self.scoring_params(model, data, api_params)
+        if data.get("parallel_scoring"):
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                score_future = executor.submit(model.score_response, score_params, data.get("minimum_score"))
                 response = model.get_response(api_params)
-                if not response["status"]:
-                    return Response({"error": error.INVALID_PAYLOAD, "status": status.HTTP_400_BAD_REQUEST}, status=status.HTTP_400_BAD_REQUEST)
-                response = response["data"]
-                
-                self.response_type = MicroappVariables.DEFAULT_RESPONSE_TYPE
-            # Create response data
-            run_data = self.route_api_response(response, data, api_params, model, app_owner_id, ip)
+                score_response = score_future.result()
+        else:
+            response = model.get_response(api_params)
+            score_response = model.score_response(score_params, data.get("minimum_score"))
+
+        # The run stores the prompt that was scored
+        api_params["messages"] = score_params["messages"]
+        if not response["status"]:
+            return response
+        return self.merge_score_response(response["data"], score_response)
+
+    async def ascored_phase_response(self, model, data, api_params):
+        """Async counterpart of scored_phase_response"""
+        score_params = self.scoring_params(model, data, api_params)
+        if data.get("parallel_scoring"):
+            response, score_response = await asyncio.gather(
+                model.aget_response(api_params),
+                model.ascore_response(score_params, data.get("minimum_score"))
+            )
+        else:
+            response = await model.aget_response(api_params)
+            score_response = await model.ascore_response(score_params, data.get("minimum_score"))
+
+        api_params["messages"] = score_params["messages"]
+        if not response["status"]:
+            return response
+        return self.merge_score_response(response["data"], score_response)
+
+    def use_response_cache(self, data, api_params):
+        """Only deterministic, unscored phases of microapps that enabled the response cache are cached"""
+        return (
+            not data.get("scored_run")
+            and float(api_params["temperature"]) == 0
+            and resolve_run_context(data.get("ma_id"))["response_cache_enabled"]
+        )
+
+    def cached_phase_response(self, data, api_params):
+        """Return the phase response from the response cache, or None on a miss"""
+        cached = get_cached_response(api_params, data.get("transcription_cost", 0))
+        if cached is None:
+            return None
+        return {"status": True, "data": cached, "response_type": MicroappVariables.CACHED_RESPONSE_TYPE}
+
+    def feedback_phase_response(self, model, data, api_params):
+        """Get the response for a basic feedback phase, from the response cache when the microapp allows it"""
+        use_cache = self.use_response_cache(data, api_params)
+        if use_cache and (cached := self.cached_phase_response(data, api_params)):
+            return cached
+
+        response = model.get_response(api_params)
+        if use_cache and response["status"]:
+            cache_response(api_params, response["data"])
+        return response
+
+    async def afeedback_phase_response(self, model, data, api_params):
+        """Async counterpart of feedback_phase_response"""
+        use_cache = await sync_to_async(self.use_response_cache)(data, api_params)
+        if use_cache and (cached := await sync_to_async(self.cached_phase_response)(data, api_params)):
+            return cached
+
+        response = await model.aget_response(api_params)
+        if use_cache and response["status"]:
+            await sync_to_async(cache_response)(api_params, response["data"])
+        return response
+
+    def fixed_phase_response(self, data):
+        """Return the canned response for skip, hardcoded and no-submission phases, or None for AI phases"""
+        # Handle skip phase
+        if data.get("request_skip"):
+            response = self.skip_phase()
+        elif data.get("fixed_response"):
+            # Handle hardcoded phase
+            response = self.fixed_response_phase(data.get("fixed_response"))
+        elif data.get("no_submission"):
+            # Handle no-submission phase
+            response = self.no_submission_phase()
+        else:
+            return None
+        self.response_type = MicroappVariables.FIXED_RESPONSE_TYPE
+        return response
+
+    def model_error_response(self, response):
+        """The error for a failed model call: 503 with Retry-After when the provider is shedding load, 400 otherwise"""
+        if "retry_after" in response:
+            return Response(
+                error.PROVIDER_UNAVAILABLE,
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(math.ceil(response["retry_after"]))}
+            )
+        return Response({"error": error.INVALID_PAYLOAD, "status": status.HTTP_400_BAD_REQUEST}, status=status.HTTP_400_BAD_REQUEST)
+
+    def finish_run(self, request, response, data, prepared):
+        """Persist the run, charge the owner's credits and build the API response"""
+        app_owner_id = prepared["app_owner_id"]
+        # Create response data
+        run_data = self.route_api_response(response, data, prepared["api_params"], prepared["model"], app_owner_id, prepared["ip"])
+        
+        serializer = RunGetSerializer(data=run_data)
+        if serializer.is_valid():
             
-            serializer = RunGetSerializer(data=run_data)
-            if serializer.is_valid():
-                
-                serialize = serializer.save()
-                self.update_user_credits(serialize.id, app_owner_id, request.user.id if request.user.id else None)
-                run_data["id"] = serialize.id
-                run_data["credits"] = self.credits
+            serialize = serializer.save()
+            self.update_user_credits(serialize.id, app_owner_id, request.user.id if request.user.id else None)
+            run_data["id"] = serialize.id
+            run_data["credits"] = self.credits
 
-                # Handle hardcoded phase response
-                if run_data["response"] == "":
-                    return Response(
-                    {"data": [], "status": status.HTTP_200_OK},
-                    status=status.HTTP_200_OK,
-                )
+            # Handle hardcoded phase response
+            if run_data["response"] == "":
                 return Response(
-                    {"data": run_data, "status": status.HTTP_200_OK},
-                    status=status.HTTP_200_OK,
-                )
+                {"data": [], "status": status.HTTP_200_OK},
+                status=status.HTTP_200_OK,
+            )
             return Response(
-                error.validation_error(serializer.errors),
-                status=status.HTTP_400_BAD_REQUEST,
+                {"data": run_data, "status": status.HTTP_200_OK},
+                status=status.HTTP_200_OK,
             )
+        return Response(
+            error.validation_error(serializer.errors),
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def post(self, request, format=None):
+        try:
+            data = request.data
+            prepared = self.prepare_run(request, data)
+            if not prepared["status"]:
+                return prepared["response"]
+
+            model = prepared["model"]
+            api_params = prepared["api_params"]
+
+            # Handle skip, hardcoded and no-submission phases
+            response = self.fixed_phase_response(data)
+            if response is None:
+                # Handle score phase
+                if data.get("scored_run"):
+                    response = self.scored_phase_response(model, data, api_params)
+                # Handle basic feedback phase
+                else:
+                    response = self.feedback_phase_response(model, data, api_params)
+                if not response["status"]:
+                    return self.model_error_response(response)
+                self.response_type = response.get("response_type", MicroappVariables.DEFAULT_RESPONSE_TYPE)
+                response = response["data"]
+
+            return self.finish_run(request, response, data, prepared)
+        except MicroAppUserJoin.DoesNotExist:
+            return Response(error.MICROAPP_NOT_EXIST, status = status.HTTP_400_BAD_REQUEST)
+       
+        except CustomUser.DoesNotExist:
+            return Response(error.USER_NOT_EXIST, status = status.HTTP_400_BAD_REQUEST)
+        
+        except Exception as e:
+            return handle_exception(e)
+
+    def save_streamed_run(self, request, response, data, prepared):
+        """Persist a streamed run and charge its credits; returns the run data, or the serializer errors"""
+        run_data = self.route_api_response(response, data, prepared["api_params"], prepared["model"], prepared["app_owner_id"], prepared["ip"])
+
+        # Unauthenticated runs are never attributed to a user
+        if not request.user.id:
+            run_data["user_id"] = None
+
+        serializer = RunGetSerializer(data=run_data)
+        if not serializer.is_valid():
+            return {"status": False, "errors": serializer.errors}
+
+        serialize = serializer.save()
+        self.update_user_credits(serialize.id, prepared["app_owner_id"], request.user.id if request.user.id else None)
+        run_data["id"] = serialize.id
+        run_data["credits"] = self.credits
+        return {"status": True, "data": run_data}
+
+    def save_disconnected_run(self, request, response, data, prepared, score_params=None, score_response=None):
+        """
+        Persist a run whose client went away before the stream ended, so the tokens the provider already
+        generated, and a scoring call that was already made, are still charged to the owner.
+        """
+        if not response:
+            return
+        try:
+            if score_response is not None:
+                prepared["api_params"]["messages"] = score_params["messages"]
+                scored = self.merge_score_response(response, score_response)
+                if scored["status"]:
+                    response = scored["data"]
+            elif score_params is not None:
+                # The submission was never graded
+                self.score_result = False
+            saved = self.save_streamed_run(request, response, data, prepared)
+            if not saved["status"]:
+                log.error(f"Could not save a disconnected streamed run: {saved['errors']}")
+        except Exception as e:
+            log.error(f"Could not save a disconnected streamed run: {str(e)}")
+
+    def stream_run(self, request, data, prepared):
+        """
+        Yield the run as server-sent events, then persist it and charge credits once the stream closes.
+        If the client disconnects first, the provider stream is closed and the part already generated is charged.
+        """
+        model = prepared["model"]
+        api_params = prepared["api_params"]
+        score_params = None
+        score_future = None
+        # The usage of a response cut off by a disconnect
+        partial = {}
+        response = None
+        # Set once the run has been saved or rejected, so a disconnect after that charges nothing more
+        finished = False
+        try:
+            response = self.fixed_phase_response(data)
+            if response is None:
+                if data.get("scored_run"):
+                    score_params = self.scoring_params(model, data, api_params)
+                    if data.get("parallel_scoring"):
+                        # Grade the submission while the response streams
+                        executor = ThreadPoolExecutor(max_workers=1)
+                        score_future = executor.submit(model.score_response, score_params, data.get("minimum_score"))
+                        executor.shutdown(wait=False)
+
+                use_cache = self.use_response_cache(data, api_params)
+                cached = self.cached_phase_response(data, api_params) if use_cache else None
+                self.response_type = cached["response_type"] if cached else MicroappVariables.DEFAULT_RESPONSE_TYPE
+                if cached:
+                    response = cached["data"]
+                    yield sse_event("token", {"content": response["ai_response"]})
+                else:
+                    with closing(model.stream_response(api_params, on_close=partial.update)) as events:
+                        for event in events:
+                            if event["type"] == "token":
+                                yield sse_event("token", {"content": event["content"]})
+                            elif event["type"] == "done":
+                                response = event["data"]
+                            else:
+                                finished = True
+                                yield sse_event("error", error.PROVIDER_UNAVAILABLE if "retry_after" in event else error.INVALID_PAYLOAD)
+                                return
+                    if use_cache:
+                        cache_response(api_params, response)
+
+                # Score phases are graded once the full response is available
+                if data.get("scored_run"):
+                    if score_future is not None:
+                        score_response = score_future.result()
+                    else:
+                        score_response = model.score_response(score_params, data.get("minimum_score"))
+                    api_params["messages"] = score_params["messages"]
+                    scored = self.merge_score_response(response, score_response)
+                    if not scored["status"]:
+                        finished = True
+                        yield sse_event("error", error.PROVIDER_UNAVAILABLE if "retry_after" in scored else error.INVALID_PAYLOAD)
+                        return
+                    response = scored["data"]
+
+            if self.response_type == MicroappVariables.FIXED_RESPONSE_TYPE and response["ai_response"]:
+                yield sse_event("token", {"content": response["ai_response"]})
+
+            saved_run = self.save_streamed_run(request, response, data, prepared)
+            finished = True
+            if not saved_run["status"]:
+                yield sse_event("error", error.validation_error(saved_run["errors"]))
+                return
+
+            yield sse_event("done", {"data": saved_run["data"], "status": status.HTTP_200_OK})
+
+        except GeneratorExit:
+            if not finished:
+                # A scoring call already in flight is waited for, since the provider charges for it either way
+                score_response = score_future.result() if score_future is not None else None
+                self.save_disconnected_run(request, partial or response, data, prepared, score_params, score_response)
+            raise
+
+        except Exception as e:
+            log.error(e)
+            yield sse_event("error", error.STREAM_INTERRUPTED)
+
+    async def astream_run(self, request, data, prepared):
+        """
+        Async counterpart of stream_run. Under ASGI, Django can only stream an async iterator as it is produced;
+        a sync generator is read to the end in a worker thread before the first byte is sent.
+        A disconnect cancels the request task or closes the generator, and is charged like in stream_run.
+        """
+        model = prepared["model"]
+        api_params = prepared["api_params"]
+        score_params = None
+        score_task = None
+        partial = {}
+        response = None
+        finished = False
+        try:
+            response = self.fixed_phase_response(data)
+            if response is None:
+                if data.get("scored_run"):
+                    score_params = self.scoring_params(model, data, api_params)
+                    if data.get("parallel_scoring"):
+                        # Grade the submission while the response streams
+                        score_task = asyncio.create_task(model.ascore_response(score_params, data.get("minimum_score")))
+
+                use_cache = await sync_to_async(self.use_response_cache)(data, api_params)
+                cached = await sync_to_async(self.cached_phase_response)(data, api_params) if use_cache else None
+                self.response_type = cached["response_type"] if cached else MicroappVariables.DEFAULT_RESPONSE_TYPE
+                if cached:
+                    response = cached["data"]
+                    yield sse_event("token", {"content": response["ai_response"]})
+                else:
+                    async with aclosing(model.astream_response(api_params, on_close=partial.update)) as events:
+                        async for event in events:
+                            if event["type"] == "token":
+                                yield sse_event("token", {"content": event["content"]})
+                            elif event["type"] == "done":
+                                response = event["data"]
+                            else:
+                                finished = True
+                                yield sse_event("error", error.PROVIDER_UNAVAILABLE if "retry_after" in event else error.INVALID_PAYLOAD)
+                                return
+                    if use_cache:
+                        await sync_to_async(cache_response)(api_params, response)
+
+                if data.get("scored_run"):
+                    if score_task is not None:
+                        score_response = await score_task
+                    else:
+                        score_response = await model.ascore_response(score_params, data.get("minimum_score"))
+                    api_params["messages"] = score_params["messages"]
+                    scored = self.merge_score_response(response, score_response)
+                    if not scored["status"]:
+                        finished = True
+                        yield sse_event("error", error.PROVIDER_UNAVAILABLE if "retry_after" in scored else error.INVALID_PAYLOAD)
+                        return
+                    response = scored["data"]
+
+            if self.response_type == MicroappVariables.FIXED_RESPONSE_TYPE and response["ai_response"]:
+                yield sse_event("token", {"content": response["ai_response"]})
+
+            saved_run = await sync_to_async(self.save_streamed_run)(request, response, data, prepared)
+            finished = True
+            if not saved_run["status"]:
+                yield sse_event("error", error.validation_error(saved_run["errors"]))
+                return
+
+            yield sse_event("done", {"data": saved_run["data"], "status": status.HTTP_200_OK})
+
+        except (GeneratorExit, asyncio.CancelledError):
+            if not finished:
+                score_response = await score_task if score_task is not None else None
+                await sync_to_async(self.save_disconnected_run)(request, partial or response, data, prepared, score_params, score_response)
+            raise
+
+        except Exception as e:
+            log.error(e)
+            yield sse_event("error", error.STREAM_INTERRUPTED)
+
+        finally:
+            # A scoring call nobody will read, after a provider error, is cancelled rather than left running
+            if score_task is not None and not score_task.done():
+                score_task.cancel()
+
+    def event_stream_response(self, events):
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def stream_post(self, request):
+        """
+        Run the pre-flight checks, then stream the model response as server-sent events.
+        This streams token by token under WSGI only; served through ASGI, use astream_post.
+        """
+        try:
+            data = request.data
+            prepared = self.prepare_run(request, data)
+            if not prepared["status"]:
+                return prepared["response"]
+
+            return self.event_stream_response(self.stream_run(request, data, prepared))
+
+        except MicroAppUserJoin.DoesNotExist:
+            return Response(error.MICROAPP_NOT_EXIST, status = status.HTTP_400_BAD_REQUEST)
+       
+        except CustomUser.DoesNotExist:
+            return Response(error.USER_NOT_EXIST, status = status.HTTP_400_BAD_REQUEST)
+        
+        except Exception as e:
+            return handle_exception(e)
+
+    async def astream_post(self, request):
+        """Async counterpart of stream_post, streaming from an async generator so ASGI sends each token as it arrives"""
+        try:
+            data = request.data
+            prepared = await sync_to_async(self.prepare_run)(request, data)
+            if not prepared["status"]:
+                return prepared["response"]
+
+            return self.event_stream_response(self.astream_run(request, data, prepared))
+
         except MicroAppUserJoin.DoesNotExist:
             return Response(error.MICROAPP_NOT_EXIST, status = status.HTTP_400_BAD_REQUEST)
        
@@ -846,6 +1256,76 @@ class RunList(APIView):
         except Exception as e:
             return handle_exception(e)
 
+    async def apost(self, request):
+        """Async counterpart of post: database work runs in worker threads while provider calls are awaited"""
+        try:
+            data = request.data
+            prepared = await sync_to_async(self.prepare_run)(request, data)
+            if not prepared["status"]:
+                return prepared["response"]
+
+            model = prepared["model"]
+            api_params = prepared["api_params"]
+
+            # Handle skip, hardcoded and no-submission phases
+            response = self.fixed_phase_response(data)
+            if response is None:
+                # Handle score phase
+                if data.get("scored_run"):
+                    response = await self.ascored_phase_response(model, data, api_params)
+                # Handle basic feedback phase
+                else:
+                    response = await self.afeedback_phase_response(model, data, api_params)
+                if not response["status"]:
+                    return self.model_error_response(response)
+                self.response_type = response.get("response_type", MicroappVariables.DEFAULT_RESPONSE_TYPE)
+                response = response["data"]
+
+            return await sync_to_async(self.finish_run)(request, response, data, prepared)
+
+        except MicroAppUserJoin.DoesNotExist:
+            return Response(error.MICROAPP_NOT_EXIST, status = status.HTTP_400_BAD_REQUEST)
+       
+        except CustomUser.DoesNotExist:
+            return Response(error.USER_NOT_EXIST, status = status.HTTP_400_BAD_REQUEST)
+        
+        except Exception as e:
+            return handle_exception(e)
+
+    @staticmethod
+    def encode_cursor(run):
+        value = json.dumps([run.timestamp.isoformat(), run.id])
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        timestamp, run_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(timestamp), int(run_id)
+
+    @staticmethod
+    def export_rows(queryset, serializer, export_format):
+        """Serialize the runs one chunk at a time, yielding NDJSON lines or CSV rows as they are read"""
+        runs = queryset.iterator(chunk_size=MicroappVariables.RUN_EXPORT_CHUNK_SIZE)
+        if export_format == "ndjson":
+            for run in runs:
+                yield json.dumps(serializer.to_representation(run), cls=JSONEncoder) + "\n"
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        columns = list(serializer.fields)
+        writer.writerow(columns)
+        for run in runs:
+            row = serializer.to_representation(run)
+            writer.writerow([
+                json.dumps(row[column], cls=JSONEncoder) if isinstance(row[column], (dict, list)) else row[column]
+                for column in columns
+            ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
     def get(self, request, *args, **kwargs):
         try:
             filters = {
@@ -857,9 +1337,57 @@ class RunList(APIView):
             }
             filters = {k: v for k, v in filters.items() if v is not None}
             queryset = Run.objects.filter(**filters)
-            serializer = RunGetSerializer(queryset, many=True)
+            cursor = request.GET.get("cursor")
+            page_size = request.GET.get("page_size")
+            export_format = request.GET.get("format")
+
+            if export_format is not None and export_format not in ("ndjson", "csv"):
+                return Response(error.INVALID_EXPORT_FORMAT, status=status.HTTP_400_BAD_REQUEST)
+
+            # Projection: only load the requested columns, leaving the prompt/response JSON and text deferred
+            fields = request.GET.get("fields")
+            if fields:
+                fields = [field.strip() for field in fields.split(",") if field.strip()]
+                if not fields or set(fields) - set(RunGetSerializer().fields):
+                    return Response(error.INVALID_RUN_FIELDS, status=status.HTTP_400_BAD_REQUEST)
+                # The keyset columns are always loaded so the cursor can be built without extra queries
+                queryset = queryset.only(*fields, "id", "timestamp")
+            else:
+                fields = None
+
+            # Keyset pagination and exports walk the runs newest first over (timestamp, id)
+            next_cursor = None
+            paginated = bool(page_size or cursor)
+            if paginated or export_format:
+                queryset = queryset.order_by("-timestamp", "-id")
+                try:
+                    if paginated:
+                        page_size = min(int(page_size or settings.REST_FRAMEWORK["PAGE_SIZE"]), self.max_page_size)
+                    if cursor:
+                        timestamp, run_id = self.decode_cursor(cursor)
+                        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=run_id))
+                except (TypeError, ValueError):
+                    return Response(error.INVALID_CURSOR, status=status.HTTP_400_BAD_REQUEST)
+
+            if export_format:
+                response = StreamingHttpResponse(
+                    self.export_rows(queryset, RunGetSerializer(fields=fields), export_format),
+                    content_type="application/x-ndjson" if export_format == "ndjson" else "text/csv"
+                )
+                response["Content-Disposition"] = f'attachment; filename="runs.{export_format}"'
+                response["X-Accel-Buffering"] = "no"
+                return response
+
+            if paginated:
+                runs = list(queryset[:page_size + 1])
+                if len(runs) > page_size:
+                    runs = runs[:page_size]
+                    next_cursor = self.encode_cursor(runs[-1])
+                queryset = runs
+
+            serializer = RunGetSerializer(queryset, many=True, fields=fields)
             return Response(
-                {"data": serializer.data, "status": status.HTTP_200_OK},
+                {"data": serializer.data, "next_cursor": next_cursor, "status": status.HTTP_200_OK},
                 status=status.HTTP_200_OK,
             )
         except Exception as e:
@@ -978,136 +1506,97 @@ class AnonymousRunList(RunList):
             log.error(e)
             return False
 
-    def post(self, request, format=None):
+    def prepare_run(self, request, data):
+        data = self.normalize_payload(data)
+        
         try:
-            data = request.data
-            # Convert numeric fields to appropriate types
-            if data.get("temperature"): data["temperature"] = float(data.get("temperature"))
-            if data.get("frequency_penalty"): data["frequency_penalty"] = float(data.get("frequency_penalty"))
-            if data.get("presence_penalty"): data["presence_penalty"] = float(data.get("presence_penalty"))
-            if data.get("top_p"): data["top_p"] = float(data.get("top_p"))
-            if data.get("minimum_score"): data["minimum_score"] = float(data.get("minimum_score"))
-            if data.get("max_tokens"): data["max_tokens"] = int(data.get("max_tokens"))
-            if data.get("transcription_cost"): data["transcription_cost"] = float(data.get("transcription_cost"))
-            
-            try:
-                app_owner = MicroAppUserJoin.objects.get(ma_id=data.get("ma_id"), role="owner")
-                app_owner_id = app_owner.user_id.id
-            except MicroAppUserJoin.DoesNotExist:
-                return Response({"error": "Microapp owner not found", "status": status.HTTP_404_NOT_FOUND},
+            app_owner_id = resolve_run_context(data.get("ma_id"))["app_owner_id"]
+        except MicroAppUserJoin.DoesNotExist:
+            return {
+                "status": False,
+                "response": Response({"error": "Microapp owner not found", "status": status.HTTP_404_NOT_FOUND},
                     status=status.HTTP_404_NOT_FOUND)
-            
-            # Check for mandatory keys in the user request payload
-            if not self.check_payload(data, request):    
-                return Response(
+            }
+        
+        # Check for mandatory keys in the user request payload
+        if not self.check_payload(data, request):    
+            return {
+                "status": False,
+                "response": Response(
                     error.FIELD_MISSING,
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            }
 
-            ip = get_user_ip(request)
-            
-            # Handle guest users usage
-            if not GuestUsage.check_usage_limit(self, ip):
-                return Response(error.RUN_USAGE_LIMIT_EXCEED, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                # Get microapp owner id
-                app_owner = MicroAppUserJoin.objects.get(ma_id = data.get("ma_id"),role = "owner")
-                app_owner_id = MicroappUserSerializer(app_owner).data["user_id"]
-                # Get ma hash_id
-                ma_data = Microapp.objects.get(id=data.get("ma_id"))
-                self.app_hash_id = MicroAppSerializer(ma_data).data["hash_id"]
-                # Get owner details
-                users = CustomUser.objects.get(id = app_owner_id)
-                user_date_joined = UserSerializer(users).data["date_joined"]
-                # Check if the owner has any credits available
-                credits_check = RunUsage.check_for_available_credits(self, app_owner_id, user_date_joined)
-                if not credits_check["has_credits"]:
-                    return Response(
-                        {"error": credits_check["message"]},
-                        status = status.HTTP_400_BAD_REQUEST
-                    )
-            
-            # Return model instance based on AI-model name
-            model_router = AIModelRoute().get_ai_model(data.get("model", env("DEFAULT_AI_MODEL")))
-           
-            if not model_router:
-                return Response({"error": error.UNSUPPORTED_AI_MODEL, "status": status.HTTP_400_BAD_REQUEST},
-                    status=status.HTTP_400_BAD_REQUEST)
-           
-            model = model_router["model"]
-
-            # Validate model specific API request payload
-            ai_validation = model.validate_params(data) 
-            
-            if not ai_validation["status"]:
-                return Response({"error": error.validation_error(ai_validation["message"]), "status": status.HTTP_400_BAD_REQUEST},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Retrieve default API parameters for the AI model
-            api_params = model.get_default_params(data)
-            
-            # Format model specific message content  
-            api_params["messages"] = model.get_model_message(api_params["messages"], data)
-
-            # Add transcription cost to api_params before get_response
-            api_params["transcription_cost"] = float(data.get("transcription_cost", 0))
-
-            # Handle skip phase
-            if data.get("request_skip"):
-                response = self.skip_phase()
-                self.response_type = MicroappVariables.FIXED_RESPONSE_TYPE
-            elif data.get("fixed_response"):
-               # Handle hardcoded phase
-                response = self.fixed_response_phase(data.get("fixed_response"))
-                self.response_type = MicroappVariables.FIXED_RESPONSE_TYPE
-            elif data.get("no_submission"):
-               # Handle no-submission phase
-               response = self.no_submission_phase()
-               self.response_type = MicroappVariables.FIXED_RESPONSE_TYPE
-            # Handle score phase
-            elif data.get("scored_run"):
-                response = model.get_response(api_params)
-                response = response["data"]
-                api_params["messages"] = model.build_instruction(data, api_params["messages"])
-                score_response = model.score_response(api_params, data.get("minimum_score"))
-                self.ai_score = score_response["ai_score"]
-                self.score_result = score_response["score_result"]
-                response.update({
-                    "prompt_tokens": response["prompt_tokens"] + score_response["prompt_tokens"],
-                    "completion_tokens": response["completion_tokens"] + score_response["completion_tokens"],
-                })
-                response.update({
-                    "cost": round(response["cost"] + score_response["cost"], 6),
-                })
-                response.update({
-                    "credits": response["credits"] + score_response["credits"],
-                })
-                self.response_type = MicroappVariables.DEFAULT_RESPONSE_TYPE
-            # Handle normal phase
-            else:
-                response = model.get_response(api_params)
-                response = response["data"]
-                self.response_type = MicroappVariables.DEFAULT_RESPONSE_TYPE
+        ip = get_user_ip(request)
+        
+        # Handle guest users usage
+        if not GuestUsage.check_usage_limit(self, ip):
+            return {"status": False, "response": Response(error.RUN_USAGE_LIMIT_EXCEED, status=status.HTTP_400_BAD_REQUEST)}
+        else:
+            owner_check = self.check_owner_credits(data)
+            if not owner_check["status"]:
+                return owner_check
+            app_owner_id = owner_check["app_owner_id"]
+
+        model_check = self.prepare_model(data)
+        if not model_check["status"]:
+            return model_check
+
+        return {
+            "status": True,
+            "ip": ip,
+            "app_owner_id": app_owner_id,
+            "model": model_check["model"],
+            "api_params": model_check["api_params"]
+        }
 
-            run_data = self.route_api_response(response, data, api_params, model, app_owner_id, ip)
-            
-            # For anonymous runs, ensure these fields are None/empty
-            run_data["user_id"] = None
+    def finish_run(self, request, response, data, prepared):
+        app_owner_id = prepared["app_owner_id"]
+        run_data = self.route_api_response(response, data, prepared["api_params"], prepared["model"], app_owner_id, prepared["ip"])
+        
+        # For anonymous runs, ensure these fields are None/empty
+        run_data["user_id"] = None
 
-            serializer = RunGetSerializer(data=run_data)
+        serializer = RunGetSerializer(data=run_data)
 
-            if serializer.is_valid():
-                serialize = serializer.save()
-                self.update_user_credits(serialize.id, app_owner_id, request.user.id if request.user.id else None)
-                return Response(
-                    {"data": serializer.data, "status": status.HTTP_200_OK},
-                    status=status.HTTP_200_OK,
-                )
+        if serializer.is_valid():
+            serialize = serializer.save()
+            self.update_user_credits(serialize.id, app_owner_id, request.user.id if request.user.id else None)
             return Response(
-                error.validation_error(serializer.errors),
-                status=status.HTTP_400_BAD_REQUEST,
+                {"data": serializer.data, "status": status.HTTP_200_OK},
+                status=status.HTTP_200_OK,
             )
+        return Response(
+            error.validation_error(serializer.errors),
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def post(self, request, format=None):
+        try:
+            data = request.data
+            prepared = self.prepare_run(request, data)
+            if not prepared["status"]:
+                return prepared["response"]
+
+            model = prepared["model"]
+            api_params = prepared["api_params"]
+
+            # Handle skip, hardcoded and no-submission phases
+            response = self.fixed_phase_response(data)
+            if response is None:
+                # Handle score phase
+                if data.get("scored_run"):
+                    response = self.scored_phase_response(model, data, api_params)
+                # Handle normal phase
+                else:
+                    response = self.feedback_phase_response(model, data, api_params)
+                if not response["status"]:
+                    return self.model_error_response(response)
+                self.response_type = response.get("response_type", MicroappVariables.DEFAULT_RESPONSE_TYPE)
+                response = response["data"]
+
+            return self.finish_run(request, response, data, prepared)
 
         except Exception as e:
             log.error(e)
@@ -1116,49 +1605,100 @@ class AnonymousRunList(RunList):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-class AIModelRoute:
-   
-   @staticmethod
-   def get_ai_model(model_name):
-        try:
-            model_config = AIModelConstants.get_configs(model_name)
-            if not model_config:
-                return False
-            
-            # Use the unified interface for all models
-            return {"model": UnifiedLLMInterface(model_config), "config": model_config}
-            
-        except Exception as e:
-           return handle_exception(e)
-   
-class AIModelConfigurations(APIView):
-    permission_classes = [IsAuthenticated]
+@extend_schema_view(
+    post=extend_schema(
+        request=RunPostSerializer,
+        responses={(200, "text/event-stream"): str},
+        summary="Run a model and stream the response as server-sent events"
+    )
+)
+class RunStreamList(RunList):
+    http_method_names = ["post", "options"]
+    renderer_classes = [renderers.JSONRenderer, EventStreamRenderer]
 
-    def get_user_plan(self, user_id):
-        """Get the user's current subscription plan"""
-        try:
-            # Get the user's current billing cycle
-            billing_cycle = BillingCycle.objects.filter(
-                user=user_id,
-                status='open',
-                start_date__lte=timezone.now(),
-                end_date__gte=timezone.now()
-            ).first()
-            
-            if billing_cycle and billing_cycle.subscription:
-                # Check the subscription's price_id against known price IDs
-                price_id = billing_cycle.subscription.price_id
-                if price_id == settings.INDIVIDUAL_PLAN_PRICE_ID:
-                    return "individual"
-                elif price_id == settings.ENTERPRISE_PLAN_PRICE_ID:
-                    return "enterprise"
+    def post(self, request, format=None):
+        return self.stream_post(request)
+
+@extend_schema_view(
+    post=extend_schema(
+        request=RunPostSerializer,
+        responses={(200, "text/event-stream"): str},
+        summary="Run a model anonymously and stream the response as server-sent events"
+    )
+)
+class AnonymousRunStreamList(AnonymousRunList):
+    http_method_names = ["post", "options"]
+    renderer_classes = [renderers.JSONRenderer, EventStreamRenderer]
+
+    def post(self, request, format=None):
+        return self.stream_post(request)
+
+@extend_schema_view(
+    post=extend_schema(
+        request=RunPostSerializer,
+        responses={(200, "text/event-stream"): str},
+        summary="Run a model and stream the response as server-sent events on the async (ASGI) execution path"
+    )
+)
+class AsyncRunStreamList(AsyncAPIView, RunList):
+    http_method_names = ["post", "options"]
+    renderer_classes = [renderers.JSONRenderer, EventStreamRenderer]
+
+    async def post(self, request, format=None):
+        return await self.astream_post(request)
+
+@extend_schema_view(
+    post=extend_schema(
+        request=RunPostSerializer,
+        responses={(200, "text/event-stream"): str},
+        summary="Run a model anonymously and stream the response as server-sent events on the async (ASGI) execution path"
+    )
+)
+class AsyncAnonymousRunStreamList(AsyncAPIView, AnonymousRunList):
+    http_method_names = ["post", "options"]
+    renderer_classes = [renderers.JSONRenderer, EventStreamRenderer]
+
+    async def post(self, request, format=None):
+        return await self.astream_post(request)
+
+@extend_schema_view(
+    post=extend_schema(request=RunPostSerializer, responses={200: RunGetSerializer}, summary="Run a model on the async (ASGI) execution path")
+)
+class AsyncRunList(AsyncAPIView, RunList):
+    http_method_names = ["post", "options"]
+
+    async def post(self, request, format=None):
+        return await self.apost(request)
+
+@extend_schema_view(
+    post=extend_schema(request=RunPostSerializer, responses={200: RunGetSerializer}, summary="Run a model anonymously on the async (ASGI) execution path")
+)
+class AsyncAnonymousRunList(AsyncAPIView, AnonymousRunList):
+    http_method_names = ["post", "options"]
+
+    async def post(self, request, format=None):
+        return await self.apost(request)
+
+class AIModelRoute:
+   
+   @staticmethod
+   def get_ai_model(model_name):
+        try:
+            if not AIModelConstants.is_supported(model_name):
+                return False
             
-            # Default to free plan if no active subscription or unknown price_id
-            return "free"
+            # Use the unified interface for all models
+            return {"model": UnifiedLLMInterface.for_model(model_name), "config": AIModelConstants.get_configs(model_name)}
             
         except Exception as e:
-            log.error(f"Error getting user plan: {str(e)}")
-            return "free"
+           return handle_exception(e)
+   
+class AIModelConfigurations(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_user_plan(self, user_id):
+        """Get the user's current subscription plan"""
+        return get_user_plan(user_id)
 
     @extend_schema(
         responses={200: str},
@@ -1368,63 +1908,8 @@ class AppStatistics(APIView):
             app_id = request.GET.get('app_id')
             hash_id = request.GET.get('hash_id')
 
-            # Base query for user's runs
-            query = Run.objects.filter(owner_id=user_id)
-
-            # Filter by app_id or hash_id if provided
-            if app_id:
-                query = query.filter(ma_id=app_id)
-            elif hash_id:
-                query = query.filter(app_hash_id=hash_id)
-
-            runs = query.values('ma_id').annotate(
-                response_count=Count(
-                    Case(
-                        When(satisfaction__in=[1, -1], then=1)
-                    )
-                ),
-                net_satisfaction_score=Case(
-                    When(
-                        Q(response_count=0),
-                        then=Value(0, output_field=FloatField()) 
-                    ),
-                    default=Round(
-                        Sum(
-                            Case(
-                                When(satisfaction__in=[1], then=F('satisfaction')),
-                                default=Value(0)
-                            )
-                        ) * 1.0 / F('response_count'),
-                        4
-                    ),
-                    output_field=FloatField()  
-                ),
-                thumbs_up_count=Count(
-                    Case(
-                        When(satisfaction=1, then=1)
-                    )
-                ),
-                thumbs_down_count=Count(
-                    Case(
-                        When(satisfaction=-1, then=1)
-                    )
-                ),
-                total_responses=Count(
-                    Case(
-                        When(satisfaction__in=[1, -1], then=1)
-                    )
-                ),
-                total_cost=Sum(
-                    'cost'
-                ),
-                total_credits=Sum('credits'),
-                unique_users=Count('user_ip', distinct=True),
-                sessions=Count('session_id', distinct=True),
-                avg_cost_session = F('total_cost') / F('sessions'),
-                avg_credits_session = F('total_credits') / F('sessions'),
-
-
-            ).values('ma_id', 'net_satisfaction_score', 'thumbs_up_count', 'thumbs_down_count', 'total_responses', 'total_cost', 'total_credits', 'unique_users', 'sessions' ,'avg_cost_session', 'avg_credits_session')
+            # Rolled-up closed days plus a live aggregate of the runs since
+            runs = app_statistics(user_id, app_id=app_id, hash_id=hash_id)
        
             return Response({"data": runs, "status": status.HTTP_200_OK}, status=status.HTTP_200_OK)  
               
@@ -1433,12 +1918,41 @@ class AppStatistics(APIView):
 
 class AppConversations(APIView):
     permission_classes = [IsAuthenticated]
+    max_page_size = 500
+
+    @staticmethod
+    def encode_cursor(conversation):
+        value = json.dumps([conversation["start_time"].isoformat(), conversation["session_id"]])
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        start_time, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(start_time), session_id
+
+    @staticmethod
+    def session_modes(runs, field):
+        """Most frequent value of a field in each session, ties going to the smallest value"""
+        modes = (
+            runs.values("session_id", field)
+            .annotate(count=Count("id"))
+            .annotate(rank=Window(
+                expression=RowNumber(),
+                partition_by=F("session_id"),
+                order_by=[F("count").desc(), F(field).asc()]
+            ))
+            .filter(rank=1)
+            .values_list("session_id", field)
+        )
+        return dict(modes)
 
     def get(self, request):
         try:
             user_id = request.user.id
             app_id = request.GET.get('app_id')
             hash_id = request.GET.get('hash_id')
+            cursor = request.GET.get('cursor')
+            page_size = request.GET.get('page_size')
 
             # Base query for user's runs
             query = Run.objects.filter(owner_id=user_id)
@@ -1449,47 +1963,46 @@ class AppConversations(APIView):
             elif hash_id:
                 query = query.filter(app_hash_id=hash_id)
 
-            # Step 1: Add annotations for satisfaction and model mode
+            # Step 1: Aggregate the sessions, newest first
             conversations = query.values('session_id').annotate(
                 start_time=Min('timestamp'),
                 total_cost=Sum('cost'),
                 messages_count=Count('id'),
                 total_credits=Sum('credits')
-            )
+            ).order_by('-start_time', '-session_id')
 
-            # Step 2: For satisfaction and ai_model, calculate mode separately
-            for conversation in conversations:
-                session_id = conversation['session_id']
-
-                # Calculate mode for 'satisfaction'
-                satisfaction_mode = (
-                    query.filter(
-                        session_id=session_id,
-                        satisfaction__isnull=False,  # Exclude NULL values
-                        satisfaction__in=[1, -1]     # Only consider valid satisfaction values
-                    )
-                    .values('satisfaction')
-                    .annotate(count=Count('satisfaction'))
-                    .order_by('-count', 'satisfaction')
-                    .first()
-                )
-                conversation['satisfaction'] = satisfaction_mode['satisfaction'] if satisfaction_mode else None
-
-                # Calculate mode for 'ai_model'
-                model_mode = (
-                    query.filter(session_id=session_id)
-                    .values('ai_model')
-                    .annotate(count=Count('ai_model'))
-                    .order_by('-count', 'ai_model')  # Secondary order by 'ai_model' for consistency
-                    .first()
-                )
-                conversation['model'] = model_mode['ai_model'] if model_mode else None
+            # Cursor pagination is opt-in: without page_size or cursor every session is returned
+            next_cursor = None
+            paginated = bool(page_size or cursor)
+            if paginated:
+                try:
+                    page_size = min(int(page_size or settings.REST_FRAMEWORK["PAGE_SIZE"]), self.max_page_size)
+                    if cursor:
+                        start_time, session_id = self.decode_cursor(cursor)
+                        conversations = conversations.filter(
+                            Q(start_time__lt=start_time) | Q(start_time=start_time, session_id__lt=session_id)
+                        )
+                except (TypeError, ValueError):
+                    return Response(error.INVALID_CURSOR, status=status.HTTP_400_BAD_REQUEST)
+
+                conversations = list(conversations[:page_size + 1])
+                if len(conversations) > page_size:
+                    conversations = conversations[:page_size]
+                    next_cursor = self.encode_cursor(conversations[-1])
+                # Only compute the modes of the sessions on this page
+                query = query.filter(session_id__in=[conversation['session_id'] for conversation in conversations])
+            else:
+                conversations = list(conversations)
 
-            # Step 3: Order by start_time
-            conversations = sorted(conversations, key=lambda x: x['start_time'], reverse=True)
+            # Step 2: Mode of satisfaction (thumbs up/down only) and of ai_model for every session, one query each
+            satisfaction_modes = self.session_modes(query.filter(satisfaction__in=[1, -1]), 'satisfaction')
+            model_modes = self.session_modes(query, 'ai_model')
+            for conversation in conversations:
+                conversation['satisfaction'] = satisfaction_modes.get(conversation['session_id'])
+                conversation['model'] = model_modes.get(conversation['session_id'])
 
             return Response(
-                {"data": conversations, "status": status.HTTP_200_OK},
+                {"data": conversations, "next_cursor": next_cursor, "status": status.HTTP_200_OK},
                 status=status.HTTP_200_OK
             )
 
@@ -1630,13 +2143,7 @@ class MicroAppImageUpload(APIView):
         filename = re.sub(r'[^a-zA-Z0-9._-]', '', filename)
         
         try:
-            s3_client = boto3.client(
-                's3',
-                config=Config(signature_version='s3v4'),
-                region_name=settings.AWS_S3_REGION_NAME,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
-            )
+            s3_client = get_s3_client()
 
             # Use the validated microapp ID in the file path
             file_key = f'microapps/{microapp.id}/images/{filename}'
@@ -1685,35 +2192,15 @@ class MicroAppFileUpload(APIView):
         except Microapp.DoesNotExist:
             return None
 
-    def upload_to_s3(self, file_key, file_content, content_type):
-        """Helper method to upload content to S3"""
+    def upload_to_s3(self, file_key, file, content_type):
+        """Helper method to stream a file to S3"""
         try:
-            s3_client = boto3.client(
-                's3',
-                config=Config(signature_version='s3v4'),
-                region_name=settings.AWS_S3_REGION_NAME,
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
-            )
-            
-            s3_client.put_object(
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                Key=file_key,
-                Body=file_content,
-                ContentType=content_type
-            )
+            upload_to_s3(file, file_key, content_type)
             return True
         except Exception as e:
             log.error(f"S3 upload error: {str(e)}")
             return False
 
-    def count_words(self, text):
-        """Count words efficiently without loading full text into memory"""
-        count = 0
-        for word in text.split():
-            count += 1
-        return count
-
     @extend_schema(
         request=FileUploadSerializer,
         responses={200: PresignedUrlResponse},
@@ -1734,69 +2221,154 @@ class MicroAppFileUpload(APIView):
         filename = re.sub(r'[^a-zA-Z0-9._-]', '', serializer.validated_data['filename'])
         content_type = serializer.validated_data['content_type']
         
-        # Define S3 keys for both files
         original_file_key = f'microapps/{microapp.id}/files/original/{filename}'
-        base_name, ext = os.path.splitext(filename)
-        text_file_key = f'microapps/{microapp.id}/files/text/{base_name}__{ext[1:]}.txt'
 
         uploaded_file = request.FILES.get('file')
         if not uploaded_file:
             return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
 
+        validation_result = DocumentProcessor().validate_upload(filename, uploaded_file.size)
+        if validation_result != "valid":
+            return Response({"error": validation_result}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            # Create a temporary file and process it
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
-                for chunk in uploaded_file.chunks():
-                    temp_file.write(chunk)
-                temp_file.flush()
-                
-                try:
-                    # Extract text content
-                    processor = DocumentProcessor()
-                    parsed_content = processor.extract_text(temp_file.name)
-                    
-                    # Count words
-                    word_count = self.count_words(parsed_content)
-
-                    # Upload original file to S3
-                    uploaded_file.seek(0)
-                    original_upload_success = self.upload_to_s3(
-                        original_file_key, 
-                        uploaded_file.read(), 
-                        content_type
-                    )
+            sha256 = file_sha256(uploaded_file)
+            # Stream the upload (spooled to disk by Django when large) to S3 rather than reading it into memory
+            if not self.upload_to_s3(original_file_key, uploaded_file, content_type):
+                return Response(
+                    {"error": "Failed to upload files to S3"}, 
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
 
-                    # Upload extracted text to S3
-                    text_upload_success = self.upload_to_s3(
-                        text_file_key,
-                        parsed_content.encode('utf-8'),
-                        'text/plain'
-                    )
+            # The same file was parsed before (e.g. a handout shared by many apps): reuse its text
+            parsed_document = find_parsed_document(sha256)
+            if parsed_document is not None:
+                return Response({'data': upload_result(parsed_document, original_file_key)}, status=status.HTTP_200_OK)
 
-                    if not (original_upload_success and text_upload_success):
-                        return Response(
-                            {"error": "Failed to upload files to S3"}, 
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                        )
+            # Otherwise parse it and store the text in a background job
+            job = enqueue(
+                PARSE_UPLOAD,
+                {"original_file": original_file_key, "sha256": sha256, "filename": filename},
+                user_id=request.user.id
+            )
+            return Response({
+                'data': {
+                    'job_id': job.job_uuid,
+                    'status': job.status,
+                    'original_file': original_file_key
+                }
+            }, status=status.HTTP_202_ACCEPTED)
 
-                    # Only return a preview of the content
-                    preview_length = 1000  # First 1000 characters
-                    content_preview = parsed_content[:preview_length]
-                    has_more = len(parsed_content) > preview_length
-
-                    return Response({
-                        'data': {
-                            'original_file': original_file_key,
-                            'text_file': text_file_key,
-                            'content_preview': content_preview,
-                            'has_more_content': has_more,
-                            'word_count': word_count
-                        }
-                    }, status=status.HTTP_200_OK)
+        except Exception as e:
+            log.error(f"File processing error: {str(e)}")
+            return handle_exception(e)
 
-                finally:
-                    # Clean up the temporary file
-                    os.unlink(temp_file.name)
+class MicroAppFilePresign(MicroAppFileUpload):
+    """
+    Presigned POST for uploading a document straight to S3, like MicroAppImageUpload does for images,
+    so the file never passes through the web tier. Call MicroAppFileUploadComplete once the upload is done.
+    """
+
+    @extend_schema(
+        request=ImageUploadSerializer,
+        responses={200: PresignedUrlResponse},
+        summary="Get a presigned POST to upload a document for microapp"
+    )
+    def post(self, request, pk=None):
+        microapp = self.get_microapp(pk)
+        if not microapp:
+            return Response({"error": "Microapp not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = ImageUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        filename = re.sub(r'[^a-zA-Z0-9._-]', '', serializer.validated_data['filename'])
+        content_type = serializer.validated_data['content_type']
+
+        # The size is enforced by the policy below; only the type can be checked up front
+        validation_result = DocumentProcessor().validate_upload(filename, 0)
+        if validation_result != "valid":
+            return Response({"error": validation_result}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            file_key = f'microapps/{microapp.id}/files/original/{filename}'
+            response = get_s3_client().generate_presigned_post(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=file_key,
+                Fields={'Content-Type': content_type},
+                Conditions=[
+                    {'bucket': settings.AWS_STORAGE_BUCKET_NAME},
+                    {'key': file_key},
+                    {'Content-Type': content_type},
+                    ['content-length-range', 1, DocumentProcessor.MAX_FILE_SIZE_MB * 1024 * 1024]
+                ],
+                ExpiresIn=300
+            )
+            return Response({
+                'data': {
+                    'url': response['url'],
+                    'fields': {
+                        **response['fields'],
+                        'key': file_key,
+                        'filename': filename
+                    }
+                }
+            })
+        except Exception as e:
+            log.error(f"S3 presigned URL generation error: {str(e)}")
+            return handle_exception(e)
+
+
+class FileUploadCompleteSerializer(serializers.Serializer):
+    key = serializers.CharField()
+
+
+class MicroAppFileUploadComplete(MicroAppFileUpload):
+    """Queue a document uploaded with MicroAppFilePresign for parsing, straight from the stored object"""
+
+    @extend_schema(
+        request=FileUploadCompleteSerializer,
+        responses={202: dict},
+        summary="Parse a document uploaded directly to S3 for microapp"
+    )
+    def post(self, request, pk=None):
+        microapp = self.get_microapp(pk)
+        if not microapp:
+            return Response({"error": "Microapp not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = FileUploadCompleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        file_key = serializer.validated_data['key']
+        filename = file_key.rsplit('/', 1)[-1]
+        if file_key != f'microapps/{microapp.id}/files/original/{filename}':
+            return Response(error.OPERATION_NOT_ALLOWED, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            try:
+                size = get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=file_key)['ContentLength']
+            except ClientError:
+                return Response({"error": "Uploaded file not found"}, status=status.HTTP_400_BAD_REQUEST)
+
+            validation_result = DocumentProcessor().validate_upload(filename, size)
+            if validation_result != "valid":
+                return Response({"error": validation_result}, status=status.HTTP_400_BAD_REQUEST)
+
+            # The worker hashes the stored object and reuses the text of a file parsed before
+            job = enqueue(
+                PARSE_UPLOAD,
+                {"original_file": file_key, "filename": filename},
+                user_id=request.user.id
+            )
+            return Response({
+                'data': {
+                    'job_id': job.job_uuid,
+                    'status': job.status,
+                    'original_file': file_key
+                }
+            }, status=status.HTTP_202_ACCEPTED)
 
         except Exception as e:
             log.error(f"File processing error: {str(e)}")
@@ -1814,15 +2386,11 @@ class AudioTranscription(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Read the audio file content
-            audio_content = audio_file.read()
-
             # Initialize the LLM interface with OpenAI configuration
-            model_config = AIModelConstants.get_configs("gpt-4o-mini")  # Using OpenAI config for Whisper
-            model = UnifiedLLMInterface(model_config)
+            model = UnifiedLLMInterface.for_model("gpt-4o-mini")  # Using OpenAI config for Whisper
 
-            # Transcribe the audio
-            result = model.transcribe_audio(audio_content)
+            # Transcribe straight from the uploaded file (spooled to disk by Django when large), without copying it
+            result = model.transcribe_audio(audio_file)
 
             if not result["status"]:
                 return Response(
@@ -1836,6 +2404,33 @@ class AudioTranscription(APIView):
             log.error(f"Error in transcribe_audio_logic: {str(e)}")
             return handle_exception(e)
 
+    async def atranscribe_audio_logic(self, audio_file, user_id=None, ip=None):
+        """Async counterpart of transcribe_audio_logic"""
+        try:
+            if not audio_file:
+                return Response(
+                    {"error": "No audio file provided"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Initialize the LLM interface with OpenAI configuration
+            model = UnifiedLLMInterface.for_model("gpt-4o-mini")  # Using OpenAI config for Whisper
+
+            # Transcribe straight from the uploaded file (spooled to disk by Django when large), without copying it
+            result = await model.atranscribe_audio(audio_file)
+
+            if not result["status"]:
+                return Response(
+                    {"error": result["message"]},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+
+            return Response(result["data"], status=status.HTTP_200_OK)
+
+        except Exception as e:
+            log.error(f"Error in atranscribe_audio_logic: {str(e)}")
+            return handle_exception(e)
+
     @extend_schema(
         request={
             'multipart/form-data': {
@@ -1907,6 +2502,74 @@ class AnonymousAudioTranscription(AudioTranscription):
         except Exception as e:
             return handle_exception(e)
 
+class AsyncAudioTranscription(AsyncAPIView, AudioTranscription):
+
+    @extend_schema(
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'audio': {
+                        'type': 'string',
+                        'format': 'binary',
+                        'description': 'Audio file to transcribe'
+                    }
+                }
+            }
+        },
+        responses={200: None},
+        summary="Transcribe audio file using Whisper on the async (ASGI) execution path (authenticated)"
+    )
+    async def post(self, request, format=None):
+        try:
+            audio_file = request.FILES.get('audio')
+            return await self.atranscribe_audio_logic(
+                audio_file=audio_file,
+                user_id=request.user.id,
+                ip=get_user_ip(request)
+            )
+        except Exception as e:
+            return handle_exception(e)
+
+@extend_schema_view(
+    post=extend_schema(
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'audio': {
+                        'type': 'string',
+                        'format': 'binary',
+                        'description': 'Audio file to transcribe'
+                    }
+                }
+            }
+        },
+        responses={200: None},
+        summary="Transcribe audio file using Whisper on the async (ASGI) execution path (anonymous)"
+    )
+)
+class AsyncAnonymousAudioTranscription(AsyncAPIView, AnonymousAudioTranscription):
+
+    async def post(self, request, format=None):
+        try:
+            ip = get_user_ip(request)
+            
+            if not await sync_to_async(GuestUsage.check_usage_limit)(self, ip):
+                return Response(
+                    error.RUN_USAGE_LIMIT_EXCEED, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            audio_file = request.FILES.get('audio')
+            return await self.atranscribe_audio_logic(
+                audio_file=audio_file,
+                user_id=None,
+                ip=ip
+            )
+        except Exception as e:
+            return handle_exception(e)
+
 @extend_schema_view(
     post=extend_schema(
         request={
@@ -1943,8 +2606,7 @@ class TextToSpeech(APIView):
             # Initialize LLM interface with appropriate model config
             # TODO: Remove this once we support more TTS providers
             model_name = f"non-openai-tts-not-setup-yet" if provider != 'openai' else 'gpt-4o-mini-tts'
-            model_config = AIModelConstants.get_configs(model_name)
-            llm_interface = UnifiedLLMInterface(model_config)
+            llm_interface = UnifiedLLMInterface.for_model(model_name)
 
             # Get audio data
             audio_data = llm_interface.text_to_speech(text, voice, instructions)
@@ -1962,6 +2624,54 @@ class TextToSpeech(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class AsyncTextToSpeech(AsyncAPIView, TextToSpeech):
+
+    @extend_schema(
+        request={
+            'application/json': {
+                'type': 'object',
+                'properties': {
+                    'text': {'type': 'string', 'description': 'Text to convert to speech'},
+                    'provider': {'type': 'string', 'description': 'TTS provider (e.g., openai, elevenlabs, hume)'},
+                    'voice': {'type': 'string', 'description': 'Voice ID to use'},
+                    'instructions': {'type': 'string', 'description': 'Optional voice instructions'}
+                }
+            }
+        },
+        responses={200: None},
+        summary="Convert text to speech on the async (ASGI) execution path"
+    )
+    async def post(self, request, format=None):
+        try:
+            text = request.data.get('text')
+            provider = request.data.get('provider', 'openai')
+            voice = request.data.get('voice', 'alloy')
+            instructions = request.data.get('instructions')
+
+            if not text:
+                return Response(
+                    {'error': 'Text is required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # TODO: Remove this once we support more TTS providers
+            model_name = f"non-openai-tts-not-setup-yet" if provider != 'openai' else 'gpt-4o-mini-tts'
+            llm_interface = UnifiedLLMInterface.for_model(model_name)
+
+            audio_data = await llm_interface.atext_to_speech(text, voice, instructions)
+
+            return HttpResponse(
+                audio_data,
+                content_type='audio/mpeg'
+            )
+
+        except Exception as e:
+            log.error(f"Error in Text to Speech: {str(e)}")
+            return Response(
+                {'error': 'Internal server error'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 # ---------------------------------------------
 #  New: ParseFile – extract text from an uploaded file
 # ---------------------------------------------
@@ -1971,11 +2681,11 @@ class TextToSpeech(APIView):
     post=extend_schema(
         request=FileUploadSerializer,
         responses={200: dict},
-        summary="Parse an uploaded file and return its plain-text content (max 20 000 chars)"
+        summary="Queue an uploaded file for parsing; the job result has its plain-text content (max 20 000 chars)"
     )
 )
 class ParseFile(APIView):
-    """Return raw text from an uploaded document without persisting it anywhere."""
+    """Extract raw text from an uploaded document in a background job. The upload is only stored until it is parsed."""
 
     permission_classes = [IsAuthenticated]
 
@@ -1993,44 +2703,46 @@ class ParseFile(APIView):
         if not uploaded_file:
             return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            # Write the upload to a temp file so our DocumentProcessor can read it
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
-                for chunk in uploaded_file.chunks():
-                    temp_file.write(chunk)
-                temp_file.flush()
-
-                try:
-                    processor = DocumentProcessor()
-                    parsed_content = processor.extract_text(temp_file.name)
-
-                    # Enforce 20 000-character cap
-                    if len(parsed_content) > self.MAX_CHARS:
-                        return Response(
-                            {
-                                "error": f"Parsed content exceeds {self.MAX_CHARS:,} character limit.",
-                                "status": status.HTTP_400_BAD_REQUEST,
-                            },
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                    # Basic word count (re-using helper logic)
-                    word_count = len(parsed_content.split())
+        validation_result = DocumentProcessor().validate_upload(filename, uploaded_file.size)
+        if validation_result != "valid":
+            return Response({"error": validation_result, "status": status.HTTP_400_BAD_REQUEST}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            # Text of a file uploaded to a microapp before is read back instead of parsed again
+            parsed_document = find_parsed_document(file_sha256(uploaded_file))
+            if parsed_document is not None:
+                if parsed_document.char_count > self.MAX_CHARS:
                     return Response(
                         {
-                            "data": {
-                                "text": parsed_content,
-                                "word_count": word_count,
-                                "filename": filename,
-                            }
+                            "error": f"Parsed content exceeds {self.MAX_CHARS:,} character limit.",
+                            "status": status.HTTP_400_BAD_REQUEST,
                         },
-                        status=status.HTTP_200_OK,
+                        status=status.HTTP_400_BAD_REQUEST,
                     )
+                return Response(
+                    {
+                        "data": {
+                            "text": read_parsed_text(parsed_document),
+                            "word_count": parsed_document.word_count,
+                            "filename": filename,
+                        }
+                    },
+                    status=status.HTTP_200_OK,
+                )
 
-                finally:
-                    # Always clean up the temp file
-                    os.unlink(temp_file.name)
+            # Stash the upload where a worker can read it; the parse job deletes it once parsed
+            file_key = f'parse-file/{uuid.uuid4()}/{filename}'
+            upload_to_s3(uploaded_file, file_key, uploaded_file.content_type or "application/octet-stream")
+
+            job = enqueue(
+                PARSE_FILE,
+                {"file_key": file_key, "filename": filename, "max_chars": self.MAX_CHARS},
+                user_id=request.user.id
+            )
+            return Response(
+                {"data": {"job_id": job.job_uuid, "status": job.status, "filename": filename}},
+                status=status.HTTP_202_ACCEPTED,
+            )
 
         except Exception as e:
             return handle_exception(e)
\ No newline at end of file
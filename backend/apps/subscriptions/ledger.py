@@ -0,0 +1,152 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.subscriptions.models import BillingCycle, TopUpToSubscription, UsageEvent
+from apps.utils.usage_helper import decrement_available_credits
+
+log = logging.getLogger("micro_ai.subscription")
+
+
+def get_active_billing_cycle_id(user_id):
+    now = timezone.now()
+    return (
+        BillingCycle.objects.filter(
+            user=user_id,
+            status='open',
+            start_date__lte=now,
+            end_date__gte=now
+        )
+        .values_list('id', flat=True)
+        .first()
+    )
+
+
+def get_user_plan(user_id):
+    """The plan of the user's open billing cycle: "individual", "enterprise", or "free" when there is none"""
+    try:
+        now = timezone.now()
+        price_id = (
+            BillingCycle.objects.filter(
+                user=user_id,
+                status='open',
+                start_date__lte=now,
+                end_date__gte=now
+            )
+            .values_list('subscription__price_id', flat=True)
+            .first()
+        )
+        if price_id == settings.INDIVIDUAL_PLAN_PRICE_ID:
+            return "individual"
+        if price_id == settings.ENTERPRISE_PLAN_PRICE_ID:
+            return "enterprise"
+        return "free"
+    except Exception as e:
+        log.error(f"Error getting user plan: {str(e)}")
+        return "free"
+
+
+def _debit_billing_cycle(billing_cycle_id, credits):
+    """
+    UPDATE ... SET credits_used = credits_used + x, credits_remaining = credits_remaining - x
+    WHERE credits_remaining >= x. Returns True if the row was debited.
+    """
+    return BillingCycle.objects.filter(
+        id=billing_cycle_id,
+        status='open',
+        credits_remaining__gte=credits
+    ).update(
+        credits_used=F('credits_used') + credits,
+        credits_remaining=F('credits_remaining') - credits,
+        updated_at=timezone.now()
+    ) == 1
+
+
+def _debit_top_up(top_up_id, credits):
+    """
+    UPDATE ... SET used_credits = used_credits + x WHERE allocated_credits - used_credits >= x.
+    Returns True if the row was debited.
+    """
+    return TopUpToSubscription.objects.filter(
+        id=top_up_id,
+        allocated_credits__gte=F('used_credits') + credits
+    ).update(
+        used_credits=F('used_credits') + credits,
+        updated_at=timezone.now()
+    ) == 1
+
+
+def debit_credits(user_id, credits, billing_cycle_id):
+    """
+    Debit credits from the billing cycle first, then from the user's top-ups in FIFO order.
+
+    Must run inside a transaction. When the billing cycle covers the whole amount (the common case)
+    this is a single conditional UPDATE; otherwise the cycle and top-up rows are locked so concurrent
+    debits against the same user cannot both spend the same remaining credits.
+
+    Once the transaction commits, the debited amount is taken off the owner's cached available-credits snapshot.
+
+    Returns a dict with the id of the last top-up debited (or None) and the credits that could not be
+    covered by the cycle or the top-ups.
+    """
+    if credits <= 0:
+        return {"top_up_id": None, "uncovered": 0}
+
+    if _debit_billing_cycle(billing_cycle_id, credits):
+        transaction.on_commit(lambda: decrement_available_credits(user_id, credits))
+        return {"top_up_id": None, "uncovered": 0}
+
+    remaining = credits
+    top_up_id = None
+
+    # The cycle can't cover the whole amount: drain it, then fall through to the top-ups
+    billing_cycle = BillingCycle.objects.select_for_update().get(id=billing_cycle_id)
+    available = min(max(billing_cycle.credits_remaining, 0), remaining)
+    if available > 0 and _debit_billing_cycle(billing_cycle_id, available):
+        remaining -= available
+
+    top_ups = (
+        TopUpToSubscription.objects.select_for_update()
+        .filter(user=user_id, allocated_credits__gt=F('used_credits'))
+        .order_by('created_at')
+    )
+    for top_up in top_ups:
+        if remaining <= 0:
+            break
+        amount = min(top_up.remaining_credits, remaining)
+        if _debit_top_up(top_up.id, amount):
+            remaining -= amount
+            top_up_id = top_up.id
+
+    debited = credits - remaining
+    transaction.on_commit(lambda: decrement_available_credits(user_id, debited))
+
+    if remaining > 0:
+        log.warning(f"User {user_id} ran out of credits: {remaining} of {credits} credits were not covered")
+
+    return {"top_up_id": top_up_id, "uncovered": remaining}
+
+
+def charge_run(user_id, run_id, credits, consumer_id=None):
+    """
+    Charge a run to its owner: debit the billing cycle and top-ups and write the UsageEvent
+    in one transaction. Returns the UsageEvent, or None if the owner has no active billing cycle.
+    """
+    billing_cycle_id = get_active_billing_cycle_id(user_id)
+    if billing_cycle_id is None:
+        log.error(f"No active billing cycle found for user {user_id}, run {run_id} was not charged")
+        return None
+
+    with transaction.atomic():
+        debit = debit_credits(user_id, credits, billing_cycle_id)
+        return UsageEvent.objects.create(
+            billing_cycle_id=billing_cycle_id,
+            top_up_id=debit["top_up_id"],
+            user_id=user_id,
+            consumer_id=consumer_id,
+            run_id_id=run_id,
+            credits_charged=credits
+        )
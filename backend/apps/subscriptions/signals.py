@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.subscriptions.models import BillingCycle, Subscription, TopUpToSubscription
+from apps.utils.usage_helper import invalidate_available_credits
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_save, sender=BillingCycle)
+@receiver(post_delete, sender=BillingCycle)
+@receiver(post_save, sender=TopUpToSubscription)
+@receiver(post_delete, sender=TopUpToSubscription)
+def invalidate_credits_snapshot(sender, instance, **kwargs):
+    """
+    Drop the owner's cached available credits whenever their plan, billing cycle or top-ups change
+    (Stripe webhooks, admin edits, free plan renewals). Run debits decrement the snapshot in the ledger instead.
+    """
+    invalidate_available_credits(instance.user_id)
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.subscriptions.ledger import debit_credits
+from apps.subscriptions.models import BillingCycle, TopUpToSubscription
+from apps.users.models import CustomUser
+
+
+class DebitCreditsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="ledger@example.com")
+        now = timezone.now()
+        self.billing_cycle = BillingCycle.objects.create(
+            user=self.user,
+            credits_allocated=100,
+            credits_remaining=100,
+            start_date=now - timedelta(days=1),
+            end_date=now + timedelta(days=1),
+        )
+
+    def _debit(self, credits):
+        with transaction.atomic():
+            return debit_credits(self.user.id, credits, self.billing_cycle.id)
+
+    def test_debits_billing_cycle(self):
+        self.assertEqual({"top_up_id": None, "uncovered": 0}, self._debit(40))
+        self.billing_cycle.refresh_from_db()
+        self.assertEqual(40, self.billing_cycle.credits_used)
+        self.assertEqual(60, self.billing_cycle.credits_remaining)
+
+    def test_falls_through_to_top_ups_in_fifo_order(self):
+        now = timezone.now()
+        older = TopUpToSubscription.objects.create(user=self.user, allocated_credits=30, created_at=now - timedelta(days=2))
+        newer = TopUpToSubscription.objects.create(user=self.user, allocated_credits=30, created_at=now - timedelta(days=1))
+
+        self.assertEqual({"top_up_id": newer.id, "uncovered": 0}, self._debit(150))
+
+        self.billing_cycle.refresh_from_db()
+        older.refresh_from_db()
+        newer.refresh_from_db()
+        self.assertEqual(0, self.billing_cycle.credits_remaining)
+        self.assertEqual(30, older.used_credits)
+        self.assertEqual(20, newer.used_credits)
+
+    def test_reports_uncovered_credits(self):
+        self.assertEqual({"top_up_id": None, "uncovered": 20}, self._debit(120))
+        self.billing_cycle.refresh_from_db()
+        self.assertEqual(0, self.billing_cycle.credits_remaining)
+        self.assertEqual(100, self.billing_cycle.credits_used)
@@ -9,7 +9,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.conf import settings
 from apps.subscriptions.models import BillingCycle, StripeCustomer, TopUpToSubscription
-from django.db.models import F
+from django.db import transaction
 
 from apps.api.permissions import IsAuthenticatedOrHasUserAPIKey
 
@@ -23,6 +23,7 @@ from ..helpers import (
     get_subscription_details,
     is_downgrade,
 )
+from apps.subscriptions.ledger import debit_credits
 from apps.utils.billing import get_stripe_module
 
 log = logging.getLogger("micro_ai.subscription")
@@ -400,31 +401,9 @@ class SpendCredits(APIView):
                     "checkout_url": checkout_session.url
                 }, status=402)
             
-            remaining_to_deduct = amount
-            
-            if main_available >= remaining_to_deduct:
-                billing_cycle.credits_used += remaining_to_deduct
-                billing_cycle.credits_remaining -= remaining_to_deduct
-                billing_cycle.save()
-                remaining_to_deduct = 0
-            else:
-                billing_cycle.credits_used += main_available
-                billing_cycle.credits_remaining = 0
-                billing_cycle.save()
-                remaining_to_deduct -= main_available
-            
-            if remaining_to_deduct > 0:
-                top_ups_to_update = top_ups.filter(allocated_credits__gt=F('used_credits')).order_by('created_at')
-                for top_up in top_ups_to_update:
-                    if remaining_to_deduct <= 0:
-                        break
-                    available_in_topup = top_up.remaining_credits
-                    if available_in_topup >= remaining_to_deduct:
-                        top_up.record_usage(remaining_to_deduct)
-                        remaining_to_deduct = 0
-                    else:
-                        top_up.record_usage(available_in_topup)
-                        remaining_to_deduct -= available_in_topup
+            with transaction.atomic():
+                debit_credits(user.id, amount, billing_cycle.id)
+            billing_cycle.refresh_from_db()
             
             top_ups = TopUpToSubscription.objects.filter(user=user)
             new_total_topup = sum([top_up.remaining_credits for top_up in top_ups])
@@ -0,0 +1,78 @@
+"""
+Process-wide clients for external services.
+
+Clients are built once per process and shared by every request (and thread), so connections and
+TLS sessions are kept alive between requests instead of being set up on each one.
+"""
+import threading
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+import httpx
+import litellm
+from botocore.config import Config
+from django.conf import settings
+
+_lock = threading.Lock()
+_s3_client = None
+_llm_clients_configured = False
+
+
+def get_s3_client():
+    """The shared S3 client. boto3 clients are thread-safe once created."""
+    global _s3_client
+    if _s3_client is None:
+        with _lock:
+            if _s3_client is None:
+                _s3_client = boto3.session.Session().client(
+                    's3',
+                    config=Config(
+                        signature_version=settings.AWS_S3_SIGNATURE_VERSION,
+                        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS
+                    ),
+                    region_name=settings.AWS_S3_REGION_NAME,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+                )
+    return _s3_client
+
+
+def upload_to_s3(fileobj, key, content_type):
+    """
+    Stream a file object to S3. Files past AWS_S3_MULTIPART_THRESHOLD go up as a multipart upload, read in
+    AWS_S3_MULTIPART_CHUNKSIZE parts, so memory use stays bounded whatever the file size.
+    """
+    get_s3_client().upload_fileobj(
+        fileobj,
+        settings.AWS_STORAGE_BUCKET_NAME,
+        key,
+        ExtraArgs={'ContentType': content_type},
+        Config=TransferConfig(
+            multipart_threshold=settings.AWS_S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.AWS_S3_MULTIPART_CHUNKSIZE
+        )
+    )
+
+
+def configure_llm_clients():
+    """
+    Give litellm shared sync and async HTTP clients with keep-alive pools.
+
+    httpx pools connections per origin, so each provider gets its own pool of warm connections.
+    API keys are never stored on these clients; they are passed with every call.
+    """
+    global _llm_clients_configured
+    if _llm_clients_configured:
+        return
+    with _lock:
+        if _llm_clients_configured:
+            return
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(settings.LLM_HTTP_TIMEOUT, connect=settings.LLM_HTTP_CONNECT_TIMEOUT)
+        litellm.client_session = httpx.Client(limits=limits, timeout=timeout)
+        litellm.aclient_session = httpx.AsyncClient(limits=limits, timeout=timeout)
+        _llm_clients_configured = True
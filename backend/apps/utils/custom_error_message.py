@@ -9,6 +9,13 @@ class ErrorMessages:
     SERVER_ERROR =  {"error": "an unexpected error occurred", "status": status.HTTP_500_INTERNAL_SERVER_ERROR},
     RUN_USAGE_LIMIT_EXCEED = {"error": "Daily usage limit exceeded. Please try again tomorrow", "status": status.HTTP_400_BAD_REQUEST}
     INVALID_PAYLOAD = {"error": "invalid payload", "status": status.HTTP_400_BAD_REQUEST}
+    CONTEXT_TOO_LONG = {"error": "the prompt is too long for this model's context window", "status": status.HTTP_400_BAD_REQUEST}
+    PROVIDER_UNAVAILABLE = {"error": "the AI provider is temporarily unavailable, please try again shortly", "status": status.HTTP_503_SERVICE_UNAVAILABLE}
+    STREAM_INTERRUPTED = {"error": "the response stream was interrupted", "status": status.HTTP_500_INTERNAL_SERVER_ERROR}
+    INVALID_CURSOR = {"error": "invalid pagination cursor", "status": status.HTTP_400_BAD_REQUEST}
+    INVALID_RUN_FIELDS = {"error": "unknown run fields requested", "status": status.HTTP_400_BAD_REQUEST}
+    JOB_NOT_EXIST = {"error": "job not exist", "status": status.HTTP_404_NOT_FOUND}
+    INVALID_EXPORT_FORMAT = {"error": "export format must be ndjson or csv", "status": status.HTTP_400_BAD_REQUEST}
     UNSUPPORTED_AI_MODEL = "unsupported AI model"
     EMAIL_ALREADY_EXIST = 'email already exist'
     VALIDATION_ERROR = "An error occurred during validation"
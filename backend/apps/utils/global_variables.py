@@ -1,6 +1,8 @@
 import environ
 import os
+from collections.abc import Mapping
 from pathlib import Path
+from types import MappingProxyType
 BASE_DIR = Path(__file__).resolve().parent.parent
 env = environ.Env()
 env.read_env(os.path.join(BASE_DIR, ".env"))
@@ -12,6 +14,93 @@ class MicroappVariables:
     DEFAULT_MICROAPP_AI_MODEL = "gpt-4o-mini"
     DEFAULT_RESPONSE_TYPE = "AI"
     FIXED_RESPONSE_TYPE = "Fixed_Response"
+    CACHED_RESPONSE_TYPE = "Cached_Response"
+    # Seconds a resolved run context (owner, hash id) is reused per process
+    RUN_CONTEXT_CACHE_TIMEOUT = int(env("RUN_CONTEXT_CACHE_TIMEOUT", default=30))
+    # Rows fetched per round trip when streaming a run export
+    RUN_EXPORT_CHUNK_SIZE = int(env("RUN_EXPORT_CHUNK_SIZE", default=500))
+    # Processes that OCR scanned document pages, and the resolution pages are rasterized at
+    OCR_MAX_WORKERS = int(env("OCR_MAX_WORKERS", default=min(4, os.cpu_count() or 1)))
+    OCR_DPI = int(env("OCR_DPI", default=300))
+    # Text kept from a microapp file upload; parsing stops once this many characters have been extracted
+    MAX_PARSED_DOCUMENT_CHARS = int(env("MAX_PARSED_DOCUMENT_CHARS", default=1_000_000))
+    # Days an unused entry stays in the parsed document index
+    PARSED_DOCUMENT_RETENTION_DAYS = int(env("PARSED_DOCUMENT_RETENTION_DAYS", default=180))
+
+class JobVariables:
+    # Seconds before the first retry of a failed background job, doubled on each further attempt
+    RETRY_DELAY = int(env("JOB_RETRY_DELAY", default=10))
+    # Jobs each run_jobs worker runs at once, and seconds between polls of an empty queue
+    WORKER_CONCURRENCY = int(env("JOB_WORKER_CONCURRENCY", default=2))
+    POLL_INTERVAL = float(env("JOB_POLL_INTERVAL", default=1))
+    # Document parsing jobs running at once across all workers (OCR is CPU bound)
+    DOCUMENT_JOB_CONCURRENCY = int(env("DOCUMENT_JOB_CONCURRENCY", default=4))
+    # Seconds between the job workers' runs of the daily run rollups
+    ROLLUP_INTERVAL = int(env("ROLLUP_INTERVAL", default=60 * 60))
+
+class ModelRoutingVariables:
+    # Seconds each model in a fallback chain gets before the next one is tried; the last model gets the full HTTP timeout
+    FAILOVER_TIMEOUT = float(env("MODEL_FAILOVER_TIMEOUT", default=30))
+    # Fallback models tried after the run's model
+    MAX_FALLBACK_MODELS = int(env("MAX_FALLBACK_MODELS", default=2))
+    # Recent response times kept per model; hedging waits for the model's p95 once HEDGE_MIN_SAMPLES are known
+    LATENCY_SAMPLES = int(env("MODEL_LATENCY_SAMPLES", default=200))
+    HEDGE_MIN_SAMPLES = int(env("HEDGE_MIN_SAMPLES", default=20))
+    HEDGE_PERCENTILE = float(env("HEDGE_PERCENTILE", default=95))
+    # Seconds to wait before hedging a model with too few samples, and the shortest wait ever used
+    HEDGE_DEFAULT_DELAY = float(env("HEDGE_DEFAULT_DELAY", default=10))
+    HEDGE_MIN_DELAY = float(env("HEDGE_MIN_DELAY", default=1))
+
+class ProviderGuardVariables:
+    # Consecutive provider failures that open a key's circuit breaker, and seconds it stays open before a probe
+    BREAKER_FAILURE_THRESHOLD = int(env("BREAKER_FAILURE_THRESHOLD", default=5))
+    BREAKER_OPEN_SECONDS = float(env("BREAKER_OPEN_SECONDS", default=30))
+    # In-flight calls per provider key and process: the starting limit and its bounds. An ASGI worker holds a few
+    # hundred runs in flight, so the defaults are sized for one; sync workers never reach them
+    CONCURRENCY_INITIAL = int(env("PROVIDER_CONCURRENCY_INITIAL", default=100))
+    CONCURRENCY_MIN = int(env("PROVIDER_CONCURRENCY_MIN", default=1))
+    CONCURRENCY_MAX = int(env("PROVIDER_CONCURRENCY_MAX", default=400))
+    # Longest a call over the limit waits for a slot before failing with 503, and how often async calls check
+    CONCURRENCY_WAIT_SECONDS = float(env("PROVIDER_CONCURRENCY_WAIT_SECONDS", default=10))
+    CONCURRENCY_POLL_SECONDS = float(env("PROVIDER_CONCURRENCY_POLL_SECONDS", default=0.05))
+    # Factor the limit is multiplied by on a failure or a call slower than SLOW_CALL_SECONDS
+    CONCURRENCY_BACKOFF = float(env("PROVIDER_CONCURRENCY_BACKOFF", default=0.5))
+    SLOW_CALL_SECONDS = float(env("PROVIDER_SLOW_CALL_SECONDS", default=60))
+
+class ProviderQuotaVariables:
+    # Requests and tokens per minute allowed per provider API key, e.g. OPENAI_RPM / OPENAI_TPM; 0 leaves it unlimited
+    QUOTAS = {
+        family: {"rpm": int(env(f"{family.upper()}_RPM", default=0)), "tpm": int(env(f"{family.upper()}_TPM", default=0))}
+        for family in ("openai", "anthropic", "gemini", "perplexity", "deepseek")
+    }
+    # Seconds between quota refills; each refill returns what was reserved in the same period a minute earlier
+    QUOTA_REFILL_SECONDS = int(env("QUOTA_REFILL_SECONDS", default=5))
+    # Longest an async call waits for quota before failing with 503 (sync calls fail at once), and the random delay added to each wait
+    QUOTA_MAX_WAIT_SECONDS = float(env("QUOTA_MAX_WAIT_SECONDS", default=10))
+    QUOTA_JITTER_SECONDS = float(env("QUOTA_JITTER_SECONDS", default=0.25))
+    # Pause after a 429 without a usable Retry-After, and the longest Retry-After honored
+    QUOTA_DEFAULT_RETRY_AFTER = float(env("QUOTA_DEFAULT_RETRY_AFTER", default=5))
+    QUOTA_MAX_RETRY_AFTER = float(env("QUOTA_MAX_RETRY_AFTER", default=60))
+
+class PromptCacheVariables:
+    # Families whose prompt caching needs explicit cache_control breakpoints; the others cache identical prefixes on their own
+    CACHE_CONTROL_FAMILIES = ("anthropic",)
+    # Shortest prefix worth marking; providers don't cache shorter ones and cache writes cost extra
+    MIN_PREFIX_TOKENS = int(env("PROMPT_CACHE_MIN_PREFIX_TOKENS", default=1024))
+    # Anthropic allows at most four breakpoints per request
+    MAX_BREAKPOINTS = 4
+
+class TokenBudgetVariables:
+    # Context window used for models litellm has no information about
+    DEFAULT_CONTEXT_WINDOW = int(env("DEFAULT_CONTEXT_WINDOW", default=128000))
+    # Share of the window kept free, since local counts for non-OpenAI models are approximate
+    CONTEXT_SAFETY_RATIO = float(env("CONTEXT_SAFETY_RATIO", default=0.05))
+    # Room that must be left for the response after trimming
+    MIN_COMPLETION_TOKENS = int(env("MIN_COMPLETION_TOKENS", default=256))
+    # Tokens counted for each image in a prompt, rather than measuring the image
+    IMAGE_TOKENS = int(env("IMAGE_PROMPT_TOKENS", default=1600))
+    # Per-message token counts kept per process; conversation turns are re-sent with every run of a session
+    TOKEN_COUNT_CACHE_SIZE = int(env("TOKEN_COUNT_CACHE_SIZE", default=10000))
 
 class CollectionVariables:
     MY_COLLECTION = "My Collection"
@@ -156,62 +245,67 @@ class AIModelConstants:
     }
 
     @staticmethod
-    def get_configs(model_name: str) -> dict:
-        """Get model configuration with proper inheritance chain:
-        1. Start with BASE_DEFAULTS
-        2. Override with family defaults
-        3. Override with model-specific settings
+    def get_configs(model_name: str) -> Mapping:
+        """Get the resolved, read-only configuration of a model.
+        Unknown models get the base defaults; use is_supported to tell them apart.
         """
-        # Start with base defaults
-        config = AIModelDefaults.BASE_DEFAULTS.copy()
-        
-        # Get the model's config
-        model_config = AIModelConstants.AI_MODELS.get(model_name, {})
-        if not model_config:
-            return config
-            
-
-        # Get the family defaults based on the model's family
-        family = model_config.get("family")
-        if family:
-            family_defaults = getattr(AIModelFamilyDefaults, family.upper(), {})
-            # Override base defaults with family defaults
-            config.update({k: v for k, v in family_defaults.items() 
-                         if k in AIModelDefaults.BASE_DEFAULTS})
-            
-        # Finally override with ALL model-specific settings
-        config.update(model_config)
-        
-        return config
+        return _MODEL_CONFIGS.get(model_name, _BASE_CONFIG)
+
+    @staticmethod
+    def is_supported(model_name: str) -> bool:
+        """Check if a model is configured"""
+        return model_name in _MODEL_CONFIGS
 
     @staticmethod
     def get_model_family(model_name: str) -> str:
         """Get the AI model family (openai, anthropic, etc)"""
-        config = AIModelConstants.AI_MODELS.get(model_name, {})
-        return config.get("family", "")
+        return AIModelConstants.get_configs(model_name).get("family", "")
 
     @staticmethod
     def is_model_available_for_plan(model_name: str, plan: str) -> bool:
         """Check if a model is available for a specific plan"""
-        config = AIModelConstants.AI_MODELS.get(model_name, {})
-        available_plans = config.get("plans", [])
-        return plan in available_plans
+        return model_name in _PLAN_MODELS.get(plan, ())
 
     @staticmethod
-    def get_models_for_plan(plan: str) -> list:
+    def get_models_for_plan(plan: str) -> tuple:
         """Get all models available for a specific plan"""
-        available_models = []
-        for model_name, config in AIModelConstants.AI_MODELS.items():
-            available_plans = config.get("plans", [])
-            if plan in available_plans:
-                available_models.append(model_name)
-        return available_models
+        return _PLAN_MODELS.get(plan, ())
 
     @staticmethod
-    def get_model_plans(model_name: str) -> list:
+    def get_model_plans(model_name: str) -> tuple:
         """Get all plans that have access to a specific model"""
-        config = AIModelConstants.AI_MODELS.get(model_name, {})
-        return config.get("plans", [])
+        return AIModelConstants.get_configs(model_name).get("plans", ())
+
+
+def _resolve_model_config(model_config: dict) -> dict:
+    """Resolve a model's configuration with the inheritance chain:
+    1. Start with BASE_DEFAULTS
+    2. Override with family defaults
+    3. Override with model-specific settings
+    """
+    config = AIModelDefaults.BASE_DEFAULTS.copy()
+
+    family = model_config.get("family")
+    if family:
+        family_defaults = getattr(AIModelFamilyDefaults, family.upper(), {})
+        config.update({k: v for k, v in family_defaults.items()
+                       if k in AIModelDefaults.BASE_DEFAULTS})
+
+    config.update(model_config)
+    config["plans"] = tuple(config.get("plans", ()))
+    return config
+
+
+# Resolved once at import: the configs never change while the process runs
+_BASE_CONFIG = MappingProxyType(AIModelDefaults.BASE_DEFAULTS.copy())
+_MODEL_CONFIGS = MappingProxyType({
+    model_name: MappingProxyType(_resolve_model_config(model_config))
+    for model_name, model_config in AIModelConstants.AI_MODELS.items()
+})
+_PLAN_MODELS = MappingProxyType({
+    plan: tuple(name for name, config in _MODEL_CONFIGS.items() if plan in config["plans"])
+    for plan in {plan for config in _MODEL_CONFIGS.values() for plan in config["plans"]}
+})
 
 class UsageVariables:
     # Plan limits in credits
@@ -222,10 +316,20 @@ class UsageVariables:
     FREE_PLAN_MICROAPP_LIMIT = int(env("FREE_PLAN_MICROAPP_LIMIT"))
     # Guest Users
     GUEST_USER_SESSION_LIMIT = 10
+    # Window (in seconds) the guest session limit applies to, and whether it is "fixed" or "sliding"
+    GUEST_SESSION_WINDOW = int(env("GUEST_SESSION_WINDOW", default=24 * 60 * 60))
+    GUEST_SESSION_WINDOW_TYPE = env("GUEST_SESSION_WINDOW_TYPE", default="fixed")
 
     # The number of credits per penny of cost.
     # E.g. Multiplier of 10000 means 1 credit per $0.0001 of cost.
     # E.g. Multipler of 10000 also means 100 credits per $0.01 of cost.
     CREDITS_MULTIPLIER = 10000
     # The minimum number of credits to charge for any response.
-    MINIMUM_CREDITS = 1
\ No newline at end of file
+    MINIMUM_CREDITS = 1
+
+    # How long (in seconds) an owner's available-credits snapshot is served from the cache
+    # before the subscription, billing cycle and top-ups are read again.
+    AVAILABLE_CREDITS_CACHE_TIMEOUT = int(env("AVAILABLE_CREDITS_CACHE_TIMEOUT", default=300))
+
+    # Credits charged for a run served from the response cache (no provider call is made)
+    RESPONSE_CACHE_HIT_CREDITS = int(env("RESPONSE_CACHE_HIT_CREDITS", default=0))
\ No newline at end of file
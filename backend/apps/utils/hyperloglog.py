@@ -0,0 +1,50 @@
+import hashlib
+import math
+
+# 2^12 registers: about 1.6% standard error, 4 KB per sketch (mostly zeros for small apps, so it compresses well)
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+HASH_BITS = 64
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+class HyperLogLog:
+    """
+    A HyperLogLog distinct-count sketch.
+
+    Sketches of the same precision merge losslessly (register-wise max), so distinct counts over many
+    days are computed by merging the daily sketches instead of rescanning the underlying rows.
+    """
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers) if registers else bytearray(REGISTERS)
+        if len(self.registers) != REGISTERS:
+            raise ValueError(f"Expected {REGISTERS} registers, got {len(self.registers)}")
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = hashed >> (HASH_BITS - PRECISION)
+        remainder = hashed & ((1 << (HASH_BITS - PRECISION)) - 1)
+        rank = (HASH_BITS - PRECISION) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        estimate = ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # Small-range correction: linear counting is more accurate while many registers are still empty
+        if estimate <= 2.5 * REGISTERS and zeros:
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self.registers)
@@ -0,0 +1,147 @@
+import hashlib
+from datetime import datetime
+
+from django.core.cache import caches
+from django.utils import timezone
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class SessionLimiter:
+    """
+    Counts the distinct sessions each client (e.g. a guest IP) starts per time window, in the cache.
+
+    Every (client, window, session) gets a marker key written with cache.add and the window's counter is only
+    incremented when the marker is new, so both steps are atomic on Redis and local memory and concurrent
+    workers never double count a session.
+
+    Fixed windows are aligned to local midnight when the window is a day, matching the old "sessions today" count.
+    Sliding windows use the sliding window counter approximation: the current window's count plus the previous
+    window's count weighted by how much of it still overlaps the last `window` seconds.
+    """
+
+    FIXED = "fixed"
+    SLIDING = "sliding"
+
+    def __init__(self, prefix, limit, window, window_type=FIXED, cache_alias="rate_limits"):
+        if window_type not in (self.FIXED, self.SLIDING):
+            raise ValueError(f"Unknown rate limit window type: {window_type}")
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+        self.window_type = window_type
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def current_window(self, now=None):
+        """Index of the window containing `now` and the fraction of it that has elapsed"""
+        local = timezone.localtime(now or timezone.now()).replace(tzinfo=None)
+        index, offset = divmod(int((local - EPOCH).total_seconds()), self.window)
+        return index, offset / self.window
+
+    def count_key(self, client, index):
+        return f"{self.prefix}:{client}:{index}"
+
+    def session_key(self, client, index, session_id):
+        session_hash = hashlib.blake2b(str(session_id).encode(), digest_size=16).hexdigest()
+        return f"{self.prefix}:{client}:{index}:{session_hash}"
+
+    def record(self, client, session_id, now=None):
+        """Count a session for the client in the current window; repeated runs of the same session are free"""
+        index, _ = self.current_window(now)
+        # Sliding windows still read the previous window's counter, so keep each window for two periods
+        timeout = self.window * 2
+        if not self.cache.add(self.session_key(client, index, session_id), 1, timeout):
+            return
+        count_key = self.count_key(client, index)
+        if not self.cache.add(count_key, 1, timeout):
+            self.cache.incr(count_key)
+
+    def count(self, client, now=None):
+        index, elapsed = self.current_window(now)
+        if self.window_type == self.FIXED:
+            return self.cache.get(self.count_key(client, index), 0)
+
+        counts = self.cache.get_many([self.count_key(client, index), self.count_key(client, index - 1)])
+        current = counts.get(self.count_key(client, index), 0)
+        previous = counts.get(self.count_key(client, index - 1), 0)
+        return current + int(previous * (1 - elapsed))
+
+    def allows(self, client, now=None):
+        return self.count(client, now) < self.limit
+
+
+class TokenBucket:
+    """
+    A per-minute quota (requests or tokens) shared by every process through the cache.
+
+    Each refill period of `refill_seconds` has its own counter key, and a reservation is allowed while the
+    periods of the last minute add up to no more than the quota. Whatever a period takes comes back a minute
+    later, so unused quota accumulates up to the full minute's worth and a large reservation waits only until
+    enough of it has been returned. Reserving increments the current period's counter and rolls back when the
+    minute would go over. A single reservation bigger than the whole quota goes through once the minute is empty.
+    """
+
+    def __init__(self, prefix, per_minute, refill_seconds=5, cache_alias="rate_limits"):
+        self.prefix = prefix
+        self.per_minute = per_minute
+        self.refill_seconds = refill_seconds
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def periods(self):
+        """Refill periods in a minute"""
+        return max(60 // self.refill_seconds, 1)
+
+    def period_key(self, period):
+        return f"{self.prefix}:{period}"
+
+    def taken(self, period):
+        """What each period of the minute ending with `period` has taken, oldest first"""
+        keys = [self.period_key(index) for index in range(period - self.periods + 1, period + 1)]
+        counts = self.cache.get_many(keys)
+        return [counts.get(key, 0) for key in keys]
+
+    def refill_wait(self, taken, amount, period, now):
+        """Seconds until enough of the minute's reservations have come back for `amount`"""
+        over = sum(taken) + amount - max(self.per_minute, amount)
+        for age, count in enumerate(taken):
+            over -= count
+            if over <= 0:
+                # The oldest period in the window comes back at the start of the next one
+                return (period + 1 + age) * self.refill_seconds - now
+        return self.periods * self.refill_seconds
+
+    def reserve(self, amount, now):
+        """Take `amount` from the bucket and return 0, or return the seconds until there is room for it"""
+        period = int(now // self.refill_seconds)
+        key = self.period_key(period)
+        # Counters are read for a minute after their period ends
+        timeout = (self.periods + 1) * self.refill_seconds
+        if not self.cache.add(key, amount, timeout):
+            try:
+                self.cache.incr(key, amount)
+            except ValueError:
+                # The period's counter expired between add and incr
+                if not self.cache.add(key, amount, timeout):
+                    return self.refill_seconds
+        taken = self.taken(period)
+        if sum(taken) > max(self.per_minute, amount):
+            self.cache.decr(key, amount)
+            taken[-1] -= amount
+            return self.refill_wait(taken, amount, period, now)
+        return 0
+
+    def release(self, amount, now):
+        """Give back a reservation made at `now`"""
+        try:
+            self.cache.decr(self.period_key(int(now // self.refill_seconds)), amount)
+        except ValueError:
+            pass
@@ -0,0 +1,16 @@
+from django.test import SimpleTestCase
+
+from apps.utils.hyperloglog import HyperLogLog
+
+
+class HyperLogLogTest(SimpleTestCase):
+    def test_small_counts_are_exact_enough(self):
+        sketch = HyperLogLog().update(["10.0.0.1", "10.0.0.2", "10.0.0.1"])
+        self.assertEqual(2, sketch.count())
+        self.assertEqual(0, HyperLogLog().count())
+
+    def test_merge_matches_union(self):
+        monday = HyperLogLog().update(f"session-{i}" for i in range(0, 30000))
+        tuesday = HyperLogLog().update(f"session-{i}" for i in range(20000, 50000))
+        merged = HyperLogLog(monday.to_bytes()).merge(tuesday)
+        self.assertAlmostEqual(50000, merged.count(), delta=50000 * 0.05)
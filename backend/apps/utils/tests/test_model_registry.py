@@ -0,0 +1,23 @@
+from django.test import SimpleTestCase
+
+from apps.microapps.llm_interface import UnifiedLLMInterface
+from apps.utils.global_variables import AIModelConstants
+
+
+class ModelRegistryTest(SimpleTestCase):
+    def test_resolved_configs_are_read_only(self):
+        config = AIModelConstants.get_configs("claude-4-opus")
+        self.assertEqual("anthropic/claude-opus-4-20250514", config["model"])
+        self.assertEqual(4096, config["max_tokens"])
+        with self.assertRaises(TypeError):
+            config["max_tokens"] = 1
+
+    def test_plan_index(self):
+        free_models = AIModelConstants.get_models_for_plan("free")
+        self.assertIn("gpt-4o-mini", free_models)
+        self.assertNotIn("gpt-4o", free_models)
+        self.assertEqual((), AIModelConstants.get_models_for_plan("unknown"))
+
+    def test_interfaces_are_shared_per_model(self):
+        self.assertIs(UnifiedLLMInterface.for_model("gpt-4o-mini"), UnifiedLLMInterface.for_model("gpt-4o-mini"))
+        self.assertIsNot(UnifiedLLMInterface.for_model("unknown"), UnifiedLLMInterface.for_model("unknown"))
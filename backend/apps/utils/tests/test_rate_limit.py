@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from apps.utils.rate_limit import SessionLimiter, TokenBucket
+
+
+class SessionLimiterTest(SimpleTestCase):
+    def setUp(self):
+        caches["rate_limits"].clear()
+        self.midnight = timezone.make_aware(datetime(2025, 1, 2))
+
+    def test_fixed_window_counts_distinct_sessions(self):
+        limiter = SessionLimiter("test", limit=2, window=24 * 60 * 60)
+        for session_id in ["a", "a", "b"]:
+            limiter.record("1.2.3.4", session_id, now=self.midnight + timedelta(hours=1))
+        self.assertEqual(2, limiter.count("1.2.3.4", now=self.midnight + timedelta(hours=23)))
+        self.assertFalse(limiter.allows("1.2.3.4", now=self.midnight + timedelta(hours=23)))
+        self.assertTrue(limiter.allows("5.6.7.8", now=self.midnight + timedelta(hours=23)))
+        # A new day starts a new window
+        self.assertTrue(limiter.allows("1.2.3.4", now=self.midnight + timedelta(days=1)))
+
+    def test_sliding_window_weights_the_previous_window(self):
+        limiter = SessionLimiter("test", limit=10, window=60 * 60, window_type=SessionLimiter.SLIDING)
+        for session_id in range(4):
+            limiter.record("1.2.3.4", session_id, now=self.midnight + timedelta(minutes=30))
+        limiter.record("1.2.3.4", "new", now=self.midnight + timedelta(minutes=75))
+        # A quarter of the next hour has passed, so three quarters of the previous window's sessions still count
+        self.assertEqual(1 + 3, limiter.count("1.2.3.4", now=self.midnight + timedelta(minutes=75)))
+
+
+class TokenBucketTest(SimpleTestCase):
+    def setUp(self):
+        caches["rate_limits"].clear()
+
+    def test_unused_quota_accumulates_up_to_the_minute(self):
+        bucket = TokenBucket("test", per_minute=120, refill_seconds=5)
+        for _ in range(120):
+            self.assertEqual(0, bucket.reserve(1, now=1001))
+        # Nothing comes back until the period the quota was taken in is a minute old
+        self.assertEqual(59, bucket.reserve(1, now=1001))
+        self.assertEqual(0, bucket.reserve(1, now=1060))
+
+    def test_large_reservation_waits_for_enough_refills(self):
+        bucket = TokenBucket("test", per_minute=120, refill_seconds=5)
+        self.assertEqual(0, bucket.reserve(50, now=1000))
+        self.assertEqual(0, bucket.reserve(50, now=1020))
+        self.assertEqual(40, bucket.reserve(50, now=1020))
+        # Once the first 50 come back there is room again
+        self.assertEqual(0, bucket.reserve(50, now=1060))
+        bucket.release(50, now=1060)
+        self.assertEqual(0, bucket.reserve(70, now=1060))
+
+    def test_reservation_over_the_quota_needs_an_empty_minute(self):
+        bucket = TokenBucket("test", per_minute=120, refill_seconds=5)
+        self.assertEqual(0, bucket.reserve(200, now=1000))
+        self.assertEqual(50, bucket.reserve(1, now=1010))
+        self.assertEqual(0, bucket.reserve(1, now=1060))
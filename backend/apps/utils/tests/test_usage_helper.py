@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.utils.usage_helper import (
+    cache_available_credits,
+    decrement_available_credits,
+    get_cached_available_credits,
+    invalidate_available_credits,
+)
+
+
+class AvailableCreditsCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_decrement_and_invalidate(self):
+        cache_available_credits(1, 100, timezone.now() + timedelta(days=1))
+        decrement_available_credits(1, 30)
+        self.assertEqual(70, get_cached_available_credits(1))
+
+        invalidate_available_credits(1)
+        self.assertIsNone(get_cached_available_credits(1))
+
+    def test_decrement_without_snapshot_is_a_noop(self):
+        decrement_available_credits(2, 30)
+        self.assertIsNone(get_cached_available_credits(2))
+
+    def test_expired_billing_cycle_is_not_cached(self):
+        cache_available_credits(3, 100, timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(get_cached_available_credits(3))
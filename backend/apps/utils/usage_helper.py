@@ -1,12 +1,14 @@
 import logging
 from datetime import datetime
-from django.db.models import Count
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, ExpressionWrapper, Sum
 from django.utils import timezone
-from apps.microapps.models import Run, MicroAppUserJoin
+from apps.microapps.models import MicroAppUserJoin
 from apps.subscriptions.models import Subscription, BillingCycle, TopUpToSubscription
 from apps.subscriptions.serializers import CustomSubscriptionSerializer
 from apps.users.models import CustomUser
 from apps.utils.global_variables import UsageVariables
+from apps.utils.rate_limit import SessionLimiter
 
 log = logging.getLogger("micro_ai.subscription")
 
@@ -22,6 +24,29 @@ def subscription_details(user_id):
         return serializerData
     return None
 
+def available_credits_cache_key(user_id):
+    return f"available_credits:{user_id}"
+
+def get_cached_available_credits(user_id):
+    return cache.get(available_credits_cache_key(user_id))
+
+def cache_available_credits(user_id, credits, billing_cycle_end):
+    """Snapshot the owner's available credits until the billing cycle ends, at most AVAILABLE_CREDITS_CACHE_TIMEOUT"""
+    seconds_left = int((billing_cycle_end - timezone.now()).total_seconds())
+    timeout = min(UsageVariables.AVAILABLE_CREDITS_CACHE_TIMEOUT, seconds_left)
+    if timeout > 0:
+        cache.set(available_credits_cache_key(user_id), credits, timeout)
+
+def decrement_available_credits(user_id, credits):
+    try:
+        cache.decr(available_credits_cache_key(user_id), credits)
+    except ValueError:
+        # Nothing cached for this owner, the next check will rebuild the snapshot
+        pass
+
+def invalidate_available_credits(user_id):
+    cache.delete(available_credits_cache_key(user_id))
+
 def get_user_ip(request):
         x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
         if x_forwarded_for:
@@ -40,6 +65,16 @@ class RunUsage:
     @staticmethod
     def check_for_available_credits(self, user_id, date_joined):
         from apps.subscriptions.helpers import update_or_create_free_subscription, create_free_billing_cycle
+        # Served from the snapshot kept up to date by the billing ledger and the subscription signals
+        cached_credits = get_cached_available_credits(user_id)
+        if cached_credits is not None and cached_credits > 0:
+            return {
+                "status": "active",
+                "message": "Credits available",
+                "has_credits": True,
+                "credits_remaining": cached_credits
+            }
+
         user = CustomUser.objects.get(id=user_id)
         subscription_data = subscription_details(user_id)
         
@@ -88,8 +123,17 @@ class RunUsage:
                 }
                 
             main_available = billing_cycle.credits_remaining
-            top_ups = TopUpToSubscription.objects.filter(user=user_id)
-            total_topup_available = sum([top_up.remaining_credits for top_up in top_ups])
+            total_topup_available = TopUpToSubscription.objects.filter(
+                user=user_id,
+                allocated_credits__gt=F('used_credits')
+            ).aggregate(
+                total=Sum(
+                    ExpressionWrapper(
+                        F('allocated_credits') - F('used_credits'),
+                        output_field=IntegerField()
+                    )
+                )
+            )['total'] or 0
             combined_available = main_available + total_topup_available
             if combined_available <= 0:
                 return {
@@ -98,6 +142,7 @@ class RunUsage:
                     "has_credits": False
                 }
                 
+            cache_available_credits(user_id, combined_available, billing_cycle.end_date)
             return {
                 "status": "active",
                 "message": "Credits available",
@@ -154,18 +199,22 @@ class MicroAppUsage:
             "current_count": current_app_count
         }
 
+guest_sessions = SessionLimiter(
+    "guest_sessions",
+    limit=UsageVariables.GUEST_USER_SESSION_LIMIT,
+    window=UsageVariables.GUEST_SESSION_WINDOW,
+    window_type=UsageVariables.GUEST_SESSION_WINDOW_TYPE,
+)
+
 class GuestUsage:
     
     def get_user_sessions(self, ip):
-        date = datetime.now().strftime("%Y-%m-%d")
-        filters = {
-                "timestamp__date__gte": date,
-                "user_ip": ip,
-                "user_id": None
-            }
-        sessions = Run.objects.filter(**filters).count()
-        sessions = Run.objects.filter(**filters).distinct("session_id").count()
-        return sessions
+        # Guest sessions are counted in the rate limit cache as their runs are saved (apps.microapps.signals)
+        return guest_sessions.count(ip)
+
+    @staticmethod
+    def record_session(ip, session_id):
+        guest_sessions.record(ip, session_id)
 
     @staticmethod
     def check_usage_limit(self, ip):
@@ -15,5 +15,14 @@ echo "Collecting static files..."
 python manage.py collectstatic --noinput --settings=micro_ai.settings_production
 
 # Start Gunicorn server
+# Set SERVER_INTERFACE=asgi to serve through uvicorn workers, so the async run endpoints
+# can multiplex in-flight provider calls on one event loop. Under ASGI, stream runs through
+# run/stream/async; the sync run/stream endpoint is buffered to the end before it is sent
+SERVER_INTERFACE=${SERVER_INTERFACE:-wsgi}
+if [ "$SERVER_INTERFACE" = "asgi" ]; then
+    echo "Starting Gunicorn (ASGI)..."
+    exec gunicorn --bind 0.0.0.0:$PORT --workers 1 --worker-class uvicorn.workers.UvicornWorker --timeout 0 micro_ai.asgi:application
+fi
+
 echo "Starting Gunicorn..."
 exec gunicorn --bind 0.0.0.0:$PORT --workers 1 --threads 8 --timeout 0 micro_ai.wsgi:application
\ No newline at end of file
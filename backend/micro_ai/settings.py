@@ -15,6 +15,7 @@ from datetime import timedelta
 from pathlib import Path
 
 import environ
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.translation import gettext_lazy
 
 # Build paths inside the project like this: BASE_DIR / "subdir".
@@ -84,6 +85,7 @@ PROJECT_APPS = [
     "apps.web",
     "apps.microapps",
     "apps.collection",
+    "apps.jobs",
     "apps.utils",
     "apps.lti",
 ]
@@ -143,6 +145,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "micro_ai.wsgi.application"
+ASGI_APPLICATION = "micro_ai.asgi.application"
 
 FORM_RENDERER = "django.forms.renderers.TemplatesSetting"
 
@@ -163,6 +166,42 @@ else:
         }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/stable/topics/cache/
+# Local memory is per-process, so it is only allowed with DEBUG on; production must set CACHE_URL
+# (e.g. redis://redis:6379/0) so every worker shares cached state.
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# Exact-match model responses for microapps that enable the response cache (apps.microapps.response_cache).
+# Local memory evicts the least recently used entries past RESPONSE_CACHE_MAX_ENTRIES;
+# for Redis, give the instance a maxmemory-policy of allkeys-lru.
+CACHES["responses"] = env.cache("RESPONSE_CACHE_URL", default="locmemcache://responses")
+CACHES["responses"]["TIMEOUT"] = env.int("RESPONSE_CACHE_TIMEOUT", default=24 * 60 * 60)
+if CACHES["responses"]["BACKEND"].endswith("LocMemCache"):
+    CACHES["responses"].setdefault("OPTIONS", {})["MAX_ENTRIES"] = env.int("RESPONSE_CACHE_MAX_ENTRIES", default=5000)
+
+# Per-client session counters of the guest run limiter and the provider quota buckets (apps.utils.rate_limit). Must be shared by every worker
+# in production, so it defaults to the main cache; local memory is only suitable for tests and development.
+CACHES["rate_limits"] = env.cache("RATE_LIMIT_CACHE_URL", default=env("CACHE_URL", default="locmemcache://rate_limits"))
+
+
+def require_shared_caches(caches):
+    """
+    Usage counters, quota buckets and cached run contexts are only correct when every worker sees the same
+    cache, so refuse to start a production process on per-process local memory.
+    """
+    local = [alias for alias in ("default", "rate_limits") if caches[alias]["BACKEND"].endswith("LocMemCache")]
+    if local:
+        raise ImproperlyConfigured(
+            f"CACHES {', '.join(local)} use local memory, which each worker process keeps to itself. "
+            "Set CACHE_URL (and RATE_LIMIT_CACHE_URL if it differs) to a shared cache such as redis://redis:6379/0."
+        )
+
+
+if not DEBUG:
+    require_shared_caches(CACHES)
+
 # Auth / login stuff
 
 # Django recommends overriding the user model even if you don"t think you need to because it makes
@@ -276,6 +315,17 @@ AWS_S3_SIGNATURE_VERSION = "s3v4"
 AWS_S3_FILE_OVERWRITE = False
 AWS_DEFAULT_ACL = None
 AWS_S3_VERIFY = True
+AWS_S3_MAX_POOL_CONNECTIONS = env.int("AWS_S3_MAX_POOL_CONNECTIONS", default=20)
+# Uploads larger than the threshold are sent as multipart uploads, streamed from the file in parts of this size
+AWS_S3_MULTIPART_THRESHOLD = env.int("AWS_S3_MULTIPART_THRESHOLD", default=8 * 1024 * 1024)
+AWS_S3_MULTIPART_CHUNKSIZE = env.int("AWS_S3_MULTIPART_CHUNKSIZE", default=8 * 1024 * 1024)
+
+# Shared HTTP connection pools for LLM provider calls (see apps.utils.clients)
+LLM_HTTP_MAX_CONNECTIONS = env.int("LLM_HTTP_MAX_CONNECTIONS", default=100)
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = env.int("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", default=20)
+LLM_HTTP_KEEPALIVE_EXPIRY = env.float("LLM_HTTP_KEEPALIVE_EXPIRY", default=60.0)
+LLM_HTTP_TIMEOUT = env.float("LLM_HTTP_TIMEOUT", default=600.0)
+LLM_HTTP_CONNECT_TIMEOUT = env.float("LLM_HTTP_CONNECT_TIMEOUT", default=10.0)
 
 STORAGES = {
     "default": {
@@ -7,6 +7,9 @@ from .settings import *  # noqa F401
 # A future release may remove it from here.
 DEBUG = False
 
+# Production processes must share one cache (see CACHES in settings.py)
+require_shared_caches(CACHES)
+
 # fix ssl mixed content issues
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
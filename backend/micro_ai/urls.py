@@ -50,6 +50,7 @@ urlpatterns = [
     path("", include("apps.web.urls")),
     path("api/microapps/", include(microapp_urls)),
     path("api/collection/", include(collection_urls)),
+    path("api/jobs/", include("apps.jobs.urls")),
     # auth API
     path("api/auth/", include("apps.authentication.urls")),
     # API docs
@@ -50,6 +50,7 @@ interface UploadedFile {
   word_count?: number;
   original_filename: string;
   text_filename: string;
+  text_file?: string;
   description?: string;
 }
 
@@ -109,6 +110,7 @@ export default function FormBuilder() {
       const fileData = {
         original_filename,
         text_filename,
+        text_file: result.text_file,
         size: file.size,
         word_count: result.word_count,
       };
@@ -118,6 +120,7 @@ export default function FormBuilder() {
         url: result.url,
         original_filename,
         text_filename,
+        text_file: result.text_file,
         size: file.size,
         word_count: result.word_count
       }]);
@@ -176,6 +179,7 @@ export default function FormBuilder() {
           name: file.original_filename.split('_')[0],
           original_filename: file.original_filename,
           text_filename: file.text_filename,
+          text_file: file.text_file,
           url: `https://${process.env.NEXT_PUBLIC_CLOUDFRONT_DOMAIN}/${file.original_filename}`,
           size: file.size,
           word_count: file.word_count,
@@ -41,6 +41,7 @@ export default function JsonPreview({
     attachedFiles: attachedFiles.map(file => ({
       original_filename: file.original_filename,
       text_filename: file.text_filename,
+      text_file: file.text_file,
       size: file.size,
       word_count: file.word_count,
       description: file.description
@@ -59,6 +60,7 @@ export default function JsonPreview({
       scoredPhase: phase.scoredPhase,
       rubric: phase.rubric,
       minScore: phase.minScore,
+      parallelScoring: phase.parallelScoring,
       fields: (Array.isArray(phase.elements) ? phase.elements : []).map(field => ({
         id: field.id,
         type: field.type,
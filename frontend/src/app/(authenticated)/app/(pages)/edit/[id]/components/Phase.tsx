@@ -348,6 +348,36 @@ export default function Phase({
                 focus:ring-primary resize-y"
               placeholder="Enter scoring rubric..."
             />
+
+            <div className="flex items-center space-x-2">
+              <Checkbox
+                id={`parallel-scoring-${phase.id}`}
+                checked={phase.parallelScoring || false}
+                onCheckedChange={(checked) => 
+                  onUpdatePhase(phase.id, { parallelScoring: checked as boolean })
+                }
+              />
+              <label
+                htmlFor={`parallel-scoring-${phase.id}`}
+                className="text-sm font-medium leading-none peer-disabled:cursor-not-allowed 
+                  peer-disabled:opacity-70"
+              >
+                Score in parallel?
+              </label>
+              <TooltipProvider delayDuration={0}>
+                <Tooltip>
+                  <TooltipTrigger asChild>
+                    <HelpCircle className="h-4 w-4 text-gray-400 cursor-help" />
+                  </TooltipTrigger>
+                  <TooltipContent side="right" sideOffset={5}>
+                    <p className="w-[200px] text-sm">
+                      If true, the score is generated at the same time as the AI response, which makes this phase faster. 
+                      Only use this when the rubric grades the user&apos;s submission, not the AI response.
+                    </p>
+                  </TooltipContent>
+                </Tooltip>
+              </TooltipProvider>
+            </div>
           </div>
         )}
       </div>
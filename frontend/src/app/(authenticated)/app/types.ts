@@ -106,6 +106,7 @@ export interface SurveyPage {
   scoredPhase: boolean;
   rubric: string;
   minScore: number;
+  parallelScoring?: boolean;
   skipPhase: boolean;
 }
 
@@ -258,6 +259,7 @@ export type PhaseType = {
    scoredPhase: boolean;
    rubric: string;
    minScore?: number;
+   parallelScoring?: boolean;
  };
 
 export interface SurveyState {
@@ -315,6 +317,8 @@ export interface SurveyState {
 export interface AttachedFile {
    original_filename: string;
    text_filename: string;
+   // Full key of the extracted text; files uploaded before it was added live under the app's files/text/
+   text_file?: string;
    size: number;
    word_count?: number;
    description?: string;
@@ -13,7 +13,8 @@ const getPageConfig = (page: SurveyPage | null) => {
    return {
       scoredPhase: page?.scoredPhase || false,
       rubric: page?.rubric || "",
-      minScore: page?.minScore || 0
+      minScore: page?.minScore || 0,
+      parallelScoring: page?.parallelScoring || false
    };
 };
 
@@ -71,7 +72,8 @@ export const buildRequestBody = async (
    // First, fetch all text file contents
    const fileContents = await Promise.all(
       attachedFiles.map(async file => {
-         const textUrl = `https://${process.env.NEXT_PUBLIC_CLOUDFRONT_DOMAIN}/microapps/${appId}/files/text/${file.text_filename}`;
+         const textKey = file.text_file || `microapps/${appId}/files/text/${file.text_filename}`;
+         const textUrl = `https://${process.env.NEXT_PUBLIC_CLOUDFRONT_DOMAIN}/${textKey}`;
          try {
             const response = await fetch(textUrl);
             const text = await response.text();
@@ -173,6 +175,7 @@ ${file!.content}
       requestBody.scored_run = pageConfig.scoredPhase;
       requestBody.rubric = pageConfig.rubric;
       requestBody.minimum_score = pageConfig.minScore;
+      requestBody.parallel_scoring = pageConfig.parallelScoring;
    }
 
    if (skipScoredRun) {
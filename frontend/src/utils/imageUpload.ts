@@ -1,4 +1,5 @@
 import axiosInstance from "./axiosInstance";
+import { waitForJob } from "./jobs";
 
 interface S3UploadResponse {
   data: {
@@ -59,89 +60,90 @@ export class FileUploadService {
 
     // Handle image uploads with presigned URLs
     if (this.endpoint === 'upload-image') {
-      // Get pre-signed URL from server
-      const presignedResponse = await api.post(`/api/microapps/${this.microappId}/${this.endpoint}/`, {
-        filename: uniqueFilename,
-        content_type: file.type,
-      });
-
-      if (presignedResponse.status !== 200) {
-        throw new Error('Failed to get upload URL');
-      }
-
-      const { data }: S3UploadResponse = presignedResponse.data;
-
-      // Prepare form data for S3 upload
-      const formData = new FormData();
-      
-      // Add only the fields that are explicitly allowed in the policy
-      const allowedFields = [
-        'key',
-        'policy',
-        'x-amz-algorithm',
-        'x-amz-credential',
-        'x-amz-date',
-        'x-amz-signature',
-        'Content-Type'
-      ];
-      
-      Object.entries(data.fields).forEach(([key, value]) => {
-        if (allowedFields.includes(key)) {
-          formData.append(key, value);
-        }
-      });
-      
-      // Add the file last
-      formData.append('file', file);
-
-      // Upload directly to S3
-      const uploadResponse = await fetch(data.url, {
-        method: 'POST',
-        body: formData,
-      });
-
-      if (!uploadResponse.ok) {
-        const errorText = await uploadResponse.text();
-        console.error('S3 Upload Error:', errorText);
-        throw new Error(`Failed to upload file: ${uploadResponse.status} ${uploadResponse.statusText}`);
-      }
+      const key = await this.uploadToS3(`/api/microapps/${this.microappId}/${this.endpoint}/`, uniqueFilename, file);
 
       // Return the CloudFront URL for images
       return {
-        url: `https://${this.cloudFrontDomain}/${data.fields.key}`,
+        url: `https://${this.cloudFrontDomain}/${key}`,
         filename: uniqueFilename
       };
     }
 
-    // Handle document uploads through backend
-    const formData = new FormData();
-    formData.append('file', file);
-    formData.append('filename', uniqueFilename);
-    formData.append('content_type', file.type);
-
-    const uploadResponse = await api.post(
-      `/api/microapps/${this.microappId}/${this.endpoint}/`,
-      formData,
-      {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      }
-    );
+    // Documents also go straight to S3; the backend then parses the stored file in a background job
+    const key = await this.uploadToS3(`/api/microapps/${this.microappId}/${this.endpoint}/presign/`, uniqueFilename, file);
+    const completeResponse = await api.post(`/api/microapps/${this.microappId}/${this.endpoint}/complete/`, { key });
 
-    if (uploadResponse.status !== 200) {
+    if (completeResponse.status !== 202) {
       throw new Error('Failed to upload file');
     }
 
-    const { data } = uploadResponse.data;
+    const { data } = completeResponse.data;
+    const parsed = await waitForJob<FileUploadResult>(data.job_id);
 
     // Return processed document data
     return {
-      original_file: data.original_file,
-      text_file: data.text_file,
-      word_count: data.word_count
+      original_file: parsed.original_file,
+      text_file: parsed.text_file,
+      word_count: parsed.word_count
     };
   }
+
+  /**
+   * Uploads a file directly to S3 with a presigned POST from the given endpoint
+   * @returns Promise<string> - The key of the uploaded file in the bucket
+   */
+  private async uploadToS3(presignEndpoint: string, filename: string, file: File): Promise<string> {
+    const api = axiosInstance();
+
+    // Get pre-signed URL from server
+    const presignedResponse = await api.post(presignEndpoint, {
+      filename,
+      content_type: file.type,
+    });
+
+    if (presignedResponse.status !== 200) {
+      throw new Error('Failed to get upload URL');
+    }
+
+    const { data }: S3UploadResponse = presignedResponse.data;
+
+    // Prepare form data for S3 upload
+    const formData = new FormData();
+    
+    // Add only the fields that are explicitly allowed in the policy
+    const allowedFields = [
+      'key',
+      'policy',
+      'x-amz-algorithm',
+      'x-amz-credential',
+      'x-amz-date',
+      'x-amz-signature',
+      'Content-Type'
+    ];
+    
+    Object.entries(data.fields).forEach(([key, value]) => {
+      if (allowedFields.includes(key)) {
+        formData.append(key, value);
+      }
+    });
+    
+    // Add the file last
+    formData.append('file', file);
+
+    // Upload directly to S3
+    const uploadResponse = await fetch(data.url, {
+      method: 'POST',
+      body: formData,
+    });
+
+    if (!uploadResponse.ok) {
+      const errorText = await uploadResponse.text();
+      console.error('S3 Upload Error:', errorText);
+      throw new Error(`Failed to upload file: ${uploadResponse.status} ${uploadResponse.statusText}`);
+    }
+
+    return data.fields.key;
+  }
 }
 
 // Create pre-configured instances for common upload types
@@ -0,0 +1,40 @@
+import axiosInstance from "./axiosInstance";
+import delay from "./delay";
+
+export type JobStatus = "queued" | "running" | "succeeded" | "failed";
+
+interface Job<T> {
+  job_uuid: string;
+  kind: string;
+  status: JobStatus;
+  result: T | null;
+  error: string;
+  attempts: number;
+}
+
+const POLL_INTERVAL_MS = 1000;
+const MAX_WAIT_MS = 10 * 60 * 1000;
+
+/**
+ * Poll a background job (e.g. document parsing) until it finishes.
+ * Resolves with the job's result, or rejects with the job's error.
+ */
+export async function waitForJob<T>(jobId: string): Promise<T> {
+  const api = axiosInstance();
+  const deadline = Date.now() + MAX_WAIT_MS;
+
+  while (Date.now() < deadline) {
+    const response = await api.get(`/api/jobs/${jobId}/`);
+    const job: Job<T> = response.data.data;
+
+    if (job.status === "succeeded") {
+      return job.result as T;
+    }
+    if (job.status === "failed") {
+      throw new Error(job.error || "Background job failed");
+    }
+    await delay(POLL_INTERVAL_MS);
+  }
+
+  throw new Error("Timed out waiting for the file to be processed");
+}
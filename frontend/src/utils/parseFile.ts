@@ -1,5 +1,6 @@
 import axiosInstance from "./axiosInstance";
 import axios from "axios";
+import { waitForJob } from "./jobs";
 
 export interface ParseFileResult {
   text: string;
@@ -17,8 +18,8 @@ export class ParseFileError extends Error {
 }
 
 /**
- * Send a document to the backend for on-the-fly text extraction. The backend
- * must be authenticated.
+ * Send a document to the backend for text extraction in a background job and
+ * wait for the result. The backend must be authenticated.
  */
 export async function parseFile(file: File): Promise<ParseFileResult> {
   const api = axiosInstance();
@@ -32,7 +33,11 @@ export async function parseFile(file: File): Promise<ParseFileResult> {
       headers: { "Content-Type": "multipart/form-data" },
     });
 
-    return response.data.data as ParseFileResult;
+    // A file parsed before comes back right away (200); otherwise it is parsed in a background job (202)
+    if (response.status === 200) {
+      return response.data.data as ParseFileResult;
+    }
+    return await waitForJob<ParseFileResult>(response.data.data.job_id);
   } catch (error) {
     let message = "Failed to parse file.";
     let status: number | undefined;
@@ -44,6 +49,9 @@ export async function parseFile(file: File): Promise<ParseFileResult> {
       if (backendMsg) message = backendMsg;
       else if (status === 401) message = "You need to log in to upload files.";
       else if (status === 403) message = "You don't have permission to upload files.";
+    } else if (error instanceof Error) {
+      // The parse job failed, e.g. the content was over the character limit
+      message = error.message;
     }
 
     throw new ParseFileError(message, status);